@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
+from .balancing import BalancedTransport
+from .breaker import CircuitBreaker
+from .cache import ResponseCache
 from .client import AsyncJarpcClient, JarpcClient
+from .codecs import JarpcCodec, JsonCodec, MsgpackCodec
+from .compression import CompressionPolicy
 from .context import meta_context_var
 from .dispatcher import JarpcDispatcher
 from .errors import (
+    JarpcCircuitOpen,
     JarpcError,
     JarpcExternalServiceUnavailable,
     JarpcForbidden,
@@ -11,7 +17,9 @@ from .errors import (
     JarpcInvalidRequest,
     JarpcMethodNotFound,
     JarpcParseError,
+    JarpcRateLimited,
     JarpcServerError,
+    JarpcShuttingDown,
     JarpcTimeout,
     JarpcUnauthorized,
     JarpcUnknownError,
@@ -19,17 +27,36 @@ from .errors import (
     jarpcdantic_exceptions,
 )
 from .format import JarpcRequest, JarpcResponse
+from .gather import GatherResult
+from .hedging import HedgedTransport
+from .http import HttpTransport
+from .limiters import AdaptiveLimiter, AIMDLimiter, FairQueueLimiter, GradientLimiter
+from .loopback import LoopbackTransport
 from .manager import JarpcManager
+from .notifier import NotificationSender
+from .outbox import Outbox
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy
 from .router import JarpcClientRouter
+from .sharding import ShardedTransport
 
 __all__ = (
     # client
     "AsyncJarpcClient",
     "JarpcClient",
     "JarpcClientRouter",
+    "NotificationSender",
+    "Outbox",
+    # codecs
+    "JarpcCodec",
+    "JsonCodec",
+    "MsgpackCodec",
+    # compression
+    "CompressionPolicy",
     # dispatcher
     "JarpcDispatcher",
     # errors
+    "JarpcCircuitOpen",
     "JarpcError",
     "JarpcExternalServiceUnavailable",
     "JarpcForbidden",
@@ -38,7 +65,9 @@ __all__ = (
     "JarpcInvalidRequest",
     "JarpcMethodNotFound",
     "JarpcParseError",
+    "JarpcRateLimited",
     "JarpcServerError",
+    "JarpcShuttingDown",
     "JarpcTimeout",
     "JarpcUnknownError",
     "JarpcUnauthorized",
@@ -47,8 +76,26 @@ __all__ = (
     # format
     "JarpcRequest",
     "JarpcResponse",
+    # gather
+    "GatherResult",
+    # limiters
+    "AdaptiveLimiter",
+    "AIMDLimiter",
+    "FairQueueLimiter",
+    "GradientLimiter",
     # manager
     "JarpcManager",
+    # resilience
+    "CircuitBreaker",
+    "RateLimiter",
+    "ResponseCache",
+    "RetryPolicy",
+    # transports
+    "BalancedTransport",
+    "HedgedTransport",
+    "HttpTransport",
+    "LoopbackTransport",
+    "ShardedTransport",
     # context
     "meta_context_var",
 )
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+ASGI application serving a `JarpcManager`.
+
+Run it with any ASGI server:
+```
+app = JarpcASGIApp(JarpcManager(dispatcher))
+# uvicorn module:app
+```
+"""
+import logging
+from typing import Any, Awaitable, Callable
+
+from .codecs import get_codec
+from .manager import JarpcManager
+
+logger = logging.getLogger(__name__)
+
+Scope = dict[str, Any]
+Message = dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+
+class JarpcASGIApp:
+    """
+    ASGI application that passes POST request bodies to `JarpcManager.handle`.
+
+    The body is handed to the manager as bytes, arrays are processed as batches,
+    requests without a response (notifications) are answered with 204 No Content.
+    The app keeps no per-request state, so one instance serves any number of concurrent connections.
+    The wire codec is picked by the Content-Type header among the manager's codecs, the response uses
+    the same codec. On ASGI lifespan shutdown the manager is drained with `JarpcManager.shutdown`.
+    """
+
+    def __init__(
+        self,
+        manager: JarpcManager,
+        max_body_size: int = 16 * 1024 * 1024,
+        shutdown_timeout: float | None = None,
+    ):
+        """
+        :param manager: Manager processing requests.
+        :param max_body_size: Larger requests are rejected with 413 Payload Too Large.
+        :param shutdown_timeout: Drain deadline passed to `JarpcManager.shutdown` on lifespan shutdown.
+        """
+        self.manager: JarpcManager = manager
+        self.max_body_size: int = max_body_size
+        self.shutdown_timeout: float | None = shutdown_timeout
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            await self._handle_http(scope, receive, send)
+        elif scope["type"] == "lifespan":
+            await self._handle_lifespan(receive, send)
+        elif scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1003})
+
+    async def _handle_http(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["method"] != "POST":
+            await self._send_response(send, 405, headers=[(b"allow", b"POST")])
+            return
+
+        body = await self._read_body(receive, send)
+        if body is None:
+            return
+
+        codec = self._get_codec(scope) or self.manager.detect_codec(body)
+        response = await self.manager.handle(body, codec)
+        if response is None:
+            await self._send_response(send, 204)
+        else:
+            if isinstance(response, str):
+                response = response.encode()
+            await self._send_response(
+                send, 200, response, headers=[(b"content-type", codec.content_type.encode())]
+            )
+
+    def _get_codec(self, scope: Scope):
+        """Returns the manager's codec matching the Content-Type header, if any."""
+        for name, value in scope.get("headers", ()):
+            if name == b"content-type":
+                codec = get_codec(value.decode("latin-1"))
+                return codec if codec in self.manager.codecs else None
+        return None
+
+    async def _read_body(self, receive: Receive, send: Send) -> bytes | None:
+        """Reads the request body, returns None if the client disconnected or the body is too large."""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body_size:
+                await self._send_response(send, 413)
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+    @staticmethod
+    async def _send_response(
+        send: Send, status: int, body: bytes = b"", headers: list[tuple[bytes, bytes]] | None = None
+    ) -> None:
+        headers = [*(headers or []), (b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _handle_lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.manager.shutdown(timeout=self.shutdown_timeout)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Client-side load balancing.
+
+`BalancedTransport` spreads calls over several transports (replicas of a service). For every call it takes
+two random healthy endpoints and picks the cheaper one, the cost being the peak EWMA of latency multiplied
+by the number of outstanding calls plus one (power of two choices). Unlike an L4 balancer it sees
+per-call load, so a replica stuck in a slow call or a GC pause stops getting traffic at once.
+Endpoints failing `max_failures` calls in a row are taken out of rotation for a while.
+"""
+import math
+import random
+import time
+from typing import Any, Awaitable, Callable, Iterable, Sequence
+
+from .errors import ExceptionManager, JarpcError, jarpcdantic_exceptions
+from .format import JarpcRequest
+
+Transport = Callable[..., Awaitable[Any]]
+
+
+class _Endpoint:
+    """Load and health of one transport."""
+
+    __slots__ = ("transport", "outstanding", "latency", "updated", "failures", "ejected_until", "calls")
+
+    def __init__(self, transport: Transport):
+        self.transport: Transport = transport
+        self.outstanding: int = 0
+        # a new endpoint has no latency yet, its cost is driven by outstanding calls only
+        self.latency: float = 0.0
+        self.updated: float = time.monotonic()
+        self.failures: int = 0
+        self.ejected_until: float = 0.0
+        self.calls: int = 0
+
+    def cost(self) -> float:
+        return (self.latency + 1e-6) * (self.outstanding + 1)
+
+
+class BalancedTransport:
+    """
+    Transport balancing calls over replicas.
+
+    Example:
+    ```
+    transport = BalancedTransport([HttpTransport(url) for url in replica_urls])
+    kitchen = JarpcClient(transport=transport, middlewares=[RetryPolicy()])
+    ```
+
+    A failure is an exception of the transport: a JARPC error with one of `failure_codes` or any other
+    exception (connection errors of third-party transports). Error responses of the server are not failures.
+    If every endpoint is ejected, calls are spread over all of them anyway.
+    """
+
+    def __init__(
+        self,
+        transports: Sequence[Transport],
+        decay: float = 10.0,
+        max_failures: int = 3,
+        ejection_time: float = 30.0,
+        failure_codes: Iterable[int] | None = None,
+        exception_manager: ExceptionManager | None = None,
+    ):
+        """
+        :param transports: Transports of the replicas.
+        :param decay: Time constant of the latency EWMA, in seconds.
+        :param max_failures: Number of failed calls in a row that takes an endpoint out of rotation.
+        :param ejection_time: Time in seconds an endpoint stays out of rotation. After it the endpoint gets calls
+                              again, and a single failure ejects it once more.
+        :param failure_codes: Error codes counted as failures. Defaults to retryable codes of `exception_manager`.
+        :param exception_manager: Registry of exceptions, `jarpcdantic_exceptions` by default.
+        """
+        if not transports:
+            raise ValueError("at least one transport is required")
+        self.decay: float = decay
+        self.max_failures: int = max_failures
+        self.ejection_time: float = ejection_time
+        self.failure_codes: set[int] = (
+            set(failure_codes)
+            if failure_codes is not None
+            else (exception_manager or jarpcdantic_exceptions).retryable_codes()
+        )
+        self.codec = getattr(transports[0], "codec", None)
+        self.supports_batches: bool = all(getattr(transport, "supports_batches", True) for transport in transports)
+        self._endpoints: list[_Endpoint] = [_Endpoint(transport) for transport in transports]
+
+    def stats(self) -> list[dict[str, Any]]:
+        """Returns per-endpoint counters in the order of transports."""
+        now = time.monotonic()
+        return [
+            {
+                "outstanding": endpoint.outstanding,
+                "latency": endpoint.latency,
+                "failures": endpoint.failures,
+                "ejected": endpoint.ejected_until > now,
+                "calls": endpoint.calls,
+            }
+            for endpoint in self._endpoints
+        ]
+
+    async def aclose(self) -> None:
+        """Closes transports that can be closed."""
+        for endpoint in self._endpoints:
+            aclose = getattr(endpoint.transport, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def __call__(self, request_string: str | bytes, request: JarpcRequest, **kwargs: Any) -> Any:
+        endpoint = self._choose()
+        endpoint.outstanding += 1
+        endpoint.calls += 1
+        started = time.monotonic()
+        try:
+            result = await endpoint.transport(request_string, request, **kwargs)
+        except JarpcError as e:
+            self._record(endpoint, started, e.code in self.failure_codes)
+            raise
+        except Exception:
+            self._record(endpoint, started, True)
+            raise
+        except BaseException:
+            endpoint.outstanding -= 1
+            raise
+        self._record(endpoint, started, False)
+        return result
+
+    def _choose(self) -> _Endpoint:
+        now = time.monotonic()
+        healthy = [endpoint for endpoint in self._endpoints if endpoint.ejected_until <= now] or self._endpoints
+        if len(healthy) == 1:
+            return healthy[0]
+        first, second = random.sample(healthy, 2)
+        return first if first.cost() <= second.cost() else second
+
+    def _record(self, endpoint: _Endpoint, started: float, failed: bool) -> None:
+        now = time.monotonic()
+        endpoint.outstanding -= 1
+        latency = now - started
+        if latency > endpoint.latency:
+            # peak EWMA: a slowdown is taken into account at once, a recovery gradually
+            endpoint.latency = latency
+        else:
+            # decays over time rather than over calls, so rarely called endpoints don't keep stale latency
+            weight = math.exp(-(now - endpoint.updated) / self.decay)
+            endpoint.latency = endpoint.latency * weight + latency * (1 - weight)
+        endpoint.updated = now
+        if not failed:
+            endpoint.failures = 0
+            return
+        endpoint.failures += 1
+        if endpoint.failures >= self.max_failures:
+            endpoint.ejected_until = now + self.ejection_time
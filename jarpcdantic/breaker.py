@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Client-side circuit breaker.
+
+`CircuitBreaker` is a `JarpcClient` middleware keeping a circuit per method (or any other key):
+- closed: calls pass, outcomes of recent calls are recorded;
+- open: too many recent calls failed or were slow, calls fail right away with `JarpcCircuitOpen`;
+- half-open: after `open_timeout` a few trial calls pass, their success closes the circuit, a failure opens it again.
+"""
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Iterable
+
+from .errors import (
+    ExceptionManager,
+    JarpcCircuitOpen,
+    JarpcError,
+    JarpcServerError,
+    jarpcdantic_exceptions,
+)
+from .format import JarpcRequest
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class _Circuit:
+    """State of one circuit."""
+
+    __slots__ = ("state", "outcomes", "failures", "slow_calls", "opened_at", "trials", "trial_successes")
+
+    def __init__(self, window: int):
+        self.state: str = CLOSED
+        # (failed, slow) of recent calls
+        self.outcomes: deque[tuple[bool, bool]] = deque(maxlen=window)
+        self.failures: int = 0
+        self.slow_calls: int = 0
+        self.opened_at: float = 0.0
+        self.trials: int = 0
+        self.trial_successes: int = 0
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while the called methods are failing.
+
+    Example:
+    ```
+    breaker = CircuitBreaker(failure_rate=0.5, slow_call_duration=1.0, open_timeout=10.0)
+    client = JarpcClient(transport, middlewares=[RetryPolicy(), breaker])
+    ```
+
+    Circuits are kept per method, pass `key` to group methods, e.g. per method prefix:
+    `CircuitBreaker(key=lambda request: request.method.rsplit(".", 1)[0])`.
+    """
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        slow_call_rate: float = 1.0,
+        slow_call_duration: float | None = None,
+        window: int = 100,
+        min_calls: int = 20,
+        open_timeout: float = 30.0,
+        half_open_calls: int = 3,
+        failure_codes: Iterable[int] | None = None,
+        exception_manager: ExceptionManager | None = None,
+        key: Callable[[JarpcRequest], str] | None = None,
+    ):
+        """
+        :param failure_rate: Share of failed calls among recent ones that opens the circuit.
+        :param slow_call_rate: Share of calls slower than `slow_call_duration` that opens the circuit.
+        :param slow_call_duration: Calls taking longer, in seconds, are slow. None disables the latency check.
+        :param window: Number of recent calls the rates are computed over.
+        :param min_calls: Rates are not checked until this many calls are recorded.
+        :param open_timeout: Time in seconds the circuit stays open before trial calls are let through.
+        :param half_open_calls: Number of trial calls; all of them must succeed to close the circuit.
+        :param failure_codes: Error codes counted as failures. Defaults to retryable codes of `exception_manager`
+                              and `JarpcServerError`: errors telling about the service, not about the request.
+        :param exception_manager: Registry of exceptions, `jarpcdantic_exceptions` by default.
+        :param key: Returns the circuit key of a request, the method name by default.
+        """
+        self.failure_rate: float = failure_rate
+        self.slow_call_rate: float = slow_call_rate
+        self.slow_call_duration: float | None = slow_call_duration
+        self.window: int = window
+        self.min_calls: int = min_calls
+        self.open_timeout: float = open_timeout
+        self.half_open_calls: int = half_open_calls
+        self.failure_codes: set[int] = (
+            set(failure_codes)
+            if failure_codes is not None
+            else (exception_manager or jarpcdantic_exceptions).retryable_codes() | {JarpcServerError.code}
+        )
+        self.key: Callable[[JarpcRequest], str] = key or (lambda request: request.method)
+        self._circuits: dict[str, _Circuit] = {}
+
+    def state(self, key: str) -> str:
+        """Returns the state of the circuit: "closed", "open" or "half_open"."""
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            return CLOSED
+        if circuit.state == OPEN and time.monotonic() - circuit.opened_at >= self.open_timeout:
+            return HALF_OPEN
+        return circuit.state
+
+    def states(self) -> dict[str, str]:
+        """Returns states of all known circuits."""
+        return {key: self.state(key) for key in self._circuits}
+
+    def reset(self, key: str | None = None) -> None:
+        """Closes the circuit, or all circuits if `key` is not given."""
+        if key is None:
+            self._circuits.clear()
+        else:
+            self._circuits.pop(key, None)
+
+    async def __call__(self, request: JarpcRequest, call_next: Callable[[JarpcRequest], Awaitable[Any]]) -> Any:
+        key = self.key(request)
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = _Circuit(self.window)
+        trial = self._admit(circuit, key)
+
+        started = time.monotonic()
+        try:
+            result = await call_next(request)
+        except JarpcError as e:
+            self._record(circuit, trial, e.code in self.failure_codes, time.monotonic() - started)
+            raise
+        except BaseException:
+            if trial:
+                circuit.trials -= 1
+            raise
+        self._record(circuit, trial, False, time.monotonic() - started)
+        return result
+
+    def _admit(self, circuit: _Circuit, key: str) -> bool:
+        """Raises `JarpcCircuitOpen` if the call may not pass, returns whether it is a trial call."""
+        if circuit.state == CLOSED:
+            return False
+        if circuit.state == OPEN:
+            if time.monotonic() - circuit.opened_at < self.open_timeout:
+                raise JarpcCircuitOpen({"circuit": key})
+            circuit.state = HALF_OPEN
+            circuit.trials = circuit.trial_successes = 0
+        if circuit.trials >= self.half_open_calls:
+            raise JarpcCircuitOpen({"circuit": key})
+        circuit.trials += 1
+        return True
+
+    def _record(self, circuit: _Circuit, trial: bool, failed: bool, duration: float) -> None:
+        slow = self.slow_call_duration is not None and duration > self.slow_call_duration
+        if trial:
+            if circuit.state != HALF_OPEN:
+                return
+            if failed or slow:
+                self._open(circuit)
+                return
+            circuit.trial_successes += 1
+            if circuit.trial_successes >= self.half_open_calls:
+                circuit.state = CLOSED
+            return
+
+        if circuit.state != CLOSED:
+            # a call admitted before the circuit opened
+            return
+        outcomes = circuit.outcomes
+        if len(outcomes) == outcomes.maxlen:
+            dropped_failed, dropped_slow = outcomes[0]
+            circuit.failures -= dropped_failed
+            circuit.slow_calls -= dropped_slow
+        outcomes.append((failed, slow))
+        circuit.failures += failed
+        circuit.slow_calls += slow
+        if len(outcomes) < self.min_calls:
+            return
+        if circuit.failures >= self.failure_rate * len(outcomes) or (
+            self.slow_call_duration is not None and circuit.slow_calls >= self.slow_call_rate * len(outcomes)
+        ):
+            self._open(circuit)
+
+    @staticmethod
+    def _open(circuit: _Circuit) -> None:
+        circuit.state = OPEN
+        circuit.opened_at = time.monotonic()
+        circuit.outcomes.clear()
+        circuit.failures = circuit.slow_calls = 0
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Client-side response cache.
+
+`ResponseCache` is a `JarpcClient` middleware caching results of selected methods by method name and
+canonical params. Entries are fresh for `ttl` seconds, then for `stale_ttl` more seconds the stale result
+is returned right away while it is refreshed in the background (stale-while-revalidate).
+Identical calls in flight are coalesced into one request.
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Container
+
+from pydantic_core import to_jsonable_python
+
+from .context import call_options_context_var
+from .format import JarpcRequest
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value: Any, fresh_until: float, stale_until: float):
+        self.value: Any = value
+        self.fresh_until: float = fresh_until
+        self.stale_until: float = stale_until
+
+
+def canonical_key(request: JarpcRequest) -> str:
+    """Returns the method name and params serialized with sorted keys."""
+    params = json.dumps(to_jsonable_python(request.params), sort_keys=True, separators=(",", ":"), default=str)
+    return f"{request.method}:{params}"
+
+
+class ResponseCache:
+    """
+    Caches results of idempotent methods.
+
+    Example:
+    ```
+    cache = ResponseCache(methods={"get_settings", "get_currency_rates"}, ttl=30.0, stale_ttl=300.0)
+    client = JarpcClient(transport, middlewares=[cache])
+    ```
+
+    Only successful results are cached. Cached values are shared between callers, do not modify them.
+    Meta is not part of the key: pass `key` if results depend on meta (e.g. on the user).
+    Calls with different `generic_response_type` or transport kwargs never share results.
+    """
+
+    def __init__(
+        self,
+        methods: Container[str],
+        ttl: float = 60.0,
+        stale_ttl: float = 0.0,
+        max_size: int = 1024,
+        key: Callable[[JarpcRequest], str] = canonical_key,
+    ):
+        """
+        :param methods: Methods whose results are cached, other calls pass through.
+        :param ttl: Seconds a result is fresh.
+        :param stale_ttl: Seconds after `ttl` the stale result is still returned while being refreshed.
+        :param max_size: Maximal number of entries, least recently used ones are evicted.
+        :param key: Returns the cache key of a request.
+        """
+        self.methods: Container[str] = methods
+        self.ttl: float = ttl
+        self.stale_ttl: float = stale_ttl
+        self.max_size: int = max_size
+        self.key: Callable[[JarpcRequest], str] = key
+        self.hits: int = 0
+        self.stale_hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self, method: str | None = None) -> None:
+        """Drops entries of the method (matched by the default key prefix), or all entries."""
+        if method is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key.startswith(f"{method}:")]:
+            del self._entries[key]
+
+    async def __call__(self, request: JarpcRequest, call_next: Callable[[JarpcRequest], Awaitable[Any]]) -> Any:
+        if not request.rsvp or request.method not in self.methods:
+            return await call_next(request)
+
+        key = self._call_key(request)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if now < entry.fresh_until:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if now < entry.stale_until:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    # refreshed in the background, nobody awaits it
+                    self._fetch(key, request, call_next).add_done_callback(_ignore_result)
+                return entry.value
+            del self._entries[key]
+
+        self.misses += 1
+        future = self._inflight.get(key) or self._fetch(key, request, call_next)
+        # a cancelled caller must not cancel the call other callers wait for
+        return await asyncio.shield(future)
+
+    def _call_key(self, request: JarpcRequest) -> str:
+        key = self.key(request)
+        response_type, transport_kwargs = call_options_context_var.get()
+        if response_type is Any and not transport_kwargs:
+            return key
+        # results are parsed by the call fetching them, calls parsing them differently must not share them
+        return f"{key}|{response_type!r}|{sorted(transport_kwargs.items())!r}"
+
+    def _fetch(
+        self, key: str, request: JarpcRequest, call_next: Callable[[JarpcRequest], Awaitable[Any]]
+    ) -> asyncio.Future:
+        task = asyncio.ensure_future(call_next(request))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._store(key, done))
+        return task
+
+    def _store(self, key: str, task: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        now = time.monotonic()
+        self._entries[key] = _Entry(task.result(), now + self.ttl, now + self.ttl + self.stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+def _ignore_result(task: asyncio.Future) -> None:
+    # retrieves the exception of a background refresh so that it is not reported as never retrieved
+    if not task.cancelled():
+        task.exception()
@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import time
 import uuid
-from typing import Any, Awaitable, Callable, Type, Iterable, Optional
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Hashable, Type, Iterable, Optional
 
 ClientMiddlewareFunc = Callable[
     ["JarpcRequest", Callable[["JarpcRequest"], Awaitable[Any]]],
@@ -10,7 +11,9 @@ ClientMiddlewareFunc = Callable[
 
 from pydantic import ValidationError
 
-from .context import meta_context_var
+from .codecs import JarpcCodec, json_codec
+from .compression import COMPRESSION_META_KEY, CompressionPolicy, decompress, is_compressed
+from .context import call_options_context_var, meta_context_var
 from .errors import (
     ExceptionManager,
     JarpcError,
@@ -18,7 +21,101 @@ from .errors import (
     JarpcServerError,
     jarpcdantic_exceptions,
 )
-from .format import JarpcRequest, JarpcResponse, RequestT, ResponseT
+from .format import JarpcRequest, JarpcResponse, RequestT, ResponseT, typed_request, typed_response
+from .gather import GatherResult, gather
+
+if TYPE_CHECKING:
+    from .outbox import Outbox
+
+
+class _CallBatcher:
+    """
+    Collects calls issued within `window` seconds (or up to `max_size` calls) into one batch.
+    Calls are grouped by their transport kwargs, every group is sent as one array of requests.
+    """
+
+    def __init__(self, client: "JarpcClient", window: float, max_size: int):
+        self.client: JarpcClient = client
+        self.window: float = window
+        self.max_size: int = max_size
+        self._pending: dict[Hashable, tuple[dict[str, Any], list[tuple[JarpcRequest, asyncio.Future]]]] = {}
+        self._timers: dict[Hashable, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, request: JarpcRequest, transport_kwargs: dict[str, Any]) -> dict[str, Any] | None:
+        """Queues the request and returns its response (as plain data) once the batch is answered."""
+        key = tuple(sorted(transport_kwargs.items()))
+        try:
+            hash(key)
+        except TypeError:
+            # kwargs cannot be compared, the call gets a batch of its own
+            key = object()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        _, batch = self._pending.setdefault(key, (transport_kwargs, []))
+        batch.append((request, future))
+        if len(batch) >= self.max_size:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+        return await future
+
+    def _flush(self, key: Hashable) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        transport_kwargs, batch = self._pending.pop(key, (None, None))
+        if batch:
+            task = asyncio.create_task(self._send(batch, transport_kwargs))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: list[tuple[JarpcRequest, asyncio.Future]], transport_kwargs: dict[str, Any]) -> None:
+        client = self.client
+        requests = [request for request, _ in batch]
+        try:
+            request_string = client.codec.encode_batch(requests, exclude_unset=True)
+            if client.compression is not None:
+                request_string = client._compress_request(request_string)
+            response_string = await client._transport(request_string, requests, **transport_kwargs)
+            responses = self._decode(response_string)
+        except BaseException as e:
+            # a cancelled flush must not leave its callers waiting forever
+            if isinstance(e, JarpcError):
+                error = e
+            else:
+                error = JarpcServerError(e if isinstance(e, Exception) else f"{type(e).__name__}: batch was not sent")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            if not isinstance(e, Exception):
+                raise
+            return
+
+        # a batch the server could not parse is answered with a single error without request id
+        batch_error = responses.get(None)
+        for request, future in batch:
+            if future.done():
+                continue
+            if not request.rsvp:
+                future.set_result(None)
+            elif request.id in responses or batch_error is not None:
+                future.set_result(responses.get(request.id, batch_error))
+            else:
+                future.set_exception(JarpcServerError(f"No response to request {request.id} in batch"))
+
+    def _decode(self, response_string: str | bytes | None) -> dict[str | None, dict[str, Any]]:
+        """Returns responses of the batch by request id."""
+        if response_string is None:
+            return {}
+        if is_compressed(response_string):
+            response_string = self.client._decompress_response(response_string)
+        responses = self.client.codec.loads(response_string)
+        if isinstance(responses, dict):
+            responses = [responses]
+        if not isinstance(responses, list) or not all(isinstance(response, dict) for response in responses):
+            raise ValueError("Batch response must be an array of responses")
+        return {response.get("request_id"): response for response in responses}
 
 
 class JarpcClient:
@@ -30,7 +127,9 @@ class JarpcClient:
     If rsvp is True, transport must return JARPC response string, otherwise transport may not return any result.
     Transport's exceptions will be overwritten with `JarpcServerError` unless they are `JarpcError` subclasses.
 
-    Example of usage with python "aiohttp" library:
+    For HTTP there is a built-in `HttpTransport` (jarpcdantic.http) keeping a pool of keep-alive connections.
+
+    Example of usage with python "aiohttp" library (note that a session per call means a new connection per call):
     ```
     async def aiohttp_transport(request_string, request, timeout=60.0):
         try:
@@ -65,6 +164,27 @@ class JarpcClient:
         salad = await kitchen(method='cook_salad', params=dict(name='Caesar'), request_id='1', timeout=15)
     ```
 
+    Transport may also define `send_request(request, **kwargs)` coroutine that gets JarpcRequest-object and
+    returns JarpcResponse-object (or None if rsvp is False). If it is defined, the client uses it instead of
+    `__call__` and skips JSON serialization of both request and response (see `LoopbackTransport`).
+
+    Requests are encoded with `codec` (JSON by default, then the request string is `str`; binary codecs give `bytes`).
+    If `codec` is not given, the client uses transport's `codec` attribute if there is one.
+
+    With a `compression` policy the client, once the server has advertised compression support, tells it
+    which compression algorithms it accepts and compresses requests above the policy threshold
+    (see `CompressionPolicy`). Without a policy compressed responses are rejected.
+
+    With `batch_window` set, calls issued within `batch_window` seconds (or up to `batch_size` calls)
+    are sent together as one batch (array) of requests; 0 batches calls issued in the same event loop
+    iteration. Transport then gets the batch string and the list of JarpcRequest-objects and must return
+    the array of responses (or None if all requests are notifications). Calls with different transport
+    kwargs go in different batches. Batching is not used with `send_request` transports.
+    Transports that can't send batches set `supports_batches = False`, `batch_window` is refused for them.
+
+    With an `outbox`, `durable=True` calls return None once their request is stored on disk,
+    and the outbox delivers it at least once (see `Outbox`).
+
     If you don't need to pass JARPC meta params and transport kwargs, you can use method-like calling syntax:
     ```
     salad = await kitchen.cook_salad(name='Caesar')
@@ -79,8 +199,28 @@ class JarpcClient:
         default_notification_ttl: float | None = None,
         exception_manager: ExceptionManager | None = None,
         middlewares: Iterable[ClientMiddlewareFunc] = None,
+        codec: JarpcCodec | None = None,
+        compression: CompressionPolicy | None = None,
+        batch_window: float | None = None,
+        batch_size: int = 100,
+        outbox: "Outbox | None" = None,
     ):
         self._transport = transport
+        self.codec: JarpcCodec = codec or getattr(transport, "codec", None) or json_codec
+        self.compression: CompressionPolicy | None = compression
+        self._peer_compression: list[str] | None = None
+        self._send_request = getattr(transport, "send_request", None)
+        batches_supported = self._send_request is not None or getattr(transport, "supports_batches", True)
+        if batch_window is not None and not batches_supported:
+            raise ValueError(f"{type(transport).__name__} does not support batches of requests")
+        self._batcher: _CallBatcher | None = (
+            _CallBatcher(self, batch_window, batch_size)
+            if batch_window is not None and self._send_request is None
+            else None
+        )
+        self.outbox: "Outbox | None" = outbox
+        if outbox is not None:
+            outbox.attach(self)
         self._default_rpc_ttl = default_rpc_ttl or default_ttl
         self._default_notification_ttl = default_notification_ttl or default_ttl
         self.exception_manager = exception_manager or jarpcdantic_exceptions
@@ -123,24 +263,35 @@ class JarpcClient:
         generic_response_type: type = Any,
         **transport_kwargs
     ):
-        combined_meta = (meta_context_var.get({}) or {}) | (meta or {})
         request: JarpcRequest = self._prepare_request(
-            method_name, params, ts, ttl, request_id, rsvp, durable, combined_meta
+            method_name, params, ts, ttl, request_id, rsvp, durable, meta, generic_request_type
         )
+        if durable and self.outbox is not None:
+            await self.outbox.put(request)
+            return None
         
         async def _endpoint_handler(req: JarpcRequest) -> JarpcResponse | None:
-            request_string = req.model_dump_json(exclude_unset=True)
             try:
-                response_string = await self._transport(
-                    request_string, req, **transport_kwargs
-                )
+                if self._send_request is not None:
+                    response_string = await self._send_request(req, **transport_kwargs)
+                elif self._batcher is not None:
+                    response_string = await self._batcher.submit(req, transport_kwargs)
+                else:
+                    request_string = self.codec.encode(req, exclude_unset=True)
+                    if self.compression is not None:
+                        request_string = self._compress_request(request_string)
+                    response_string = await self._transport(request_string, req, **transport_kwargs)
             except JarpcError:
                 raise
             except Exception as e:
                 raise JarpcServerError(e)
             return self._parse_response(response_string, req.rsvp, generic_response_type)
 
-        return await self._middleware_stack(request, _endpoint_handler)
+        options_token = call_options_context_var.set((generic_response_type, transport_kwargs))
+        try:
+            return await self._middleware_stack(request, _endpoint_handler)
+        finally:
+            call_options_context_var.reset(options_token)
 
     def __getattr__(self, name: str) -> Callable[..., Awaitable[Any]]:
         async def method_wrapper(*args, **kwargs) -> Any:
@@ -150,6 +301,31 @@ class JarpcClient:
 
         return method_wrapper
 
+    @staticmethod
+    async def gather(
+        calls: Iterable[Awaitable[Any]], concurrency: int | None = None, deadline: float | None = None
+    ) -> list[GatherResult]:
+        """
+        Runs many calls, possibly of different clients, with a concurrency cap and one shared deadline.
+        Returns per-call results or errors instead of failing fast, see `jarpcdantic.gather.gather`.
+        """
+        return await gather(calls, concurrency=concurrency, deadline=deadline)
+
+    @staticmethod
+    def warmup(response_types: Iterable[type] = (), request_types: Iterable[type] = ()) -> None:
+        """
+        Builds validators and serializers of typed requests and responses in advance,
+        so that the first calls after start do not pay for schema building.
+        Endpoints of `JarpcClientRouter` classes are warmed up when the router class is compiled.
+
+        :param response_types: Result types, as passed in `generic_response_type`.
+        :param request_types: Params types, as passed in `generic_request_type`.
+        """
+        for response_type in response_types:
+            typed_response(response_type)
+        for request_type in request_types:
+            typed_request(request_type)
+
     def simple_call(self, method_name: str, **params) -> Any:
         """Alias for `self.__call__`."""
         return self(method_name=method_name, params=params)
@@ -178,11 +354,16 @@ class JarpcClient:
             )
             ttl = default_ttl if ttl is None else ttl
 
-        context_meta = meta_context_var.get({})
+        context_meta = meta_context_var.get({}) or {}
         combined_meta = context_meta | (meta or {})
+        # negotiation is between this client and its server, a key received from upstream is not passed on
+        combined_meta.pop(COMPRESSION_META_KEY, None)
+        if self.compression is not None and (self._peer_compression or self.compression.compress_requests):
+            # servers that don't know the key would pass it to their own calls, so it is only sent to known ones
+            combined_meta[COMPRESSION_META_KEY] = self.compression.algorithms
 
         try:
-            request = JarpcRequest[generic_request_type](
+            request = typed_request(generic_request_type)(
                 method=method_name,
                 params=params,
                 ts=time.time() if ts is None else ts,
@@ -196,20 +377,49 @@ class JarpcClient:
 
         return request
 
+    def _decompress_response(self, response_string: bytes) -> bytes:
+        """Decompresses a response, compressed responses are only accepted with a compression policy."""
+        if self.compression is None:
+            raise ValueError("Compressed response, but compression is not enabled")
+        return decompress(response_string, self.compression.max_decompressed_size)
+
+    def _compress_request(self, request_string: str | bytes) -> str | bytes:
+        """Compresses a large request if the server is known (or assumed) to accept compression."""
+        policy = self.compression
+        if policy.compress_requests is False:
+            return request_string
+        accepted = policy.algorithms if policy.compress_requests else self._peer_compression
+        return policy.maybe_compress(request_string, policy.choose(accepted))
+
     def _parse_response(
         self,
-        response_string: str,
+        response_string: str | bytes | JarpcResponse | dict[str, Any] | None,
         rsvp: bool,
         generic_response_type: Type[ResponseT] = Any,
     ) -> ResponseT | None:
-        """Parse response and either return result or raise JARPC error."""
+        """
+        Parse response and either return result or raise JARPC error.
+        Response may also be a JarpcResponse-object given by an in-process transport
+        or plain data of one response from a batch.
+        """
         if rsvp:
             try:
-                response = JarpcResponse[generic_response_type].model_validate_json(
-                    response_string
-                )
-            except ValidationError as e:
+                if isinstance(response_string, JarpcResponse):
+                    response = typed_response(generic_response_type).model_validate(
+                        response_string.model_dump()
+                    )
+                elif isinstance(response_string, dict):
+                    response = typed_response(generic_response_type).model_validate(response_string)
+                else:
+                    if is_compressed(response_string):
+                        response_string = self._decompress_response(response_string)
+                    response = self.codec.decode(
+                        response_string, typed_response(generic_response_type)
+                    )
+            except ValueError as e:
                 raise JarpcServerError(e) from e
+            if self.compression is not None and response.meta and COMPRESSION_META_KEY in response.meta:
+                self._peer_compression = response.meta[COMPRESSION_META_KEY]
             if response.success:
                 return response.result
             else:
@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+"""
+Wire codecs shared by `JarpcClient` and `JarpcManager`.
+
+JSON is the default. `MsgpackCodec` is a compact binary alternative: floats take 9 bytes instead of
+up to 24 characters and bytes are sent as is instead of being escaped. It uses the `msgpack` package
+when it is installed and a pure Python implementation otherwise.
+"""
+import re
+import struct
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Sequence, Type, TypeVar
+
+from pydantic import BaseModel
+from pydantic_core import from_json, to_jsonable_python
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on environment
+    msgpack = None
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+_JSON_RESPONSE_ID = re.compile(rb'\s*\{\s*"request_id"\s*:\s*(null|"(?:[^"\\]|\\.)*")')
+
+
+class JarpcCodec(ABC):
+    """
+    Serializes JARPC requests and responses.
+
+    `name` identifies the codec, `content_type` is used by HTTP transports to negotiate it.
+    """
+
+    name: str = None
+    content_type: str = None
+
+    @abstractmethod
+    def encode(self, model: BaseModel, **dump_kwargs: Any) -> str | bytes:
+        """Serializes a request or a response, `dump_kwargs` are passed to pydantic dump methods."""
+
+    @abstractmethod
+    def encode_batch(self, models: Sequence[BaseModel], **dump_kwargs: Any) -> str | bytes:
+        """Serializes a batch (array) of requests or responses."""
+
+    @abstractmethod
+    def decode(self, data: str | bytes, model_type: Type[ModelT]) -> ModelT:
+        """Deserializes and validates a request or a response. Raises `ValueError` on invalid data."""
+
+    @abstractmethod
+    def loads(self, data: str | bytes) -> Any:
+        """Deserializes data into plain Python objects. Raises `ValueError` on invalid data."""
+
+    @abstractmethod
+    def is_batch(self, data: str | bytes) -> bool:
+        """Checks whether the data is a batch (array) of requests or responses."""
+
+    @abstractmethod
+    def detect(self, data: str | bytes) -> bool:
+        """Checks whether the data looks like it was encoded with this codec."""
+
+    def peek_response_id(self, head: bytes) -> str | None:
+        """
+        Reads the request id of a response from the first bytes of its encoding (`JarpcResponse` starts with it).
+        Raises `ValueError` if the id can't be read.
+        """
+        raise ValueError(f"{type(self).__name__} can't read request ids of partial responses")
+
+
+class JsonCodec(JarpcCodec):
+    """JSON codec, the default one. Encodes to `str` for compatibility with string transports."""
+
+    name = "json"
+    content_type = "application/json"
+
+    def encode(self, model: BaseModel, **dump_kwargs: Any) -> str:
+        return model.model_dump_json(**dump_kwargs)
+
+    def encode_batch(self, models: Sequence[BaseModel], **dump_kwargs: Any) -> str:
+        return "[" + ",".join(model.model_dump_json(**dump_kwargs) for model in models) + "]"
+
+    def decode(self, data: str | bytes, model_type: Type[ModelT]) -> ModelT:
+        return model_type.model_validate_json(data)
+
+    def loads(self, data: str | bytes) -> Any:
+        return from_json(data)
+
+    def is_batch(self, data: str | bytes) -> bool:
+        return self._head(data) in ("[", b"[")
+
+    def detect(self, data: str | bytes) -> bool:
+        return isinstance(data, str) or self._head(data) in (b"{", b"[")
+
+    def peek_response_id(self, head: bytes) -> str | None:
+        match = _JSON_RESPONSE_ID.match(head)
+        if match is None:
+            raise ValueError("Response does not start with its request id")
+        return from_json(match.group(1))
+
+    @staticmethod
+    def _head(data: str | bytes) -> str | bytes:
+        head = data[:1]
+        if head.isspace():
+            head = data.lstrip()[:1]
+        return head
+
+
+def _default(value: Any) -> Any:
+    converted = to_jsonable_python(value)
+    if type(converted) is type(value):
+        raise TypeError(f"Cannot serialize {type(value).__name__} to MessagePack")
+    return converted
+
+
+class MsgpackCodec(JarpcCodec):
+    """MessagePack codec."""
+
+    name = "msgpack"
+    content_type = "application/msgpack"
+
+    def __init__(self):
+        if msgpack is not None:
+            self._packb: Callable[[Any], bytes] = lambda obj: msgpack.packb(
+                obj, default=_default, use_bin_type=True
+            )
+            self._unpackb: Callable[[bytes], Any] = lambda data: msgpack.unpackb(
+                data, raw=False, strict_map_key=False
+            )
+        else:
+            self._packb = packb
+            self._unpackb = unpackb
+
+    def encode(self, model: BaseModel, **dump_kwargs: Any) -> bytes:
+        return self._packb(model.model_dump(**dump_kwargs))
+
+    def encode_batch(self, models: Sequence[BaseModel], **dump_kwargs: Any) -> bytes:
+        return self._packb([model.model_dump(**dump_kwargs) for model in models])
+
+    def decode(self, data: str | bytes, model_type: Type[ModelT]) -> ModelT:
+        return model_type.model_validate(self.loads(data))
+
+    def loads(self, data: str | bytes) -> Any:
+        if isinstance(data, str):
+            raise ValueError("MessagePack data must be bytes")
+        try:
+            return self._unpackb(data)
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Invalid MessagePack data: {e}") from e
+
+    def is_batch(self, data: str | bytes) -> bool:
+        return bool(data) and (0x90 <= data[0] <= 0x9F or data[0] in (0xDC, 0xDD))
+
+    def detect(self, data: str | bytes) -> bool:
+        return (
+            isinstance(data, (bytes, bytearray, memoryview))
+            and bool(data)
+            and (0x80 <= data[0] <= 0x9F or data[0] in (0xDC, 0xDD, 0xDE, 0xDF))
+        )
+
+    def peek_response_id(self, head: bytes) -> str | None:
+        data = memoryview(head)
+        try:
+            marker = data[0]
+            # the map header takes 1, 3 or 5 bytes, the first key follows
+            if 0x80 <= marker <= 0x8F:
+                position = 1
+            elif marker in (0xDE, 0xDF):
+                position = 3 if marker == 0xDE else 5
+            else:
+                raise ValueError("Response is not a MessagePack map")
+            key, position = _unpack(data, position)
+            if key != "request_id":
+                raise ValueError("Response does not start with its request id")
+            request_id, _ = _unpack(data, position)
+        except (IndexError, struct.error, TypeError) as e:
+            raise ValueError("Truncated MessagePack response") from e
+        if request_id is not None and not isinstance(request_id, str):
+            raise ValueError(f"Invalid request id: {request_id!r}")
+        return request_id
+
+
+# Pure Python MessagePack implementation, used when the `msgpack` package is not installed.
+
+_pack_float = struct.Struct(">d").pack
+
+
+def packb(obj: Any) -> bytes:
+    """Serializes an object to MessagePack."""
+    out = bytearray()
+    _pack(obj, out)
+    return bytes(out)
+
+
+def _pack_length(out: bytearray, size: int, fix_base: int | None, fix_max: int, markers: tuple[int, ...]) -> None:
+    if fix_base is not None and size <= fix_max:
+        out.append(fix_base | size)
+    elif size <= 0xFF and markers[0]:
+        out += bytes((markers[0], size))
+    elif size <= 0xFFFF:
+        out.append(markers[1])
+        out += size.to_bytes(2, "big")
+    elif size <= 0xFFFFFFFF:
+        out.append(markers[2])
+        out += size.to_bytes(4, "big")
+    else:
+        raise ValueError("Object is too large for MessagePack")
+
+
+def _pack(obj: Any, out: bytearray) -> None:
+    if obj is None:
+        out.append(0xC0)
+    elif obj is True:
+        out.append(0xC3)
+    elif obj is False:
+        out.append(0xC2)
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            out.append(obj)
+        elif -0x20 <= obj < 0:
+            out.append(obj & 0xFF)
+        elif obj > 0:
+            for marker, size in ((0xCC, 1), (0xCD, 2), (0xCE, 4), (0xCF, 8)):
+                if obj < 1 << (size * 8):
+                    out.append(marker)
+                    out += obj.to_bytes(size, "big")
+                    return
+            raise ValueError("Integer is too large for MessagePack")
+        else:
+            for marker, size in ((0xD0, 1), (0xD1, 2), (0xD2, 4), (0xD3, 8)):
+                if obj >= -(1 << (size * 8 - 1)):
+                    out.append(marker)
+                    out += obj.to_bytes(size, "big", signed=True)
+                    return
+            raise ValueError("Integer is too large for MessagePack")
+    elif isinstance(obj, float):
+        out.append(0xCB)
+        out += _pack_float(obj)
+    elif isinstance(obj, str):
+        data = obj.encode()
+        _pack_length(out, len(data), 0xA0, 0x1F, (0xD9, 0xDA, 0xDB))
+        out += data
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        _pack_length(out, len(obj), None, 0, (0xC4, 0xC5, 0xC6))
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        _pack_length(out, len(obj), 0x90, 0x0F, (0, 0xDC, 0xDD))
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, dict):
+        _pack_length(out, len(obj), 0x80, 0x0F, (0, 0xDE, 0xDF))
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    else:
+        _pack(_default(obj), out)
+
+
+_unpack_formats = {
+    0xCA: struct.Struct(">f"),
+    0xCB: struct.Struct(">d"),
+    0xCC: struct.Struct(">B"),
+    0xCD: struct.Struct(">H"),
+    0xCE: struct.Struct(">I"),
+    0xCF: struct.Struct(">Q"),
+    0xD0: struct.Struct(">b"),
+    0xD1: struct.Struct(">h"),
+    0xD2: struct.Struct(">i"),
+    0xD3: struct.Struct(">q"),
+}
+# marker: (kind, size of the length field)
+_unpack_sized = {
+    0xC4: ("bin", 1),
+    0xC5: ("bin", 2),
+    0xC6: ("bin", 4),
+    0xD9: ("str", 1),
+    0xDA: ("str", 2),
+    0xDB: ("str", 4),
+    0xDC: ("array", 2),
+    0xDD: ("array", 4),
+    0xDE: ("map", 2),
+    0xDF: ("map", 4),
+}
+
+
+def unpackb(data: bytes) -> Any:
+    """Deserializes one MessagePack object. Raises `ValueError` on invalid or trailing data."""
+    try:
+        obj, position = _unpack(memoryview(data), 0)
+    except (IndexError, struct.error) as e:
+        raise ValueError("Truncated MessagePack data") from e
+    except TypeError as e:
+        raise ValueError(f"Invalid MessagePack data: {e}") from e
+    if position != len(data):
+        raise ValueError("Extra data after MessagePack object")
+    return obj
+
+
+def _unpack(data: memoryview, position: int) -> tuple[Any, int]:
+    marker = data[position]
+    position += 1
+
+    if marker <= 0x7F:
+        return marker, position
+    if marker >= 0xE0:
+        return marker - 0x100, position
+    if 0xA0 <= marker <= 0xBF:
+        size = marker & 0x1F
+        return _read(data, position, size, "str")
+    if 0x90 <= marker <= 0x9F:
+        return _unpack_array(data, position, marker & 0x0F)
+    if 0x80 <= marker <= 0x8F:
+        return _unpack_map(data, position, marker & 0x0F)
+    if marker == 0xC0:
+        return None, position
+    if marker == 0xC2:
+        return False, position
+    if marker == 0xC3:
+        return True, position
+    if marker in _unpack_formats:
+        fmt = _unpack_formats[marker]
+        return fmt.unpack_from(data, position)[0], position + fmt.size
+    if marker in _unpack_sized:
+        kind, length_size = _unpack_sized[marker]
+        size = int.from_bytes(data[position : position + length_size], "big")
+        position += length_size
+        if kind == "array":
+            return _unpack_array(data, position, size)
+        if kind == "map":
+            return _unpack_map(data, position, size)
+        return _read(data, position, size, kind)
+    raise ValueError(f"Unsupported MessagePack type 0x{marker:02x}")
+
+
+def _read(data: memoryview, position: int, size: int, kind: str) -> tuple[str | bytes, int]:
+    end = position + size
+    if end > len(data):
+        raise IndexError
+    chunk = data[position:end]
+    return (str(chunk, "utf-8") if kind == "str" else bytes(chunk)), end
+
+
+def _unpack_array(data: memoryview, position: int, size: int) -> tuple[list, int]:
+    items = []
+    for _ in range(size):
+        item, position = _unpack(data, position)
+        items.append(item)
+    return items, position
+
+
+def _unpack_map(data: memoryview, position: int, size: int) -> tuple[dict, int]:
+    items = {}
+    for _ in range(size):
+        key, position = _unpack(data, position)
+        value, position = _unpack(data, position)
+        items[key] = value
+    return items, position
+
+
+json_codec = JsonCodec()
+msgpack_codec = MsgpackCodec()
+
+_codecs: dict[str, JarpcCodec] = {}
+
+
+def register_codec(codec: JarpcCodec) -> JarpcCodec:
+    """Makes the codec available by its name and content type in `get_codec`."""
+    _codecs[codec.name] = codec
+    _codecs[codec.content_type] = codec
+    return codec
+
+
+def get_codec(name: str) -> JarpcCodec | None:
+    """Returns a registered codec by its name or content type (parameters like charset are ignored)."""
+    return _codecs.get(name.split(";", 1)[0].strip().lower())
+
+
+register_codec(json_codec)
+register_codec(msgpack_codec)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Transparent compression of encoded requests and responses.
+
+A compressed payload is `b"\\x00"`, one byte naming the algorithm and the compressed data.
+Neither JSON nor MessagePack requests and responses can start with a zero byte, so compressed payloads
+are told apart from plain ones without any extra framing.
+
+Compression is negotiated through the `meta` key `COMPRESSION_META_KEY`: a manager with a `CompressionPolicy`
+lists algorithms it accepts in response meta; once a client with a policy has seen them, it lists algorithms
+it accepts in request meta and compresses large requests, and the manager compresses large responses only
+for such requests. So the key is never sent to peers that don't know it (they would pass it on to their own
+calls with the rest of meta). Peers without a policy never see compressed payloads and reject them.
+"""
+import zlib
+from typing import Sequence
+
+try:
+    import lzma
+except ImportError:  # pragma: no cover - Python built without lzma
+    lzma = None
+
+COMPRESSION_META_KEY = "jarpc_compression"
+COMPRESSED_MARKER = 0x00
+# a few times the default transport body limit, a payload expanding beyond it is a decompression bomb
+DEFAULT_MAX_DECOMPRESSED_SIZE = 64 * 1024 * 1024
+
+_algorithm_ids: dict[str, int] = {"zlib": ord("z"), "lzma": ord("x")}
+_algorithm_names: dict[int, str] = {value: key for key, value in _algorithm_ids.items()}
+
+
+def available_algorithms() -> list[str]:
+    """Returns compression algorithms supported by this Python build."""
+    return ["zlib", "lzma"] if lzma is not None else ["zlib"]
+
+
+def is_compressed(data: str | bytes | None) -> bool:
+    """Checks whether the payload is compressed."""
+    return isinstance(data, (bytes, bytearray)) and len(data) > 1 and data[0] == COMPRESSED_MARKER
+
+
+def compress(data: str | bytes, algorithm: str = "zlib", level: int | None = None) -> bytes:
+    """Compresses the payload and prepends the compression header."""
+    if isinstance(data, str):
+        data = data.encode()
+    if algorithm == "zlib":
+        compressed = zlib.compress(data, -1 if level is None else level)
+    elif algorithm == "lzma" and lzma is not None:
+        compressed = lzma.compress(data, preset=level)
+    else:
+        raise ValueError(f"Unsupported compression algorithm: {algorithm}")
+    return bytes((COMPRESSED_MARKER, _algorithm_ids[algorithm])) + compressed
+
+
+def _decompress(data: bytes, max_length: int | None) -> tuple[bytes, bool]:
+    """Returns up to `max_length` decompressed bytes and whether the compressed stream is complete."""
+    algorithm = _algorithm_names.get(data[1])
+    if algorithm == "zlib":
+        decompressor = zlib.decompressobj()
+        try:
+            return decompressor.decompress(data[2:], max_length or 0), decompressor.eof
+        except zlib.error as e:
+            raise ValueError(f"Invalid compressed payload: {e}") from e
+    if algorithm == "lzma" and lzma is not None:
+        decompressor = lzma.LZMADecompressor()
+        try:
+            return decompressor.decompress(data[2:], -1 if max_length is None else max_length), decompressor.eof
+        except (lzma.LZMAError, EOFError) as e:
+            raise ValueError(f"Invalid compressed payload: {e}") from e
+    raise ValueError(f"Unsupported compression algorithm id: {data[1]}")
+
+
+def decompress(data: bytes, max_size: int = DEFAULT_MAX_DECOMPRESSED_SIZE) -> bytes:
+    """
+    Decompresses a compressed payload. Raises `ValueError` on invalid data.
+
+    :param max_size: Maximal size of decompressed data, larger payloads are rejected. -1 means no limit.
+    """
+    decompressed, complete = _decompress(data, None if max_size < 0 else max_size + 1)
+    if 0 <= max_size < len(decompressed):
+        raise ValueError(f"Decompressed payload exceeds {max_size} bytes")
+    if not complete:
+        raise ValueError("Truncated compressed payload")
+    return decompressed
+
+
+def peek(data: bytes, size: int) -> bytes:
+    """Returns the first `size` bytes of the decompressed payload without decompressing all of it."""
+    try:
+        return _decompress(data, size)[0]
+    except ValueError:
+        return b""
+
+
+class CompressionPolicy:
+    """
+    When and how to compress payloads.
+
+    Example:
+    ```
+    policy = CompressionPolicy(threshold=32 * 1024, algorithms=("lzma", "zlib"))
+    client = JarpcClient(transport=transport, compression=policy)
+    manager = JarpcManager(dispatcher, compression=policy)
+    ```
+    """
+
+    def __init__(
+        self,
+        threshold: int = 64 * 1024,
+        algorithms: Sequence[str] = ("zlib",),
+        level: int | None = None,
+        compress_requests: bool | None = None,
+        max_decompressed_size: int = DEFAULT_MAX_DECOMPRESSED_SIZE,
+    ):
+        """
+        :param threshold: Payloads smaller than this number of bytes are sent as is.
+        :param algorithms: Accepted algorithms in order of preference, "zlib" and "lzma" are supported.
+        :param level: Compression level (zlib level or lzma preset), None means the algorithm default.
+        :param compress_requests: Client only: True compresses requests (and asks for compressed responses)
+                                  from the first call, False never compresses them,
+                                  None waits until the server advertises support.
+        :param max_decompressed_size: Larger decompressed payloads are rejected, -1 means no limit.
+        """
+        unsupported = set(algorithms) - set(available_algorithms())
+        if unsupported or not algorithms:
+            raise ValueError(f"Unsupported compression algorithms: {', '.join(sorted(unsupported)) or 'none given'}")
+        self.threshold: int = threshold
+        self.algorithms: list[str] = list(algorithms)
+        self.level: int | None = level
+        self.compress_requests: bool | None = compress_requests
+        self.max_decompressed_size: int = max_decompressed_size
+
+    def choose(self, accepted: Sequence[str] | None) -> str | None:
+        """Returns the most preferred algorithm accepted by the peer, None if there is none."""
+        if not accepted:
+            return None
+        for algorithm in self.algorithms:
+            if algorithm in accepted:
+                return algorithm
+        return None
+
+    def maybe_compress(self, data: str | bytes, algorithm: str | None) -> str | bytes:
+        """Compresses the payload with `algorithm` if it is given and the payload exceeds the threshold."""
+        if algorithm is None:
+            return data
+        # the threshold is in bytes, a str of the same length may take several times more
+        encoded = data.encode() if isinstance(data, str) else data
+        if len(encoded) < self.threshold:
+            return data
+        return compress(encoded, algorithm, self.level)
@@ -2,3 +2,5 @@ from contextvars import ContextVar
 from typing import Any
 
 meta_context_var: ContextVar[dict[str, Any]] = ContextVar("meta", default={})
+# `generic_response_type` and transport kwargs of the client call being made, for its middlewares
+call_options_context_var: ContextVar[tuple[Any, dict[str, Any]]] = ContextVar("call_options", default=(Any, {}))
@@ -40,6 +40,8 @@ class JarpcError(Exception):
 
     code: int = None
     message: str = None
+    # whether sending the same request again may succeed, see `ExceptionManager.retryable_codes`
+    retryable: bool = False
     error: Any | None= None
     _data: JarpcErrorModel = None
 
@@ -108,6 +110,10 @@ class ExceptionManager:
         """Retrieves an exception class by its error code."""
         return self._exceptions.get(code)
 
+    def retryable_codes(self) -> set[int]:
+        """Returns codes of registered exceptions marked as `retryable`."""
+        return {code for code, exception_class in self._exceptions.items() if exception_class.retryable}
+
     def raise_exception(
         self, code: int, data: str | None = None, message: str | None = None
     ) -> None:
@@ -179,6 +185,7 @@ class JarpcTimeout(JarpcError):
 
     code = -32604
     message = "Timeout"
+    retryable = True
 
 
 @jarpcdantic_exceptions.add
@@ -189,6 +196,15 @@ class JarpcServerError(JarpcError):
     message = "Server error"
 
 
+@jarpcdantic_exceptions.add
+class JarpcShuttingDown(JarpcError):
+    """Shutting down: server is draining and does not accept new requests."""
+
+    code = -32001
+    message = "Server is shutting down"
+    retryable = True
+
+
 # Should be thrown in dispatch methods.
 
 # 1xxx - Access errors
@@ -233,3 +249,20 @@ class JarpcExternalServiceUnavailable(JarpcError):
 
     code = 3000
     message = "External service unavailable"
+    retryable = True
+
+
+@jarpcdantic_exceptions.add
+class JarpcCircuitOpen(JarpcError):
+    """CircuitOpen: the call was rejected locally because the circuit breaker of the method is open"""
+
+    code = 3001
+    message = "Circuit is open"
+
+
+@jarpcdantic_exceptions.add
+class JarpcRateLimited(JarpcError):
+    """RateLimited: the call was rejected locally because the client rate or in-flight limit is exceeded"""
+
+    code = 3002
+    message = "Rate limit exceeded"
@@ -39,9 +39,10 @@ class JarpcRequest(BaseModel, Generic[RequestT]):
 class JarpcResponse(BaseModel, Generic[ResponseT]):
     """JARPC response model."""
 
+    # encoded first, so the waiting call can be found from the head of a compressed response
+    request_id: str | None = None
     result: ResponseT | None = None
     error: Any | None = None
-    request_id: str | None = None
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     meta: dict[str, Any] | None = None
 
@@ -55,3 +56,33 @@ class JarpcResponse(BaseModel, Generic[ResponseT]):
     def success(self) -> bool:
         """Returns True if there was no error in the response."""
         return self.error is None
+
+
+_typed_requests: dict[Any, type[JarpcRequest]] = {}
+_typed_responses: dict[Any, type[JarpcResponse]] = {}
+
+
+def typed_request(params_type: Any) -> type[JarpcRequest]:
+    """
+    Returns `JarpcRequest[params_type]`, parametrized (and its validator and serializer built) only once.
+    Pydantic's own generic lookup is noticeably slower than a dict lookup, especially for unions.
+    """
+    try:
+        return _typed_requests[params_type]
+    except KeyError:
+        typed = _typed_requests[params_type] = JarpcRequest[params_type]
+        return typed
+    except TypeError:
+        # unhashable type, e.g. `Annotated` with unhashable metadata
+        return JarpcRequest[params_type]
+
+
+def typed_response(result_type: Any) -> type[JarpcResponse]:
+    """Returns `JarpcResponse[result_type]`, parametrized only once (see `typed_request`)."""
+    try:
+        return _typed_responses[result_type]
+    except KeyError:
+        typed = _typed_responses[result_type] = JarpcResponse[result_type]
+        return typed
+    except TypeError:
+        return JarpcResponse[result_type]
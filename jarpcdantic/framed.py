@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+Length-prefixed framing over TCP and Unix sockets.
+
+Every frame is a 4-byte big-endian payload length followed by the payload (a JARPC request or response).
+Requests on one connection are processed concurrently and responses are written as soon as they are ready,
+so the client correlates them by `JarpcRequest.id` and may pipeline any number of calls over one connection.
+"""
+import asyncio
+import logging
+import struct
+import time
+from collections import deque
+
+from pydantic import BaseModel
+
+from .codecs import JarpcCodec, json_codec
+from .compression import is_compressed, peek
+from .errors import JarpcExternalServiceUnavailable, JarpcTimeout
+from .format import JarpcRequest
+from .manager import JarpcManager
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct("!I")
+DEFAULT_MAX_FRAME_SIZE = 16 * 1024 * 1024
+# decompressed bytes read to find the request id of a compressed response, enough for ids up to ~200 characters
+_ID_PEEK_SIZE = 256
+
+
+class FrameTooLarge(ValueError):
+    """Frame length exceeds the allowed maximum."""
+
+
+async def read_frame(reader: asyncio.StreamReader, max_frame_size: int = DEFAULT_MAX_FRAME_SIZE) -> bytes:
+    """Reads one frame payload. Raises `asyncio.IncompleteReadError` if the stream ends."""
+    (size,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    if size > max_frame_size:
+        raise FrameTooLarge(f"Frame of {size} bytes exceeds limit of {max_frame_size} bytes")
+    return await reader.readexactly(size)
+
+
+def pack_frame(payload: bytes) -> bytes:
+    """Prepends the length header to the payload."""
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+class JarpcStreamServer:
+    """
+    Asyncio server feeding a `JarpcManager` from length-prefixed frames.
+
+    Example:
+    ```
+    server = JarpcStreamServer(manager)
+    await server.start(host="0.0.0.0", port=9000)  # or server.start(path="/run/kitchen.sock")
+    await server.serve_forever()
+    ```
+    """
+
+    def __init__(
+        self,
+        manager: JarpcManager,
+        max_frame_size: int = DEFAULT_MAX_FRAME_SIZE,
+        max_pipelined: int = 1024,
+    ):
+        """
+        :param manager: Manager processing requests.
+        :param max_frame_size: Connections sending larger frames are closed.
+        :param max_pipelined: Number of requests processed concurrently per connection,
+                              reading from the connection pauses while the limit is reached.
+        """
+        self.manager: JarpcManager = manager
+        self.max_frame_size: int = max_frame_size
+        self.max_pipelined: int = max_pipelined
+        self._server: asyncio.AbstractServer | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._connections_total: int = 0
+        self._requests_total: int = 0
+
+    @property
+    def sockets(self) -> tuple:
+        """Listening sockets of the started server."""
+        return tuple(self._server.sockets) if self._server else ()
+
+    def stats(self) -> dict[str, int]:
+        """Returns open and total connections, total received frames and requests being processed."""
+        return {
+            "connections": len(self._writers),
+            "connections_total": self._connections_total,
+            "requests_total": self._requests_total,
+            "inflight": self.manager.inflight,
+        }
+
+    async def start(
+        self,
+        host: str | None = None,
+        port: int | None = None,
+        *,
+        path: str | None = None,
+        **server_kwargs,
+    ) -> asyncio.AbstractServer:
+        """
+        Starts listening on a TCP `host`/`port` or on a Unix socket `path`.
+        `server_kwargs` are passed to `asyncio.start_server`/`asyncio.start_unix_server` (e.g. `sock`, `ssl`).
+        """
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=path, **server_kwargs)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port, **server_kwargs)
+        return self._server
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self, timeout: float | None = None) -> None:
+        """Stops accepting connections, drains the manager and closes open connections."""
+        if self._server is not None:
+            self._server.close()
+        await self.manager.shutdown(timeout=timeout)
+        for writer in list(self._writers):
+            writer.close()
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        self._connections_total += 1
+        slots = asyncio.Semaphore(self.max_pipelined)
+        tasks: set[asyncio.Task] = set()
+        try:
+            while True:
+                payload = await read_frame(reader, self.max_frame_size)
+                self._requests_total += 1
+                await slots.acquire()
+                task = asyncio.create_task(self._process(payload, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: slots.release())
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except FrameTooLarge as e:
+            logger.warning(f"Closing connection: {e}")
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _process(self, payload: bytes, writer: asyncio.StreamWriter) -> None:
+        response = await self.manager.handle(payload)
+        if response is None or writer.is_closing():
+            return
+        writer.write(pack_frame(response.encode() if isinstance(response, str) else response))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+class _ResponseId(BaseModel):
+    """Part of a JARPC response needed to find the waiting call."""
+
+    request_id: str | None = None
+
+
+class FramedTransport:
+    """
+    `JarpcClient` transport over one persistent length-prefixed TCP or Unix socket connection.
+
+    Calls are pipelined: any number of requests can be in flight at once, responses are matched
+    to callers by request id. The connection is opened on the first call and reopened after it is lost.
+    The server answers with the codec of the request, `codec` tells `JarpcClient` which one to use.
+
+    Batches of requests are not supported: calls are pipelined anyway.
+
+    A call waits for its response no longer than `timeout` and never past the request deadline (`ts + ttl`):
+    the server sends nothing back for requests that expire.
+
+    Example:
+    ```
+    transport = FramedTransport(host="kitchen.svc", port=9000)
+    kitchen = JarpcClient(transport=transport)
+    salad = await kitchen.cook_salad(name="Caesar")
+    await transport.aclose()
+    ```
+    """
+
+    # responses are matched to calls one by one, an array response would match none of them
+    supports_batches = False
+
+    def __init__(
+        self,
+        host: str | None = None,
+        port: int | None = None,
+        *,
+        path: str | None = None,
+        max_frame_size: int = DEFAULT_MAX_FRAME_SIZE,
+        connect_timeout: float | None = 10.0,
+        timeout: float | None = 60.0,
+        codec: JarpcCodec = json_codec,
+        **connection_kwargs,
+    ):
+        """
+        :param host: TCP host.
+        :param port: TCP port.
+        :param path: Unix socket path, used instead of `host`/`port`.
+        :param max_frame_size: Responses larger than this close the connection.
+        :param connect_timeout: Connection establishment timeout in seconds.
+        :param timeout: Default time in seconds a call waits for its response, None means no limit.
+        :param codec: Wire codec of requests and responses.
+        :param connection_kwargs: Passed to `asyncio.open_connection`/`asyncio.open_unix_connection`.
+        """
+        self.host: str | None = host
+        self.port: int | None = port
+        self.path: str | None = path
+        self.max_frame_size: int = max_frame_size
+        self.connect_timeout: float | None = connect_timeout
+        self.timeout: float | None = timeout
+        self.codec: JarpcCodec = codec
+        self._connection_kwargs: dict = connection_kwargs
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._connect_lock: asyncio.Lock = asyncio.Lock()
+        self._pending: dict[str, deque[asyncio.Future]] = {}
+
+    async def __call__(self, request_string: str | bytes, request: JarpcRequest, timeout: float | None = None):
+        writer = await self._connect()
+        payload = request_string.encode() if isinstance(request_string, str) else request_string
+
+        if not request.rsvp:
+            writer.write(pack_frame(payload))
+            await writer.drain()
+            return None
+
+        future = asyncio.get_running_loop().create_future()
+        waiters = self._pending.setdefault(request.id, deque())
+        waiters.append(future)
+        try:
+            writer.write(pack_frame(payload))
+            await writer.drain()
+            if writer.is_closing() and not future.done():
+                raise JarpcExternalServiceUnavailable(ConnectionResetError("Connection closed"))
+            return await asyncio.wait_for(future, self._wait_timeout(request, timeout))
+        except asyncio.TimeoutError:
+            raise JarpcTimeout
+        finally:
+            if future in waiters:
+                waiters.remove(future)
+            if not waiters:
+                self._pending.pop(request.id, None)
+
+    def _wait_timeout(self, request: JarpcRequest, timeout: float | None) -> float | None:
+        """Returns how long to wait for the response: the call or default timeout, bounded by the deadline."""
+        timeout = self.timeout if timeout is None else timeout
+        if request.ttl is not None:
+            remaining = max(0.0, request.ts + request.ttl - time.time())
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    async def aclose(self) -> None:
+        """Closes the connection, pending calls fail with `JarpcExternalServiceUnavailable`."""
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+
+    async def _connect(self) -> asyncio.StreamWriter:
+        if self._writer is not None and not self._writer.is_closing():
+            return self._writer
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return self._writer
+            try:
+                if self.path is not None:
+                    connect = asyncio.open_unix_connection(self.path, **self._connection_kwargs)
+                else:
+                    connect = asyncio.open_connection(self.host, self.port, **self._connection_kwargs)
+                reader, self._writer = await asyncio.wait_for(connect, self.connect_timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                raise JarpcExternalServiceUnavailable(e) from e
+            self._reader_task = asyncio.create_task(self._read_responses(reader, self._writer))
+            return self._writer
+
+    def _fail_unmatched(self, payload: bytes) -> None:
+        """
+        Handles a response without request id: the server could not parse one of the requests.
+        It is given to the only pending call; with several calls pending the culprit is unknown,
+        they fail by their timeouts.
+        """
+        waiters = [waiter for waiters in self._pending.values() for waiter in waiters if not waiter.done()]
+        if len(waiters) == 1:
+            waiters[0].set_result(payload)
+        else:
+            logger.warning(f"Response without request id while {len(waiters)} calls are pending")
+
+    async def _read_responses(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        error: Exception = ConnectionResetError("Connection closed")
+        try:
+            while True:
+                payload = await read_frame(reader, self.max_frame_size)
+                try:
+                    if is_compressed(payload):
+                        # only the head is expanded: the client decompresses the response, if its policy allows
+                        request_id = self.codec.peek_response_id(peek(payload, _ID_PEEK_SIZE))
+                    else:
+                        request_id = self.codec.decode(payload, _ResponseId).request_id
+                except ValueError:
+                    logger.warning(f"Dropping malformed response frame of {len(payload)} bytes")
+                    continue
+                if request_id is None:
+                    self._fail_unmatched(payload)
+                    continue
+                for waiter in self._pending.get(request_id, ()):
+                    if not waiter.done():
+                        waiter.set_result(payload)
+                        break
+        except (asyncio.IncompleteReadError, ConnectionError, FrameTooLarge) as e:
+            error = e
+        finally:
+            writer.close()
+            if self._writer is writer:
+                self._writer = None
+            for waiters in self._pending.values():
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(JarpcExternalServiceUnavailable(error))
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Scatter-gather of many calls with a concurrency cap and one shared deadline.
+
+Unlike `asyncio.gather` it never fails fast: every call gets its own result or error,
+calls still running when the deadline passes are cancelled and reported as `JarpcTimeout`.
+"""
+import asyncio
+import inspect
+from typing import Awaitable, Generic, Iterable, TypeVar
+
+from .errors import JarpcTimeout
+
+T = TypeVar("T")
+
+
+class GatherResult(Generic[T]):
+    """Outcome of one call: `value` if it succeeded, `error` otherwise."""
+
+    __slots__ = ("value", "error")
+
+    def __init__(self, value: T | None = None, error: BaseException | None = None):
+        self.value: T | None = value
+        self.error: BaseException | None = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def unwrap(self) -> T:
+        """Returns the value or raises the error."""
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    def __repr__(self):
+        return f"<GatherResult value {self.value}>" if self.ok else f"<GatherResult error {self.error!r}>"
+
+
+async def gather(
+    calls: Iterable[Awaitable[T]],
+    concurrency: int | None = None,
+    deadline: float | None = None,
+) -> list[GatherResult[T]]:
+    """
+    Runs calls (e.g. `client.get_price(sku=sku)` coroutines, possibly of different clients)
+    and returns their results in the same order.
+
+    Example:
+    ```
+    results = await gather((kitchen.cook(name=name) for name in names), concurrency=10, deadline=2.0)
+    salads = [result.value for result in results if result.ok]
+    ```
+
+    :param calls: Awaitables to run. Coroutines are started only when a concurrency slot is free.
+    :param concurrency: Maximal number of calls running at once, None means no limit.
+    :param deadline: Seconds after which unfinished calls are cancelled, None means no deadline.
+    :return: Result of every call; calls that did not finish in time get `JarpcTimeout` error.
+    """
+    calls = list(calls)
+    results: list[GatherResult[T]] = [GatherResult(error=JarpcTimeout()) for _ in calls]
+    if not calls:
+        return results
+    pending_calls = iter(enumerate(calls))
+
+    async def worker() -> None:
+        for index, call in pending_calls:
+            try:
+                results[index] = GatherResult(value=await call)
+            except Exception as e:
+                results[index] = GatherResult(error=e)
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency or len(calls), len(calls)))]
+    try:
+        await asyncio.wait(workers, timeout=deadline)
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        # calls that never started
+        for _, call in pending_calls:
+            if inspect.iscoroutine(call):
+                call.close()
+            elif isinstance(call, asyncio.Future):
+                call.cancel()
+    return results
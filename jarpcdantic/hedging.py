@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Hedged requests.
+
+`HedgedTransport` wraps a transport: when a call of an idempotent method has not been answered within
+a high percentile of that method's recent latency, the same request is sent once more (to another transport
+or to the same one) and the first response wins. A small share of duplicated calls cuts the latency tail
+caused by a slow server, connection or GC pause.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Container
+
+from .format import JarpcRequest
+
+Transport = Callable[..., Awaitable[Any]]
+
+
+class _LatencyWindow:
+    """Recent latencies of one method and their cached percentile."""
+
+    __slots__ = ("samples", "percentile", "delay", "_fresh")
+
+    def __init__(self, size: int, percentile: float):
+        self.samples: deque[float] = deque(maxlen=size)
+        self.percentile: float = percentile
+        self.delay: float | None = None
+        self._fresh: int = 0
+
+    def add(self, latency: float, min_samples: int) -> None:
+        self.samples.append(latency)
+        self._fresh += 1
+        # sorting the window on every call is wasteful, the percentile moves slowly
+        if len(self.samples) >= min_samples and (self.delay is None or self._fresh >= 16):
+            ordered = sorted(self.samples)
+            self.delay = ordered[min(int(len(ordered) * self.percentile), len(ordered) - 1)]
+            self._fresh = 0
+
+
+class HedgedTransport:
+    """
+    Transport sending a second copy of slow calls of idempotent methods.
+
+    Example:
+    ```
+    transport = HedgedTransport(HttpTransport(url), idempotent_methods={"get_menu", "get_price"})
+    kitchen = JarpcClient(transport=transport)
+    ```
+
+    Both copies carry the same request id. Calls that are not idempotent, notifications and calls
+    made while the hedge budget is exhausted are passed to the primary transport as is.
+    """
+
+    def __init__(
+        self,
+        primary: Transport,
+        idempotent_methods: Container[str],
+        secondary: Transport | None = None,
+        percentile: float = 0.95,
+        window: int = 1000,
+        min_samples: int = 20,
+        max_hedge_ratio: float = 0.05,
+        min_delay: float = 0.0,
+    ):
+        """
+        :param primary: Transport of the first copy.
+        :param idempotent_methods: Methods safe to call twice.
+        :param secondary: Transport of the second copy, the primary one by default.
+        :param percentile: Latency percentile of the method after which the second copy is sent.
+        :param window: Number of recent latencies kept per method.
+        :param min_samples: Calls are not hedged until this many latencies of the method are known.
+        :param max_hedge_ratio: Maximal share of hedged calls: every call adds this many tokens to the
+                                hedge budget (up to 10), every hedge takes one.
+        :param min_delay: Lower bound of the hedge delay, in seconds.
+        """
+        self.primary: Transport = primary
+        self.secondary: Transport = secondary or primary
+        self.idempotent_methods: Container[str] = idempotent_methods
+        self.percentile: float = percentile
+        self.window: int = window
+        self.min_samples: int = min_samples
+        self.max_hedge_ratio: float = max_hedge_ratio
+        self.min_delay: float = min_delay
+        self.codec = getattr(primary, "codec", None)
+        self.supports_batches: bool = all(
+            getattr(transport, "supports_batches", True) for transport in (self.primary, self.secondary)
+        )
+        self.calls: int = 0
+        self.hedges: int = 0
+        self._budget: float = 1.0
+        self._latencies: dict[str, _LatencyWindow] = {}
+
+    def hedge_delay(self, method: str) -> float | None:
+        """Returns the current hedge delay of the method, None while there are too few samples."""
+        latencies = self._latencies.get(method)
+        if latencies is None or latencies.delay is None:
+            return None
+        return max(latencies.delay, self.min_delay)
+
+    async def __call__(self, request_string: str | bytes, request: JarpcRequest, **kwargs: Any) -> Any:
+        if not isinstance(request, JarpcRequest) or not request.rsvp or request.method not in self.idempotent_methods:
+            return await self.primary(request_string, request, **kwargs)
+
+        self.calls += 1
+        self._budget = min(self._budget + self.max_hedge_ratio, 10.0)
+        started = time.monotonic()
+        delay = self.hedge_delay(request.method)
+        first = asyncio.ensure_future(self.primary(request_string, request, **kwargs))
+        tasks = {first}
+        try:
+            if delay is not None and self._budget >= 1:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    self._budget -= 1
+                    self.hedges += 1
+                    tasks.add(asyncio.ensure_future(self.secondary(request_string, request, **kwargs)))
+            result = await self._first_response(tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        self._record(request.method, time.monotonic() - started)
+        return result
+
+    @staticmethod
+    async def _first_response(tasks: set[asyncio.Future]) -> Any:
+        """Returns the first successful result; if all copies fail, raises the error of the first one."""
+        pending = set(tasks)
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+        raise error
+
+    def _record(self, method: str, latency: float) -> None:
+        latencies = self._latencies.get(method)
+        if latencies is None:
+            latencies = self._latencies[method] = _LatencyWindow(self.window, self.percentile)
+        latencies.add(latency, self.min_samples)
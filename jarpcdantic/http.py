@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Dependency-free HTTP/1.1 client transport with a pool of keep-alive connections.
+
+Every call borrows a connection from the pool, writes the request head and body with one `write`
+and returns the connection to the pool once the response is read, so connection (and TLS) setup
+is paid once per connection instead of once per call.
+"""
+import asyncio
+import ssl as ssl_module
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+from .codecs import JarpcCodec, json_codec
+from .errors import JarpcExternalServiceUnavailable, JarpcServerError, JarpcTimeout
+from .format import JarpcRequest
+
+DEFAULT_MAX_RESPONSE_SIZE = 16 * 1024 * 1024
+
+
+class _Connection:
+    """Pooled connection."""
+
+    __slots__ = ("reader", "writer", "released_at", "reused", "closed")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader: asyncio.StreamReader = reader
+        self.writer: asyncio.StreamWriter = writer
+        self.released_at: float = time.monotonic()
+        self.reused: bool = False
+        self.closed: bool = False
+
+    @property
+    def healthy(self) -> bool:
+        """False if the connection is known to be closed by either side."""
+        return not self.writer.is_closing() and not self.reader.at_eof()
+
+    def close(self) -> None:
+        self.closed = True
+        self.writer.close()
+
+
+class _StaleConnection(Exception):
+    """A reused connection was closed by the server before it answered."""
+
+
+class HttpTransport:
+    """
+    `JarpcClient` transport POSTing requests over pooled keep-alive HTTP/1.1 connections.
+
+    Example:
+    ```
+    transport = HttpTransport("https://kitchen.svc/jsonrpc", max_connections=50)
+    kitchen = JarpcClient(transport=transport)
+    salad = await kitchen.cook_salad(name="Caesar", timeout=5.0)
+    await transport.aclose()
+    ```
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        max_connections: int = 100,
+        idle_timeout: float = 30.0,
+        connect_timeout: float | None = 10.0,
+        timeout: float | None = 60.0,
+        headers: dict[str, str] | None = None,
+        codec: JarpcCodec = json_codec,
+        ssl: ssl_module.SSLContext | None = None,
+        max_response_size: int = DEFAULT_MAX_RESPONSE_SIZE,
+    ):
+        """
+        :param url: Endpoint URL, http or https.
+        :param max_connections: Maximal number of open connections, further calls wait for a free one.
+        :param idle_timeout: Idle connections older than this are closed instead of being reused, in seconds.
+                             Keep it below the server's keep-alive timeout.
+        :param connect_timeout: Connection establishment timeout in seconds.
+        :param timeout: Default time in seconds to wait for a response, None means no limit. The wait never
+                        outlasts the request deadline (`ts + ttl`).
+        :param headers: Extra headers sent with every request.
+        :param codec: Wire codec of requests and responses, also sets Content-Type.
+        :param ssl: SSL context for https, the default context is used if not given.
+        :param max_response_size: Larger responses are rejected.
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {parts.scheme}")
+        self.url: str = url
+        self.host: str = parts.hostname
+        self.port: int = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl: ssl_module.SSLContext | None = (
+            (ssl or ssl_module.create_default_context()) if parts.scheme == "https" else None
+        )
+        self.max_connections: int = max_connections
+        self.idle_timeout: float = idle_timeout
+        self.connect_timeout: float | None = connect_timeout
+        self.timeout: float | None = timeout
+        self.codec: JarpcCodec = codec
+        self.max_response_size: int = max_response_size
+
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        host_header = parts.netloc.rsplit("@", 1)[-1]
+        head_lines = [
+            f"POST {path} HTTP/1.1",
+            f"Host: {host_header}",
+            f"Content-Type: {codec.content_type}",
+            f"Accept: {codec.content_type}",
+            *(f"{name}: {value}" for name, value in (headers or {}).items()),
+        ]
+        # the request head without Content-Length, which is the only part changing between calls
+        self._head: bytes = ("\r\n".join(head_lines) + "\r\nContent-Length: ").encode("latin-1")
+
+        self._idle: deque[_Connection] = deque()
+        self._slots: asyncio.Semaphore = asyncio.Semaphore(max_connections)
+        self._open: int = 0
+        self._connections_total: int = 0
+        self._requests_total: int = 0
+        self._closed: bool = False
+
+    def stats(self) -> dict[str, int]:
+        """Returns open, idle and total connections and total requests."""
+        return {
+            "connections": self._open,
+            "idle": len(self._idle),
+            "connections_total": self._connections_total,
+            "requests_total": self._requests_total,
+        }
+
+    async def __call__(
+        self, request_string: str | bytes, request: JarpcRequest | list[JarpcRequest], timeout: float | None = None
+    ) -> bytes | None:
+        if self._closed:
+            raise RuntimeError("HttpTransport is closed")
+        body = request_string.encode() if isinstance(request_string, str) else request_string
+        payload = b"".join((self._head, str(len(body)).encode(), b"\r\n\r\n", body))
+        try:
+            return await asyncio.wait_for(self._send(payload), self._wait_timeout(request, timeout))
+        except asyncio.TimeoutError:
+            raise JarpcTimeout
+
+    def _wait_timeout(self, request: JarpcRequest | list[JarpcRequest], timeout: float | None) -> float | None:
+        """Returns how long to wait for the response: the call or default timeout, bounded by the deadline."""
+        timeout = self.timeout if timeout is None else timeout
+        requests = request if isinstance(request, list) else [request]
+        if requests and all(request.ttl is not None for request in requests):
+            # a batch is answered at once, it is worth waiting for while any of its requests is alive
+            remaining = max(0.0, max(request.ts + request.ttl for request in requests) - time.time())
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    async def aclose(self) -> None:
+        """
+        Closes idle connections, further calls raise RuntimeError.
+        Connections in use are closed when their calls complete.
+        """
+        self._closed = True
+        while self._idle:
+            self._close(self._idle.popleft())
+
+    async def _send(self, payload: bytes) -> bytes | None:
+        async with self._slots:
+            connection = await self._acquire()
+            try:
+                self._requests_total += 1
+                try:
+                    status, body, keep_alive = await self._exchange(connection, payload)
+                except _StaleConnection:
+                    # the server closed the idle connection while we were sending, it did not see the request
+                    self._close(connection)
+                    connection = await self._connect()
+                    status, body, keep_alive = await self._exchange(connection, payload)
+            except BaseException:
+                self._close(connection)
+                raise
+            self._release(connection, keep_alive)
+
+        if status == 204:
+            return None
+        if status == 200:
+            return body
+        if status in (502, 503, 504):
+            raise JarpcExternalServiceUnavailable(f"HTTP {status}")
+        raise JarpcServerError(f"HTTP {status}: {body[:200]!r}")
+
+    async def _acquire(self) -> _Connection:
+        now = time.monotonic()
+        while self._idle:
+            connection = self._idle.pop()
+            if connection.healthy and now - connection.released_at < self.idle_timeout:
+                connection.reused = True
+                return connection
+            self._close(connection)
+        return await self._connect()
+
+    def _release(self, connection: _Connection, keep_alive: bool) -> None:
+        if self._closed or not keep_alive or not connection.healthy:
+            self._close(connection)
+            return
+        connection.released_at = time.monotonic()
+        self._idle.append(connection)
+        # the oldest connections are at the left end, evict the expired ones
+        while self._idle and connection.released_at - self._idle[0].released_at >= self.idle_timeout:
+            self._close(self._idle.popleft())
+
+    async def _connect(self) -> _Connection:
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(
+                    self.host, self.port, ssl=self.ssl, server_hostname=self.host if self.ssl else None
+                ),
+                self.connect_timeout,
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise JarpcExternalServiceUnavailable(e) from e
+        self._open += 1
+        self._connections_total += 1
+        return _Connection(reader, writer)
+
+    def _close(self, connection: _Connection) -> None:
+        # the writer of a connection closed by the server is closing already, it is counted as open until discarded
+        if not connection.closed:
+            connection.close()
+            self._open -= 1
+
+    async def _exchange(self, connection: _Connection, payload: bytes) -> tuple[int, bytes, bool]:
+        """Sends the request and reads the response. Returns status, body and whether to keep the connection."""
+        reader = connection.reader
+        try:
+            connection.writer.write(payload)
+            await connection.writer.drain()
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError as e:
+                if connection.reused and not e.partial:
+                    raise _StaleConnection from e
+                raise
+            status, headers = self._parse_head(head)
+
+            if headers.get("transfer-encoding", "").lower() == "chunked":
+                body = await self._read_chunked(reader)
+            elif "content-length" in headers:
+                length = int(headers["content-length"])
+                if length > self.max_response_size:
+                    raise JarpcServerError(f"Response of {length} bytes exceeds {self.max_response_size} bytes")
+                body = await reader.readexactly(length)
+            elif status in (204, 304) or 100 <= status < 200:
+                body = b""
+            else:
+                # body delimited by the end of the connection
+                body = await reader.read(self.max_response_size + 1)
+                if len(body) > self.max_response_size:
+                    raise JarpcServerError(f"Response exceeds {self.max_response_size} bytes")
+                return status, body, False
+        except (ConnectionResetError, BrokenPipeError) as e:
+            if connection.reused:
+                raise _StaleConnection from e
+            raise JarpcExternalServiceUnavailable(e) from e
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, OSError, ValueError) as e:
+            raise JarpcExternalServiceUnavailable(e) from e
+
+        keep_alive = headers.get("connection", "").lower() != "close"
+        return status, body, keep_alive
+
+    @staticmethod
+    def _parse_head(head: bytes) -> tuple[int, dict[str, str]]:
+        lines = head.decode("latin-1").split("\r\n")
+        version, status, *_ = lines[0].split(" ", 2)
+        if not version.startswith("HTTP/1."):
+            raise ValueError(f"Unsupported protocol: {version}")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        return int(status), headers
+
+    async def _read_chunked(self, reader: asyncio.StreamReader) -> bytes:
+        chunks = []
+        size = 0
+        while True:
+            chunk_size = int((await reader.readuntil(b"\r\n")).split(b";", 1)[0], 16)
+            if chunk_size == 0:
+                # skip trailers
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass
+                return b"".join(chunks)
+            size += chunk_size
+            if size > self.max_response_size:
+                raise JarpcServerError(f"Response exceeds {self.max_response_size} bytes")
+            chunks.append(await reader.readexactly(chunk_size))
+            await reader.readexactly(2)
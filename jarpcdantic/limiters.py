@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrency limiters for `JarpcManager`.
+
+Every limiter is an async context manager, so it can be passed in `JarpcManager(limiters=...)`
+or `JarpcManager(method_limiters=...)` next to a plain `asyncio.Semaphore`.
+"""
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Hashable, Mapping
+
+from .context import meta_context_var
+from .errors import JarpcTimeout
+
+
+class _FairQueueKey:
+    """Queue and counters of a single fair queuing key."""
+
+    __slots__ = ("weight", "limit", "active", "finish_tag", "queue")
+
+    def __init__(self, weight: float, limit: int | None):
+        self.weight: float = weight
+        self.limit: int | None = limit
+        self.active: int = 0
+        self.finish_tag: float = 0.0
+        self.queue: deque[tuple[float, asyncio.Future]] = deque()
+
+    @property
+    def saturated(self) -> bool:
+        return self.limit is not None and self.active >= self.limit
+
+
+class FairQueueLimiter:
+    """
+    Weighted fair queuing limiter keyed by a request `meta` field.
+
+    Requests share `concurrency` slots. When all slots are taken, waiting requests are queued per key
+    (tenant, client id, ...) and admitted in start-time fair queuing order, so every key gets a share
+    of slots proportional to its weight regardless of how many requests it has queued.
+    A key may also be capped with its own concurrency limit.
+
+    Example:
+    ```
+    limiter = FairQueueLimiter(concurrency=100, key="tenant", weights={"premium": 4}, key_limits={"batch": 10})
+    manager = JarpcManager(dispatcher, limiters=[limiter])
+    ```
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        key: str | Callable[[dict[str, Any]], Hashable],
+        weights: Mapping[Hashable, float] | None = None,
+        default_weight: float = 1.0,
+        key_limits: Mapping[Hashable, int] | None = None,
+        default_key_limit: int | None = None,
+    ):
+        """
+        :param concurrency: Total number of requests executed at the same time.
+        :param key: Name of the `meta` field or function that extracts the key from `meta`.
+        :param weights: Per-key weights, keys without weight get `default_weight`.
+        :param default_weight: Weight of keys missing in `weights`.
+        :param key_limits: Per-key concurrency caps, keys without cap get `default_key_limit`.
+        :param default_key_limit: Concurrency cap of keys missing in `key_limits`, None means no cap.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be positive")
+        if default_weight <= 0 or any(weight <= 0 for weight in (weights or {}).values()):
+            raise ValueError("weights must be positive")
+        self.concurrency: int = concurrency
+        self.weights: dict[Hashable, float] = dict(weights or {})
+        self.default_weight: float = default_weight
+        self.key_limits: dict[Hashable, int] = dict(key_limits or {})
+        self.default_key_limit: int | None = default_key_limit
+        self._key_getter: Callable[[dict[str, Any]], Hashable] = (
+            key if callable(key) else (lambda meta: meta.get(key))
+        )
+        self._keys: dict[Hashable, _FairQueueKey] = {}
+        self._waiting_keys: dict[Hashable, _FairQueueKey] = {}
+        self._active: int = 0
+        self._virtual_time: float = 0.0
+        self._held_key: ContextVar[Hashable] = ContextVar(f"fair_queue_key_{id(self)}")
+
+    @property
+    def active(self) -> int:
+        """Number of requests holding a slot."""
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for a slot."""
+        return sum(len(state.queue) for state in self._waiting_keys.values())
+
+    def stats(self) -> dict[Hashable, dict[str, Any]]:
+        """Returns per-key counters: active and queued requests, weight and concurrency cap."""
+        return {
+            key: {
+                "active": state.active,
+                "queued": len(state.queue),
+                "weight": state.weight,
+                "limit": state.limit,
+            }
+            for key, state in self._keys.items()
+        }
+
+    async def __aenter__(self) -> "FairQueueLimiter":
+        key = self._key_getter(meta_context_var.get() or {})
+        state = self._keys.get(key)
+        if state is None:
+            state = self._keys[key] = _FairQueueKey(
+                weight=self.weights.get(key, self.default_weight),
+                limit=self.key_limits.get(key, self.default_key_limit),
+            )
+
+        start_tag = max(self._virtual_time, state.finish_tag)
+        state.finish_tag = start_tag + 1.0 / state.weight
+        item = (start_tag, asyncio.get_running_loop().create_future())
+        state.queue.append(item)
+        self._waiting_keys[key] = state
+        self._dispatch()
+
+        try:
+            await item[1]
+        except asyncio.CancelledError:
+            if item[1].done() and not item[1].cancelled():
+                self._release(key, state)
+            else:
+                state.queue.remove(item)
+                if not state.queue:
+                    self._waiting_keys.pop(key, None)
+                self._forget_if_idle(key, state)
+            raise
+
+        self._held_key.set(key)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        key = self._held_key.get()
+        self._release(key, self._keys[key])
+
+    def _dispatch(self) -> None:
+        """Admits waiting requests with the smallest start tag while there are free slots."""
+        while self._active < self.concurrency:
+            best_key, best_state = None, None
+            for key, state in self._waiting_keys.items():
+                if state.saturated:
+                    continue
+                if best_state is None or state.queue[0][0] < best_state.queue[0][0]:
+                    best_key, best_state = key, state
+            if best_state is None:
+                return
+
+            start_tag, future = best_state.queue.popleft()
+            if not best_state.queue:
+                del self._waiting_keys[best_key]
+            best_state.active += 1
+            self._active += 1
+            self._virtual_time = max(self._virtual_time, start_tag)
+            future.set_result(None)
+
+    def _release(self, key: Hashable, state: _FairQueueKey) -> None:
+        state.active -= 1
+        self._active -= 1
+        self._dispatch()
+        self._forget_if_idle(key, state)
+
+    def _forget_if_idle(self, key: Hashable, state: _FairQueueKey) -> None:
+        """Drops state of keys without requests, so stats don't grow with every key ever seen."""
+        if not state.active and not state.queue:
+            self._keys.pop(key, None)
+
+
+class AdaptiveLimiter(ABC):
+    """
+    Base class of concurrency limiters that adjust their limit from observed latency.
+
+    Up to `limit` requests run at the same time, the rest wait in FIFO order.
+    Every finished request reports its round trip time to `_update`, which recalculates the limit.
+    Subclasses implement the particular algorithm.
+    """
+
+    def __init__(self, initial_limit: int = 20, min_limit: int = 1, max_limit: int = 1000):
+        """
+        :param initial_limit: Limit before any latency is observed.
+        :param min_limit: Lower bound of the limit.
+        :param max_limit: Upper bound of the limit.
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("limits must satisfy 1 <= min_limit <= initial_limit <= max_limit")
+        self.min_limit: int = min_limit
+        self.max_limit: int = max_limit
+        self._limit: float = float(initial_limit)
+        self._inflight: int = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        # a stack, so that nested entries of the same limiter in one context don't overwrite each other
+        self._started_at: ContextVar[tuple[float, ...]] = ContextVar(f"adaptive_limiter_start_{id(self)}", default=())
+
+    @property
+    def limit(self) -> int:
+        """Current concurrency limit."""
+        return int(self._limit)
+
+    @property
+    def inflight(self) -> int:
+        """Number of requests holding a slot."""
+        return self._inflight
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for a slot."""
+        return len(self._waiters)
+
+    async def __aenter__(self) -> "AdaptiveLimiter":
+        if self._inflight < self.limit and not self._waiters:
+            self._inflight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._inflight -= 1
+                    self._wake()
+                else:
+                    self._waiters.remove(waiter)
+                raise
+        self._started_at.set(self._started_at.get() + (time.monotonic(),))
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        started_at = self._started_at.get()
+        self._started_at.set(started_at[:-1])
+        rtt = time.monotonic() - started_at[-1]
+        if exc_type is None or not issubclass(exc_type, asyncio.CancelledError):
+            dropped = exc_type is not None and issubclass(exc_type, (TimeoutError, JarpcTimeout))
+            limit = self._update(rtt, self._inflight, dropped)
+            if exc_type is not None:
+                # a failing backend must not earn a higher limit
+                limit = min(limit, self._limit)
+            self._limit = min(max(limit, self.min_limit), self.max_limit)
+        self._inflight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._inflight < self.limit:
+            self._inflight += 1
+            self._waiters.popleft().set_result(None)
+
+    @abstractmethod
+    def _update(self, rtt: float, inflight: int, dropped: bool) -> float:
+        """
+        Calculates the new limit.
+
+        :param rtt: Duration of the finished request in seconds.
+        :param inflight: Number of requests in flight when it finished, including itself.
+        :param dropped: Whether the request failed with a timeout.
+        :return: New limit, it is clamped to `min_limit` and `max_limit` afterwards.
+        """
+
+
+class AIMDLimiter(AdaptiveLimiter):
+    """
+    Additive increase, multiplicative decrease limiter.
+
+    The limit grows by `increase` after every successful request while the limiter is at least half used
+    and is multiplied by `backoff_ratio` after a timeout or a request slower than `latency_threshold`.
+
+    Example:
+    ```
+    manager = JarpcManager(dispatcher, limiters=[AIMDLimiter(initial_limit=50, latency_threshold=0.5)])
+    ```
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 1000,
+        latency_threshold: float | None = None,
+        backoff_ratio: float = 0.9,
+        increase: float = 1.0,
+    ):
+        """
+        :param latency_threshold: Requests slower than this number of seconds decrease the limit.
+        :param backoff_ratio: Multiplier applied to the limit on overload, between 0 and 1.
+        :param increase: Addition to the limit after a successful request.
+        """
+        super().__init__(initial_limit, min_limit, max_limit)
+        if not 0 < backoff_ratio < 1:
+            raise ValueError("backoff_ratio must be between 0 and 1")
+        self.latency_threshold: float | None = latency_threshold
+        self.backoff_ratio: float = backoff_ratio
+        self.increase: float = increase
+
+    def _update(self, rtt: float, inflight: int, dropped: bool) -> float:
+        if dropped or (self.latency_threshold is not None and rtt > self.latency_threshold):
+            return self._limit * self.backoff_ratio
+        if inflight * 2 >= self._limit:
+            return self._limit + self.increase
+        return self._limit
+
+
+class GradientLimiter(AdaptiveLimiter):
+    """
+    Latency gradient limiter in the spirit of TCP Vegas.
+
+    Compares the latency of every request with a long-term average. While latency stays within
+    `rtt_tolerance` of the average, the limit grows by `queue_size`; when requests start queueing
+    and latency rises, the limit shrinks proportionally to the gradient.
+
+    Example:
+    ```
+    limiter = GradientLimiter(initial_limit=50)
+    manager = JarpcManager(dispatcher, method_limiters={"reports.build": [limiter]})
+    ```
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 1000,
+        rtt_tolerance: float = 1.5,
+        smoothing: float = 0.2,
+        long_window: int = 600,
+        queue_size: int = 4,
+    ):
+        """
+        :param rtt_tolerance: Latency growth over the long-term average that is not treated as queueing.
+        :param smoothing: Weight of the newly calculated limit, between 0 and 1.
+        :param long_window: Number of requests the long-term latency average is taken over.
+        :param queue_size: Headroom added to the limit for the limit to grow.
+        """
+        super().__init__(initial_limit, min_limit, max_limit)
+        if rtt_tolerance < 1:
+            raise ValueError("rtt_tolerance must be at least 1")
+        self.rtt_tolerance: float = rtt_tolerance
+        self.smoothing: float = smoothing
+        self.queue_size: int = queue_size
+        self._long_rtt_factor: float = 2 / (long_window + 1)
+        self._long_rtt: float | None = None
+
+    def _update(self, rtt: float, inflight: int, dropped: bool) -> float:
+        if self._long_rtt is None:
+            self._long_rtt = rtt
+        else:
+            self._long_rtt += (rtt - self._long_rtt) * self._long_rtt_factor
+            if self._long_rtt > rtt * 2:
+                # latency dropped for good, let the average catch up faster
+                self._long_rtt *= 0.95
+
+        if dropped:
+            return self._limit * 0.5
+        if inflight * 2 < self._limit or rtt <= 0:
+            # not enough load to judge the limit
+            return self._limit
+
+        gradient = max(0.5, min(1.0, self.rtt_tolerance * self._long_rtt / rtt))
+        new_limit = self._limit * gradient + self.queue_size
+        return self._limit * (1 - self.smoothing) + new_limit * self.smoothing
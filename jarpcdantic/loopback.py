@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from .format import JarpcRequest, JarpcResponse
+from .manager import JarpcManager
+
+
+class LoopbackTransport:
+    """
+    In-process `JarpcClient` transport for a client and a `JarpcManager` running in the same process.
+
+    Requests and responses are handed over as objects, so nothing is serialized to JSON or parsed back.
+    The manager still validates the request and the client still validates the result against
+    the expected type, so validation and errors stay the same as over a network transport.
+
+    Example:
+    ```
+    kitchen = JarpcClient(transport=LoopbackTransport(manager))
+    salad = await kitchen.cook_salad(name="Caesar")
+    ```
+    """
+
+    def __init__(self, manager: JarpcManager):
+        self.manager: JarpcManager = manager
+
+    async def send_request(self, request: JarpcRequest, **kwargs) -> JarpcResponse | None:
+        return await self.manager.get_response(request.model_dump(exclude_unset=True))
+
+    async def __call__(self, request_string: str | bytes, request: JarpcRequest, **kwargs) -> str | None:
+        return await self.manager.handle(request_string)
@@ -3,18 +3,26 @@ import asyncio
 import inspect
 import logging
 from collections import deque
-from typing import Any, Iterable, Optional, Callable, Awaitable, AsyncContextManager, Sequence
+from contextlib import AsyncExitStack
+from typing import Any, Iterable, Optional, Callable, Awaitable, AsyncContextManager, Mapping, Sequence
 
 MiddlewareFunc = Callable[
     ["JarpcRequest", Callable[["JarpcRequest"], Awaitable[Optional["JarpcResponse"]]]],
     Awaitable[Optional["JarpcResponse"]]
 ]
 
-from pydantic_core import ValidationError
-
+from .codecs import JarpcCodec, json_codec, msgpack_codec
+from .compression import COMPRESSION_META_KEY, CompressionPolicy, decompress, is_compressed, peek
 from .context import meta_context_var
 from .dispatcher import JarpcDispatcher
-from .errors import JarpcError, JarpcInvalidParams, JarpcParseError, JarpcServerError
+from .errors import (
+    JarpcError,
+    JarpcInvalidParams,
+    JarpcInvalidRequest,
+    JarpcParseError,
+    JarpcServerError,
+    JarpcShuttingDown,
+)
 from .format import JarpcRequest, JarpcResponse
 from .utils import convert_params_to_models, process_return_value
 
@@ -120,6 +128,9 @@ class JarpcManager:
         run_sync_in_thread: bool = True,
         middlewares: Iterable[MiddlewareFunc] = None,
         limiters: Sequence[AsyncContextManager] = None,
+        method_limiters: Mapping[str, Sequence[AsyncContextManager]] = None,
+        codecs: Sequence[JarpcCodec] = None,
+        compression: CompressionPolicy | None = None,
     ):
         self.dispatcher: JarpcDispatcher = dispatcher
         self.context: dict[str, Any] = (
@@ -127,10 +138,32 @@ class JarpcManager:
         )  # per-manager context cannot contain jarpc_request
         self.run_sync_in_thread: bool = run_sync_in_thread
         self._background_tasks: set[asyncio.Task] = set()
+        # tasks processing a request right now; `shutdown` may cancel them
+        self._inflight: set[asyncio.Task] = set()
+        # tasks cancelled by a timed out drain, their requests are answered with `JarpcShuttingDown`
+        self._drain_cancelled: set[asyncio.Task] = set()
+        self._idle: asyncio.Event = asyncio.Event()
+        self._idle.set()
+        self._draining: bool = False
         self.middlewares: list[MiddlewareFunc] = list(middlewares) if middlewares else []
         self.limiters: Sequence[AsyncContextManager] = limiters or []
+        self.method_limiters: Mapping[str, Sequence[AsyncContextManager]] = method_limiters or {}
+        # accepted wire codecs, the first one is used when the codec of a request cannot be detected
+        self.codecs: list[JarpcCodec] = list(codecs) if codecs else [json_codec, msgpack_codec]
+        # compresses large responses to clients that accept compression, see `CompressionPolicy`
+        self.compression: CompressionPolicy | None = compression
         self._middleware_stack = self._build_middleware_stack()
 
+    @property
+    def draining(self) -> bool:
+        """True once `shutdown` was called: new requests are rejected with `JarpcShuttingDown`."""
+        return self._draining
+
+    @property
+    def inflight(self) -> int:
+        """Number of requests being processed, not counting RSVP=False background tasks."""
+        return len(self._inflight)
+
     def middleware(self, func: MiddlewareFunc) -> MiddlewareFunc:
         """Decorator to add a middleware function."""
         self.middlewares.append(func)
@@ -152,33 +185,123 @@ class JarpcManager:
             return await middleware(request, next_call)
         return wrapped
 
-    async def handle(self, request: str) -> str | None:
-        response: JarpcResponse = await self.get_response(request)
-        return response.model_dump_json() if response else None
-
-    async def get_response(self, request_string: str) -> JarpcResponse | None:
+    def detect_codec(self, request: str | bytes) -> JarpcCodec:
+        """Returns the accepted codec the request is encoded with."""
+        if is_compressed(request):
+            request = peek(request, 64)
+        for codec in self.codecs:
+            if codec.detect(request):
+                return codec
+        return self.codecs[0]
+
+    async def handle(self, request: str | bytes, codec: JarpcCodec | None = None) -> str | bytes | None:
+        """
+        Processes a request or a batch (array) of requests.
+        Returns a response, an array of responses or None if there is nothing to answer.
+        The response is encoded with `codec`, by default with the codec the request is encoded with.
+        Compressed requests are decompressed, responses are compressed according to `compression`.
+        Without `compression` compressed requests are rejected: nobody was offered compression.
+        """
+        codec = codec or self.detect_codec(request)
+        if is_compressed(request):
+            try:
+                if self.compression is None:
+                    raise ValueError("Compressed request, but compression is not enabled")
+                request = decompress(request, self.compression.max_decompressed_size)
+            except ValueError as e:
+                logger.debug(e, exc_info=True)
+                return codec.encode(JarpcResponse(error=JarpcParseError().as_dict()))
+        if codec.is_batch(request):
+            responses, accepted = await self._get_batch_response(request, codec)
+            return self._compress_response(codec.encode_batch(responses), accepted) if responses else None
+        response, accepted = await self._get_response(request, codec)
+        return self._compress_response(codec.encode(response), accepted) if response else None
+
+    def _compress_response(self, response_string: str | bytes, accepted: Sequence[str] | None) -> str | bytes:
+        if self.compression is None:
+            return response_string
+        return self.compression.maybe_compress(response_string, self.compression.choose(accepted))
+
+    async def get_batch_response(
+        self, request_string: str | bytes, codec: JarpcCodec | None = None
+    ) -> list[JarpcResponse]:
+        """Processes an array of requests concurrently. Notifications get no response."""
+        return (await self._get_batch_response(request_string, codec))[0]
+
+    async def _get_batch_response(
+        self, request_string: str | bytes, codec: JarpcCodec | None = None
+    ) -> tuple[list[JarpcResponse], list[str] | None]:
+        """Returns responses and compression algorithms accepted by every request of the batch."""
+        try:
+            requests = self._parse_batch_or_raise(request_string, codec)
+        except JarpcError as e:
+            logger.debug(e, exc_info=True)
+            return [JarpcResponse(error=e.as_dict())], None
+        results = await asyncio.gather(*(self._get_response(request) for request in requests))
+        accepted = results[0][1]
+        if any(result[1] != accepted for result in results):
+            accepted = None
+        return [response for response, _ in results if response is not None], accepted
+
+    async def get_response(
+        self, request_string: str | bytes | dict[str, Any], codec: JarpcCodec | None = None
+    ) -> JarpcResponse | None:
+        return (await self._get_response(request_string, codec))[0]
+
+    async def _get_response(
+        self, request_string: str | bytes | dict[str, Any], codec: JarpcCodec | None = None
+    ) -> tuple[JarpcResponse | None, list[str] | None]:
+        """Returns the response and compression algorithms accepted by the client."""
         request_id: str | None = None
         context_token = None
         rsvp = True
+        accepted: list[str] | None = None
 
         try:
-            request = self._parse_request_or_raise(request_string)
+            request = self._parse_request_or_raise(request_string, codec)
             request_id = request.id
             rsvp = request.rsvp
+            if request.meta and COMPRESSION_META_KEY in request.meta:
+                # negotiation is between this client and this manager, it must not leak to nested calls
+                accepted = request.meta.pop(COMPRESSION_META_KEY)
             context_token = meta_context_var.set(request.meta)
 
-            return await self._middleware_stack(request)
+            if self._draining:
+                raise JarpcShuttingDown()
+
+            # the request runs in the task of the caller (a connection handler, or the client under
+            # LoopbackTransport): a timed out drain cancels it, and the cancellation is withdrawn here
+            task = asyncio.current_task()
+            owner = task not in self._inflight
+            if owner:
+                self._inflight.add(task)
+                self._idle.clear()
+            try:
+                response = await self._middleware_stack(request)
+            except asyncio.CancelledError:
+                if task not in self._drain_cancelled:
+                    raise
+                self._drain_cancelled.discard(task)
+                if task.uncancel() > 0:
+                    # cancelled by someone else as well
+                    raise
+                raise JarpcShuttingDown()
+            finally:
+                if owner:
+                    self._forget_inflight(task)
 
         except asyncio.CancelledError:
             raise
 
         except JarpcError as e:
             logger.debug(e, exc_info=True)
-            return JarpcResponse(request_id=request_id, error=e.as_dict()) if rsvp else None
+            if request_id is None:
+                request_id = self._recover_request_id(request_string, codec)
+            response = JarpcResponse(request_id=request_id, error=e.as_dict()) if rsvp else None
 
         except Exception as e:
             logger.exception(e)
-            return JarpcResponse(
+            response = JarpcResponse(
                 request_id=request_id,
                 error=JarpcServerError(e).as_dict()
             ) if rsvp else None
@@ -187,6 +310,20 @@ class JarpcManager:
             if context_token is not None:
                 meta_context_var.reset(context_token)
 
+        if response is not None and self.compression is not None:
+            # advertised to every client, clients only ask for compression once they have seen it
+            response.meta = (response.meta or {}) | {COMPRESSION_META_KEY: self.compression.algorithms}
+        return response, accepted
+
+    def _forget_inflight(self, task: asyncio.Task) -> None:
+        self._inflight.discard(task)
+        if task in self._drain_cancelled:
+            # the request finished before the cancellation reached it, the caller must not get it later
+            self._drain_cancelled.discard(task)
+            task.uncancel()
+        if not self._inflight:
+            self._idle.set()
+
     async def _endpoint_handler(self, request: JarpcRequest) -> JarpcResponse | None:
         if request.expired:
             logger.warning(f"Request arrived too late: {request}")
@@ -208,18 +345,42 @@ class JarpcManager:
 
         return JarpcResponse(request_id=request.id, result=result)
 
-    def _parse_request_or_raise(self, request_string: str) -> JarpcRequest:
+    def _parse_request_or_raise(
+        self, request_string: str | bytes | dict[str, Any], codec: JarpcCodec | None = None
+    ) -> JarpcRequest:
         try:
-            return JarpcRequest.model_validate_json(request_string)
-        except ValidationError:
+            if isinstance(request_string, (str, bytes, bytearray)):
+                codec = codec or self.detect_codec(request_string)
+                return codec.decode(request_string, JarpcRequest)
+            return JarpcRequest.model_validate(request_string)
+        except ValueError:
             raise JarpcParseError()
 
+    def _recover_request_id(
+        self, request_string: str | bytes | dict[str, Any], codec: JarpcCodec | None = None
+    ) -> str | None:
+        """Returns the id of an invalid request if it can be read, so that the client can match the error."""
+        try:
+            if isinstance(request_string, (str, bytes, bytearray)):
+                request_string = (codec or self.detect_codec(request_string)).loads(request_string)
+        except ValueError:
+            return None
+        request_id = request_string.get("id") if isinstance(request_string, dict) else None
+        return request_id if isinstance(request_id, str) else None
+
+    def _parse_batch_or_raise(self, request_string: str | bytes, codec: JarpcCodec | None = None) -> list[Any]:
+        try:
+            requests = (codec or self.detect_codec(request_string)).loads(request_string)
+        except ValueError:
+            raise JarpcParseError()
+        if not isinstance(requests, list) or not requests:
+            raise JarpcInvalidRequest()
+        return requests
+
     async def _execute_request_method(self, method, request: JarpcRequest) -> Any:
         try:
-            from contextlib import AsyncExitStack
             async with AsyncExitStack() as stack:
-                for limiter in self.limiters:
-                    await stack.enter_async_context(limiter)
+                await self._enter_limiters(stack, request)
                 return await self._call_method(method, request)
         except TypeError:
             is_call_ok, explanation = check_function_call(
@@ -230,6 +391,13 @@ class JarpcManager:
             logger.debug(f"Wrong signature in call to {request.method}: {explanation}")
             raise JarpcInvalidParams(explanation)
 
+    async def _enter_limiters(self, stack: AsyncExitStack, request: JarpcRequest) -> None:
+        """Enters manager-wide limiters and then limiters of the requested method."""
+        for limiter in self.limiters:
+            await stack.enter_async_context(limiter)
+        for limiter in self.method_limiters.get(request.method, ()):
+            await stack.enter_async_context(limiter)
+
     async def _call_method(self, method, request: JarpcRequest) -> Any:
         context_params, method_sig = prepare_context_params(method, request, self.context)
         converted_params = convert_params_to_models(request.params, method_sig)
@@ -255,19 +423,49 @@ class JarpcManager:
     async def _run_method(self, method: Callable, request: JarpcRequest) -> None:
         """Runs the method asynchronously for background tasks."""
         try:
-            from contextlib import AsyncExitStack
             async with AsyncExitStack() as stack:
-                for limiter in self.limiters:
-                    await stack.enter_async_context(limiter)
+                await self._enter_limiters(stack, request)
                 await self._call_method(method, request)
         except Exception as e:
             logger.exception(f"Unhandled exception in background task for method {request.method}: {e}")
 
-    async def shutdown(self):
-        if self._background_tasks:
-            logger.info(f"Shutting down: waiting for {len(self._background_tasks)} RSVP=False tasks to complete...")
-            await asyncio.gather(*self._background_tasks, return_exceptions=True)
-            logger.info("All background tasks completed. Shutdown complete.")
-        else:
-            logger.info("No background tasks. Shutdown complete.")
+    async def shutdown(self, timeout: float | None = None):
+        """
+        Drains the manager.
+
+        New requests are rejected with `JarpcShuttingDown` right away. In-flight requests and RSVP=False
+        background tasks are awaited for up to `timeout` seconds, whatever is left after that is cancelled.
+
+        :param timeout: Drain deadline in seconds, None waits without limit.
+        """
+        self._draining = True
+        if not self._inflight and not self._background_tasks:
+            logger.info("No in-flight requests. Shutdown complete.")
+            return
 
+        logger.info(
+            f"Shutting down: waiting for {self.inflight} in-flight requests"
+            f" and {len(self._background_tasks)} RSVP=False tasks to complete..."
+        )
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            requests, background = list(self._inflight), list(self._background_tasks)
+            logger.warning(f"Shutdown deadline exceeded: cancelling {len(requests) + len(background)} tasks...")
+            for task in requests:
+                self._drain_cancelled.add(task)
+                task.cancel()
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+            # tasks of requests belong to their callers and go on after answering, only the requests are awaited
+            while self._inflight:
+                await self._idle.wait()
+        logger.info("Shutdown complete.")
+
+    async def _drain(self) -> None:
+        """Waits until there are neither in-flight requests nor background tasks."""
+        while self._inflight or self._background_tasks:
+            await self._idle.wait()
+            if self._background_tasks:
+                await asyncio.gather(*self._background_tasks, return_exceptions=True)
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Buffered notifications.
+
+`NotificationSender` queues `rsvp=False` requests of a `JarpcClient` and sends them as batches (arrays of
+requests) when `max_batch` notifications are queued or `flush_interval` seconds after the first one,
+so emitting an event costs an append instead of a transport round trip.
+"""
+import asyncio
+import logging
+from typing import Any, Callable
+
+from .client import JarpcClient
+from .format import JarpcRequest
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationSender:
+    """
+    Sends notifications in batches.
+
+    Example:
+    ```
+    events = NotificationSender(JarpcClient(transport), max_batch=500, flush_interval=0.05)
+    await events.send("order.created", {"order_id": 42})
+    ...
+    await events.aclose()
+    ```
+
+    `send` returns once the notification is queued; it waits only while `max_buffer` notifications are
+    queued or being sent (backpressure), `send_nowait` raises `asyncio.QueueFull` instead.
+    Client middlewares are not applied. Failed batches are passed to `on_error`, logged by default.
+    The transport of the client must accept batches of requests (it must not set `supports_batches = False`,
+    as `FramedTransport` and `ShardedTransport` do) or send requests one by one with `send_request`.
+    """
+
+    def __init__(
+        self,
+        client: JarpcClient,
+        max_batch: int = 100,
+        flush_interval: float = 0.01,
+        max_buffer: int = 10000,
+        on_error: Callable[[list[JarpcRequest], Exception], Any] | None = None,
+    ):
+        """
+        :param client: Client whose transport, codec, compression and default ttl are used.
+        :param max_batch: Number of queued notifications that triggers sending.
+        :param flush_interval: Maximal time in seconds a notification waits in the buffer.
+        :param max_buffer: Maximal number of notifications queued or being sent.
+        :param on_error: Called with the batch and the error when sending fails.
+        """
+        if max_batch < 1 or max_buffer < max_batch:
+            raise ValueError("max_batch must be positive and not greater than max_buffer")
+        if client._send_request is None and not getattr(client._transport, "supports_batches", True):
+            raise ValueError(f"{type(client._transport).__name__} does not support batches of requests")
+        self.client: JarpcClient = client
+        self.max_batch: int = max_batch
+        self.flush_interval: float = flush_interval
+        self.max_buffer: int = max_buffer
+        self.on_error: Callable[[list[JarpcRequest], Exception], Any] = on_error or self._log_error
+        self.sent: int = 0
+        self.failed: int = 0
+        self._pending: list[JarpcRequest] = []
+        # notifications queued or being sent, bounded by max_buffer
+        self._size: int = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._waiters: list[asyncio.Future] = []
+        self._closed: bool = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    async def send(self, method_name: str, params: Any = None, **kwargs: Any) -> None:
+        """
+        Queues a notification, waiting while the buffer is full.
+        Takes `ts`, `ttl`, `request_id`, `durable`, `meta` and `generic_request_type` as `JarpcClient.__call__`
+        does; transport kwargs are not supported, batches are sent with none.
+        """
+        while self._size >= self.max_buffer and not self._closed:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.send_nowait(method_name, params, **kwargs)
+
+    def send_nowait(self, method_name: str, params: Any = None, **kwargs: Any) -> None:
+        """Queues a notification, raises `asyncio.QueueFull` if the buffer is full."""
+        if self._closed:
+            raise RuntimeError("NotificationSender is closed")
+        if self._size >= self.max_buffer:
+            raise asyncio.QueueFull()
+        request = self.client._prepare_request(method_name, params, rsvp=False, **kwargs)
+        self._pending.append(request)
+        self._size += 1
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif len(self._pending) == 1:
+            self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self._flush)
+
+    async def flush(self) -> None:
+        """Sends queued notifications and waits until all batches are sent."""
+        self._flush()
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
+
+    async def aclose(self) -> None:
+        """Sends queued notifications and rejects new ones."""
+        self._closed = True
+        await self.flush()
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def __aenter__(self) -> "NotificationSender":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.aclose()
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: list[JarpcRequest]) -> None:
+        client = self.client
+        try:
+            if client._send_request is not None:
+                # such transports encode requests themselves and accept only single ones
+                await asyncio.gather(*(client._send_request(request) for request in batch))
+            else:
+                request_string = client.codec.encode_batch(batch, exclude_unset=True)
+                if client.compression is not None:
+                    request_string = client._compress_request(request_string)
+                await client._transport(request_string, batch)
+            self.sent += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            self.on_error(batch, e)
+        finally:
+            self._size -= len(batch)
+            self._wake()
+
+    def _wake(self) -> None:
+        free = self.max_buffer - self._size
+        for waiter in self._waiters[:free]:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    @staticmethod
+    def _log_error(batch: list[JarpcRequest], error: Exception) -> None:
+        logger.warning(f"Dropping {len(batch)} notifications: {error!r}")
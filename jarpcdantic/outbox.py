@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Durable outbox.
+
+`Outbox` is a local SQLite spool for `durable=True` calls of a `JarpcClient`. A durable call returns once its
+request is committed to disk; the outbox then delivers it in the background, retries it after transport
+failures or retryable errors (also after a restart of the process) and deletes it once it is acknowledged.
+This gives at-least-once delivery without an external queue; servers can deduplicate by request id.
+
+Requests stored at the same time are committed in one transaction (group commit), so concurrent durable
+calls share a single fsync.
+"""
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Iterable
+
+from .errors import ExceptionManager, JarpcError, jarpcdantic_exceptions
+from .format import JarpcRequest
+
+if TYPE_CHECKING:
+    from .client import JarpcClient
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload BLOB NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0
+)
+"""
+
+
+class Outbox:
+    """
+    Persists durable requests and delivers them at least once.
+
+    Example:
+    ```
+    outbox = Outbox("/var/lib/kitchen/outbox.sqlite3")
+    kitchen = JarpcClient(transport, outbox=outbox)
+    async with outbox:
+        await kitchen("bill.pay", {"order_id": 42}, durable=True)  # returns once the request is on disk
+    ```
+
+    Durable calls return None: the response is only used to acknowledge the request. Client middlewares
+    are applied on every delivery attempt rather than to the call storing the request; transport kwargs are
+    not applied, and requests are delivered without ordering guarantees. A request answered with
+    a non-retryable error is acknowledged (and logged) too: sending it again would not help.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_batch: int = 500,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 60.0,
+        max_attempts: int | None = None,
+        retryable_codes: Iterable[int] | None = None,
+        exception_manager: ExceptionManager | None = None,
+    ):
+        """
+        :param path: Path of the SQLite database file.
+        :param max_batch: Maximal number of requests committed or delivered at once.
+        :param retry_delay: Delay before the first redelivery; every next one doubles it.
+        :param max_retry_delay: Maximal delay between deliveries of a request, in seconds.
+        :param max_attempts: Number of attempts after which a request is dropped, None means never.
+        :param retryable_codes: Error codes the request is redelivered after. Defaults to retryable codes
+                                of `exception_manager`. Exceptions of the transport are always retried.
+        :param exception_manager: Registry of exceptions, `jarpcdantic_exceptions` by default.
+        """
+        self.path: str = path
+        self.max_batch: int = max_batch
+        self.retry_delay: float = retry_delay
+        self.max_retry_delay: float = max_retry_delay
+        self.max_attempts: int | None = max_attempts
+        self.retryable_codes: set[int] = (
+            set(retryable_codes)
+            if retryable_codes is not None
+            else (exception_manager or jarpcdantic_exceptions).retryable_codes()
+        )
+        self.commits: int = 0
+        self.delivered: int = 0
+        self.dropped: int = 0
+        self._client: "JarpcClient | None" = None
+        # sqlite connections are not meant to be shared between threads, one thread does all the I/O
+        self._executor: ThreadPoolExecutor | None = None
+        self._db: sqlite3.Connection | None = None
+        self._pending: list[tuple[str | bytes, asyncio.Future]] = []
+        self._committer: asyncio.Task | None = None
+        self._deliverer: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        # concurrent first calls must start a single delivery loop
+        self._start_lock: asyncio.Lock = asyncio.Lock()
+
+    def attach(self, client: "JarpcClient") -> None:
+        """Sets the client delivering requests, `JarpcClient(outbox=...)` calls it."""
+        if self._client is not None and self._client is not client:
+            raise ValueError("Outbox is already attached to another client")
+        self._client = client
+
+    async def start(self) -> None:
+        """Opens the database and starts delivering stored requests, including those left by a previous run."""
+        if self._deliverer is not None:
+            return
+        if self._client is None:
+            raise RuntimeError("Outbox is not attached to a client")
+        async with self._start_lock:
+            if self._deliverer is not None:
+                return
+            self._wakeup = asyncio.Event()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jarpc-outbox")
+            await self._run(self._open)
+            self._deliverer = asyncio.create_task(self._deliver_forever())
+
+    async def aclose(self) -> None:
+        """Commits requests being stored and stops delivery; undelivered requests stay on disk."""
+        if self._committer is not None:
+            await self._committer
+        if self._deliverer is not None:
+            self._deliverer.cancel()
+            try:
+                await self._deliverer
+            except asyncio.CancelledError:
+                pass
+            self._deliverer = None
+        if self._db is not None:
+            await self._run(self._db.close)
+            self._db = None
+        if self._executor is not None:
+            # nothing is queued any more, so the thread exits at once
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def __aenter__(self) -> "Outbox":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.aclose()
+
+    async def size(self) -> int:
+        """Returns the number of stored requests."""
+        await self.start()
+        return await self._run(lambda: self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0])
+
+    async def put(self, request: JarpcRequest) -> None:
+        """Returns once the request is committed to disk."""
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((self._client.codec.encode(request, exclude_unset=True), future))
+        if self._committer is None:
+            self._committer = asyncio.create_task(self._commit_forever())
+        await future
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _open(self) -> None:
+        if self._db is not None:
+            return
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute(_SCHEMA)
+
+    async def _commit_forever(self) -> None:
+        # requests arriving while a transaction is being committed form the next group
+        try:
+            while self._pending:
+                group, self._pending = self._pending[: self.max_batch], self._pending[self.max_batch :]
+                try:
+                    await self._run(self._insert, [payload for payload, _ in group])
+                except Exception as e:
+                    for _, future in group:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                self.commits += 1
+                for _, future in group:
+                    if not future.done():
+                        future.set_result(None)
+                self._wakeup.set()
+        finally:
+            self._committer = None
+
+    def _insert(self, payloads: list[str | bytes]) -> None:
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT INTO outbox (payload) VALUES (?)", [(payload,) for payload in payloads])
+
+    def _due(self) -> tuple[list[tuple[int, str | bytes, int]], float | None]:
+        """Returns requests due for delivery and the time the next one becomes due."""
+        now = time.time()
+        rows = self._db.execute(
+            "SELECT seq, payload, attempts FROM outbox WHERE next_attempt <= ? ORDER BY seq LIMIT ?",
+            (now, self.max_batch),
+        ).fetchall()
+        next_attempt = self._db.execute(
+            "SELECT MIN(next_attempt) FROM outbox WHERE next_attempt > ?", (now,)
+        ).fetchone()[0]
+        return rows, next_attempt
+
+    def _finish(self, acknowledged: list[int], failed: list[tuple[int, int]]) -> None:
+        now = time.time()
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.executemany("DELETE FROM outbox WHERE seq = ?", [(seq,) for seq in acknowledged])
+            self._db.executemany(
+                "UPDATE outbox SET attempts = ?, next_attempt = ? WHERE seq = ?",
+                [
+                    (attempts, now + min(self.max_retry_delay, self.retry_delay * 2 ** (attempts - 1)), seq)
+                    for seq, attempts in failed
+                ],
+            )
+
+    async def _deliver_forever(self) -> None:
+        while True:
+            self._wakeup.clear()
+            rows, next_attempt = await self._run(self._due)
+            if not rows:
+                timeout = None if next_attempt is None else max(0.0, next_attempt - time.time())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            outcomes = await asyncio.gather(*(self._deliver(payload) for _, payload, _ in rows))
+            acknowledged, failed = [], []
+            for (seq, _, attempts), delivered in zip(rows, outcomes):
+                if delivered:
+                    acknowledged.append(seq)
+                elif self.max_attempts is not None and attempts + 1 >= self.max_attempts:
+                    logger.warning(f"Dropping outbox request {seq} after {attempts + 1} attempts")
+                    self.dropped += 1
+                    acknowledged.append(seq)
+                else:
+                    failed.append((seq, attempts + 1))
+            self.delivered += len(acknowledged)
+            await self._run(self._finish, acknowledged, failed)
+
+    async def _deliver(self, payload: str | bytes) -> bool:
+        """Sends the stored request, returns whether it is acknowledged."""
+        client = self._client
+        try:
+            request = JarpcRequest.model_validate(client.codec.loads(payload))
+        except ValueError as e:
+            # e.g. stored by a client with another codec, it will never be sent
+            logger.warning(f"Dropping undecodable outbox request: {e!r}")
+            return True
+
+        async def send(req: JarpcRequest) -> Any:
+            if client._send_request is not None:
+                response = await client._send_request(req)
+            else:
+                # middlewares may have changed the request, so the stored payload is not reused
+                request_string = client.codec.encode(req, exclude_unset=True)
+                if client.compression is not None:
+                    request_string = client._compress_request(request_string)
+                response = await client._transport(request_string, req)
+            return client._parse_response(response, req.rsvp)
+
+        try:
+            await client._middleware_stack(request, send)
+        except JarpcError as e:
+            if e.code in self.retryable_codes:
+                return False
+            logger.warning(f"Outbox request failed with non-retryable error: {e!r}")
+            return True
+        except Exception as e:
+            logger.debug(f"Outbox delivery failed: {e!r}", exc_info=True)
+            return False
+        return True
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Client-side rate limiting.
+
+`RateLimiter` is a `JarpcClient` middleware limiting the rate of calls with token buckets (global and
+per method) and the number of calls in flight (global and per method). A call over the limit either
+waits for its turn, never past the request deadline, or fails fast with `JarpcRateLimited`.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Mapping
+
+from .errors import JarpcRateLimited
+from .format import JarpcRequest
+
+
+class _TokenBucket:
+    """Token bucket handing out reservations: a call takes a token right away and waits until it is refilled."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate: float = rate
+        self.burst: float = burst
+        self.tokens: float = burst
+        self.updated: float = time.monotonic()
+
+    def delay(self, now: float) -> float:
+        """Returns the time to wait for a token reserved now."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return max(0.0, 1.0 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1.0
+
+    def refund(self) -> None:
+        """Returns the token of a call that did not take place."""
+        self.tokens = min(self.burst, self.tokens + 1.0)
+
+
+class RateLimiter:
+    """
+    Limits the rate and concurrency of outgoing calls.
+
+    Example:
+    ```
+    limiter = RateLimiter(
+        rate=500, max_inflight=64, method_rates={"report.build": 2}, method_max_inflight={"report.build": 1}
+    )
+    client = JarpcClient(transport, default_rpc_ttl=5.0, middlewares=[limiter])
+    ```
+
+    Rates are given as calls per second, optionally with a burst: `{"report.build": (2, 10)}`.
+    A bucket starts full, so up to `burst` calls pass at once.
+    """
+
+    def __init__(
+        self,
+        rate: float | None = None,
+        burst: float | None = None,
+        max_inflight: int | None = None,
+        method_rates: Mapping[str, float | tuple[float, float]] | None = None,
+        method_max_inflight: Mapping[str, int] | None = None,
+        wait: bool = True,
+        max_wait: float | None = None,
+    ):
+        """
+        :param rate: Global calls per second, None means no limit.
+        :param burst: Size of the global bucket, `rate` by default (but at least 1).
+        :param max_inflight: Global number of calls in flight, None means no limit.
+        :param method_rates: Per-method calls per second, or (calls per second, burst) pairs.
+        :param method_max_inflight: Per-method numbers of calls in flight.
+        :param wait: Whether calls over a limit wait for their turn or fail with `JarpcRateLimited` right away.
+        :param max_wait: Maximal time in seconds a call waits, the request deadline (`ts + ttl`) always applies.
+        """
+        self.wait: bool = wait
+        self.max_wait: float | None = max_wait
+        self.rejected: int = 0
+        self._bucket: _TokenBucket | None = self._make_bucket(rate, burst) if rate is not None else None
+        self._method_buckets: dict[str, _TokenBucket] = {
+            method: self._make_bucket(*(limit if isinstance(limit, tuple) else (limit, None)))
+            for method, limit in (method_rates or {}).items()
+        }
+        self._slots: asyncio.Semaphore | None = asyncio.Semaphore(max_inflight) if max_inflight is not None else None
+        self._method_slots: dict[str, asyncio.Semaphore] = {
+            method: asyncio.Semaphore(limit) for method, limit in (method_max_inflight or {}).items()
+        }
+
+    @staticmethod
+    def _make_bucket(rate: float, burst: float | None) -> _TokenBucket:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        return _TokenBucket(rate, burst if burst is not None else max(rate, 1.0))
+
+    async def __call__(self, request: JarpcRequest, call_next: Callable[[JarpcRequest], Awaitable[Any]]) -> Any:
+        method_bucket = self._method_buckets.get(request.method)
+        method_slots = self._method_slots.get(request.method)
+        if self._bucket is None and self._slots is None and method_bucket is None and method_slots is None:
+            return await call_next(request)
+
+        started = time.monotonic()
+        budget = self._wait_budget(request)
+        delay = 0.0
+        buckets = [bucket for bucket in (self._bucket, method_bucket) if bucket is not None]
+        for bucket in buckets:
+            delay = max(delay, bucket.delay(started))
+        if delay > budget:
+            self._reject(request, "rate")
+        # tokens are reserved now so that later calls queue behind this one; they are refunded if the call
+        # is cancelled or rejected before it starts
+        for bucket in buckets:
+            bucket.take()
+
+        acquired: list[asyncio.Semaphore] = []
+        called = False
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            for slots in (self._slots, method_slots):
+                if slots is None:
+                    continue
+                if slots.locked():
+                    remaining = budget - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._reject(request, "inflight")
+                    try:
+                        await asyncio.wait_for(slots.acquire(), remaining)
+                    except asyncio.TimeoutError:
+                        self._reject(request, "inflight")
+                else:
+                    await slots.acquire()
+                acquired.append(slots)
+            called = True
+            return await call_next(request)
+        finally:
+            for slots in acquired:
+                slots.release()
+            if not called:
+                for bucket in buckets:
+                    bucket.refund()
+
+    def _wait_budget(self, request: JarpcRequest) -> float:
+        """Returns how long the call may wait for its turn."""
+        if not self.wait:
+            return 0.0
+        budget = self.max_wait if self.max_wait is not None else float("inf")
+        if request.ttl is not None:
+            budget = min(budget, request.ts + request.ttl - time.time())
+        return budget
+
+    def _reject(self, request: JarpcRequest, limit: str) -> None:
+        self.rejected += 1
+        raise JarpcRateLimited({"method": request.method, "limit": limit})
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Client-side retries.
+
+`RetryPolicy` is a `JarpcClient` middleware. It repeats calls failed with retryable errors using exponential
+backoff with full jitter, never past the request deadline (`ts + ttl`), and only while the retry budget allows.
+Every attempt sends the very same request, id included, so servers can deduplicate repeated requests.
+"""
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Iterable
+
+from .errors import ExceptionManager, JarpcError, jarpcdantic_exceptions
+from .format import JarpcRequest
+
+
+class RetryPolicy:
+    """
+    Retries calls failed with retryable JARPC errors.
+
+    The retry budget caps retries at a share of calls: every call adds `budget_ratio` tokens (up to
+    `budget_max`), every retry takes one, no retries are made while there is less than one token.
+    So when a downstream service is down, clients add at most `budget_ratio` extra load instead of multiplying it.
+
+    Example:
+    ```
+    client = JarpcClient(transport, default_rpc_ttl=5.0, middlewares=[RetryPolicy(max_attempts=3)])
+    ```
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.05,
+        max_delay: float = 2.0,
+        retryable_codes: Iterable[int] | None = None,
+        exception_manager: ExceptionManager | None = None,
+        budget_ratio: float = 0.1,
+        budget_max: float = 10.0,
+    ):
+        """
+        :param max_attempts: Maximal number of attempts including the first one.
+        :param base_delay: Backoff before the first retry; every next one doubles it. Delays are jittered.
+        :param max_delay: Maximal backoff, in seconds.
+        :param retryable_codes: Error codes worth retrying. Defaults to codes of `retryable` exceptions
+                                registered in `exception_manager` (timeouts, unavailable services, draining servers).
+        :param exception_manager: Registry of exceptions, `jarpcdantic_exceptions` by default.
+        :param budget_ratio: Tokens added to the retry budget by every call.
+        :param budget_max: Maximal number of tokens in the budget, also the initial one.
+        """
+        self.max_attempts: int = max_attempts
+        self.base_delay: float = base_delay
+        self.max_delay: float = max_delay
+        self.retryable_codes: set[int] = (
+            set(retryable_codes)
+            if retryable_codes is not None
+            else (exception_manager or jarpcdantic_exceptions).retryable_codes()
+        )
+        self.budget_ratio: float = budget_ratio
+        self.budget_max: float = budget_max
+        self.budget: float = budget_max
+        self.retries: int = 0
+
+    async def __call__(self, request: JarpcRequest, call_next: Callable[[JarpcRequest], Awaitable[Any]]) -> Any:
+        self.budget = min(self.budget + self.budget_ratio, self.budget_max)
+        attempt = 1
+        while True:
+            try:
+                return await call_next(request)
+            except JarpcError as e:
+                delay = self._backoff(attempt)
+                if not self._should_retry(e, attempt, request, delay):
+                    raise
+            self.budget -= 1
+            self.retries += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def _should_retry(self, error: JarpcError, attempt: int, request: JarpcRequest, delay: float) -> bool:
+        if attempt >= self.max_attempts or error.code not in self.retryable_codes or self.budget < 1:
+            return False
+        # the server drops expired requests, a retry arriving after the deadline is wasted
+        return request.ttl is None or time.time() + delay < request.ts + request.ttl
@@ -1,12 +1,14 @@
+import copy
 import inspect
+import logging
 from inspect import Parameter, Signature, _empty
 from typing import Any, Callable, Generator, Type
 
 from pydantic import BaseModel, Field, create_model
 
 from jarpcdantic import JarpcClient
-from jarpcdantic.utils import process_return_value
 
+logger = logging.getLogger(__name__)
 
 class UnsetType:
     """Marker for parameters that were not explicitly set (to differentiate from None)."""
@@ -22,6 +24,60 @@ class UnsetType:
 UNSET = UnsetType()
 
 
+SERVICE_KEYS = frozenset({"ts", "ttl", "request_id", "rsvp", "durable", "meta"})
+
+
+class _CompiledEndpoint:
+    """
+    Per-class part of an endpoint: everything except the router instance it is bound to.
+
+    Besides the signature and the request model it holds the binding plan used on every call:
+    parameter names by position, default values of parameters and of service (`_`-prefixed) parameters
+    and the return annotation the response is validated against.
+    """
+
+    __slots__ = (
+        "name",
+        "signature",
+        "request_model",
+        "annotations",
+        "positional",
+        "defaults",
+        "service_defaults",
+        "return_annotation",
+        "validates_params",
+        "request_type",
+    )
+
+    def __init__(self, name: str, signature: Signature, request_model: Type[BaseModel] | None):
+        self.name: str = name
+        self.signature: Signature = signature
+        self.request_model: Type[BaseModel] | None = request_model
+        self.annotations: dict[str, Any] = {
+            param_name: param.annotation for param_name, param in signature.parameters.items()
+        }
+        self.annotations["return"] = signature.return_annotation
+
+        parameters = list(signature.parameters.values())[1:]  # skip "self"
+        self.positional: tuple[str, ...] = tuple(param.name for param in parameters)
+        self.validates_params: bool = isinstance(request_model, type) and issubclass(request_model, BaseModel)
+        self.request_type: Any = request_model if self.validates_params else Any
+        # a parameter without default is passed as `_empty`, so the request model reports it as missing
+        self.defaults: dict[str, Any] = {
+            param.name: param.default
+            for param in parameters
+            if param.default is not ... and (self.validates_params or param.default is not _empty)
+        }
+        self.service_defaults: dict[str, Any] = {
+            param.name[1:]: param.default
+            for param in parameters
+            if param.name[1:] in SERVICE_KEYS and param.name[0] == "_" and param.default is not _empty
+        }
+        self.return_annotation: Any = (
+            Any if signature.return_annotation in {None, _empty} else signature.return_annotation
+        )
+
+
 class JarpcClientRouter:
     def __init__(
         self,
@@ -32,6 +88,10 @@ class JarpcClientRouter:
         """
         Initializes the JARPC client router.
 
+        Endpoints are compiled once per class (see `_compile`), instances only bind them to their
+        client and prefix. Nested routers declared on the class are templates: every instance gets
+        its own copies of them, so instances with different clients or prefixes do not interfere.
+
         :param prefix: Optional prefix for the router.
         :type prefix: str
         :param client: Optional client instance (JarpcClient).
@@ -43,16 +103,39 @@ class JarpcClientRouter:
         self._prefix: str | None = prefix
         self._is_absolute_prefix: bool = is_absolute_prefix
         self._method_map: dict[str, Callable[..., Any]] = {}
+        self._nested_routers: dict[str, JarpcClientRouter] = {}
 
         self._decorate_endpoints()
 
-    def _filter_attributes(self) -> Generator[tuple[str, Any], None, None]:
+    @classmethod
+    def _compile(cls) -> tuple[dict[str, _CompiledEndpoint], dict[str, "JarpcClientRouter"]]:
+        """
+        Returns compiled endpoints and nested router templates of the class, compiling them on first use.
+        Only attributes defined on the class itself are taken into account.
+
+        :return: Endpoints and nested routers by attribute name.
+        """
+        compiled = cls.__dict__.get("_compiled")
+        if compiled is None:
+            endpoints: dict[str, _CompiledEndpoint] = {}
+            routers: dict[str, JarpcClientRouter] = {}
+            for attr_name, attr_value in cls._filter_attributes():
+                if cls._is_nested_router(attr_value):
+                    routers[attr_name] = attr_value
+                elif cls._is_endpoint(attr_name, attr_value):
+                    endpoints[attr_name] = cls._compile_endpoint(attr_name, attr_value)
+            compiled = endpoints, routers
+            cls._compiled = compiled
+        return compiled
+
+    @classmethod
+    def _filter_attributes(cls) -> Generator[tuple[str, Any], None, None]:
         """
         Filters and yields non-private attributes of the class.
 
         :yield: Tuples of attribute names and values.
         """
-        for attr_name, attr_value in self.__class__.__dict__.items():
+        for attr_name, attr_value in list(cls.__dict__.items()):
             if attr_name.startswith("_") or isinstance(attr_value, property):
                 continue
             yield attr_name, attr_value
@@ -69,47 +152,51 @@ class JarpcClientRouter:
         return isinstance(attr_value, JarpcClientRouter)
 
     @staticmethod
-    def _is_not_processed_endpoint(
-        attr_name: str, attr_value: Any, is_nested: bool
-    ) -> bool:
+    def _is_endpoint(attr_name: str, attr_value: Any) -> bool:
         """
-        Checks if the attribute is not a processed endpoint.
+        Checks if the attribute is an endpoint: a public attribute with a return annotation.
 
         :param attr_name: Name of the attribute.
         :type attr_name: str
         :param attr_value: Value of the attribute.
         :type attr_value: Any
-        :param is_nested: Whether the router is nested.
         :return: True if the attribute is an endpoint, False otherwise.
         """
         return (
-            not is_nested
-            and not attr_name.startswith("_")
+            not attr_name.startswith("_")
             and hasattr(attr_value, "__annotations__")
             and "return" in attr_value.__annotations__
         )
 
-    def _process_attributes(self, is_nested: bool = False) -> None:
-        """
-        Handles attributes, processing nested routers and endpoints.
-
-        :param is_nested: Whether the router is nested.
-        :type is_nested: bool
-        """
-        for attr_name, attr_value in self._filter_attributes():
-            if self._is_nested_router(attr_value):
-                self._proceed_nested_router(attr_name, attr_value)
-            elif self._is_not_processed_endpoint(attr_name, attr_value, is_nested):
-                self._proceed_endpoint(attr_name, attr_value)
-
-    def _decorate_endpoints(self, is_nested: bool = False) -> None:
+    @classmethod
+    def _compile_endpoint(cls, endpoint_name: str, endpoint_method: Any) -> _CompiledEndpoint:
         """
-        Decorates methods to handle attributes.
+        Inspects the signature of an endpoint and builds its request model.
 
-        :param is_nested: Whether the router is nested.
-        :type is_nested: bool
+        :param endpoint_name: Name of the endpoint.
+        :type endpoint_name: str
+        :param endpoint_method: Original method of the endpoint.
+        :type endpoint_method: Any
+        :return: Compiled endpoint.
         """
-        self._process_attributes(is_nested)
+        endpoint_signature = inspect.signature(endpoint_method)
+        filtered_parameters = cls._filter_parameters(endpoint_signature)
+        request_model = cls._determine_request_model(filtered_parameters, endpoint_signature)
+        endpoint = _CompiledEndpoint(endpoint_name, endpoint_signature, request_model)
+        try:
+            JarpcClient.warmup(response_types=[endpoint.return_annotation], request_types=[endpoint.request_type])
+        except Exception as e:
+            # a bad annotation must break only calls of this endpoint, not the whole router
+            logger.warning(f"Cannot warm up endpoint {cls.__name__}.{endpoint_name}, it is validated on call: {e!r}")
+        return endpoint
+
+    def _decorate_endpoints(self) -> None:
+        """Binds compiled endpoints to this instance and sets up its copies of nested routers."""
+        endpoints, routers = self._compile()
+        for endpoint in endpoints.values():
+            self._proceed_endpoint(endpoint)
+        for attr_name, nested_router in routers.items():
+            self._proceed_nested_router(attr_name, nested_router)
 
     @staticmethod
     def _filter_parameters(attr_signature: Signature) -> dict[str, Parameter]:
@@ -175,78 +262,47 @@ class JarpcClientRouter:
 
         return request_model
 
-    def _wrap_endpoint(
-        self,
-        endpoint_name: str,
-        request_model: Type[BaseModel],
-        endpoint_signature: Signature,
-    ) -> Any:
-        """
-        Wraps an endpoint method to handle parameter validation and sending requests via the client.
-
-        :param endpoint_name: Name of the endpoint.
-        :type endpoint_name: str
-        :param request_model: Request model used for validation, if applicable.
-        :type request_model: Type[BaseModel]
-        :param endpoint_signature: Signature of the original method.
-        :type endpoint_signature: Signature
-        :return: Wrapped function to be used as endpoint.
-        """
-        wrapped_attr = self._wrap(
-            self, endpoint_name, request_model, endpoint_signature
-        )
-        wrapped_attr.__annotations__ = {
-            param_name: param.annotation
-            for param_name, param in endpoint_signature.parameters.items()
-        }
-        wrapped_attr.__annotations__["return"] = endpoint_signature.return_annotation
-        return wrapped_attr
-
-    def _proceed_endpoint(self, endpoint_name: str, endpoint_method: Any) -> None:
+    def _proceed_endpoint(self, endpoint: _CompiledEndpoint) -> None:
         """
-        Processes an endpoint by wrapping it and adding it to the method map.
+        Binds a compiled endpoint to this instance and adds it to the method map.
 
-        :param endpoint_name: Name of the endpoint.
-        :type endpoint_name: str
-        :param endpoint_method: Original method of the endpoint.
-        :type endpoint_method: Any
+        :param endpoint: Compiled endpoint.
+        :type endpoint: _CompiledEndpoint
         """
-        endpoint_signature = inspect.signature(endpoint_method)
-        filtered_parameters = self._filter_parameters(endpoint_signature)
-        request_model = self._determine_request_model(
-            filtered_parameters, endpoint_signature
-        )
-        wrapped_endpoint = self._wrap_endpoint(
-            endpoint_name, request_model, endpoint_signature
-        )
+        wrapped_endpoint = self._wrap(self, endpoint)
+        wrapped_endpoint.__annotations__ = dict(endpoint.annotations)
 
-        self._method_map[endpoint_name] = wrapped_endpoint
-        setattr(self, endpoint_name, wrapped_endpoint)
+        self._method_map[endpoint.name] = wrapped_endpoint
+        setattr(self, endpoint.name, wrapped_endpoint)
 
     def _proceed_nested_router(
         self, attr_router_name: str, nested_router: "JarpcClientRouter"
     ) -> None:
         """
-        Processes a nested router by setting prefixes, clients, and decorating its methods.
+        Sets up this instance's copy of a nested router: its prefix, client and endpoints.
 
         :param attr_router_name: Name of the nested router attribute.
         :type attr_router_name: str
-        :param nested_router: Instance of the nested router.
+        :param nested_router: Nested router declared on the class, used as a template.
         :type nested_router: JarpcClientRouter
         """
+        nested_router = copy.copy(nested_router)
+        nested_router._method_map = {}
+        nested_router._nested_routers = {}
+
         if nested_router._prefix is None:
             nested_router._prefix = attr_router_name
 
-        if nested_router._is_absolute_prefix:
-            return
-
-        if self._prefix and not nested_router._prefix.startswith(self._prefix):
-            nested_router._prefix = f"{self._prefix}.{nested_router._prefix}".strip(".")
+        if not nested_router._is_absolute_prefix:
+            if self._prefix and not nested_router._prefix.startswith(self._prefix):
+                nested_router._prefix = f"{self._prefix}.{nested_router._prefix}".strip(".")
 
-        if not nested_router._client and self._client:
-            nested_router._client = self._client
+            if not nested_router._client and self._client:
+                nested_router._client = self._client
 
-        nested_router._decorate_endpoints(is_nested=True)
+        nested_router._decorate_endpoints()
+        self._nested_routers[attr_router_name] = nested_router
+        setattr(self, attr_router_name, nested_router)
 
     def set_client(self, client: JarpcClient) -> None:
         """
@@ -256,129 +312,78 @@ class JarpcClientRouter:
         :type client: JarpcClient
         """
         self._client = client
-        for _, attr in self._filter_attributes():
-            if isinstance(attr, JarpcClientRouter):
-                attr.set_client(client)
+        for nested_router in self._nested_routers.values():
+            nested_router.set_client(client)
 
     @staticmethod
-    def _wrap(
-        instance: "JarpcClientRouter",
-        method_name: str,
-        request_model: Type[BaseModel] | None,
-        method_signature: Signature,
-    ) -> Callable[..., Any]:
+    def _wrap(instance: "JarpcClientRouter", endpoint: _CompiledEndpoint) -> Callable[..., Any]:
         """
         Wraps an endpoint method to handle parameter validation and sending requests via the client.
 
+        Arguments are bound in one pass following the binding plan of the compiled endpoint:
+        positional arguments by index, `_`-prefixed keyword arguments as service parameters
+        (ts, ttl, request_id, rsvp, durable, meta; others are passed to the transport as is).
+
         :param instance: The instance of the router.
         :type instance: JarpcClientRouter
-        :param method_name: The name of the endpoint method.
-        :type method_name: str
-        :param request_model: The request model used for validation, if applicable.
-        :type request_model: Type[BaseModel] | None
-        :param method_signature: The signature of the original method.
-        :type method_signature: Signature
+        :param endpoint: The compiled endpoint.
+        :type endpoint: _CompiledEndpoint
         :return: A wrapped asynchronous function that handles parameter validation and makes a request.
         """
+        request_model = endpoint.request_model
+        positional = endpoint.positional
+        defaults = endpoint.defaults
+        service_defaults = endpoint.service_defaults
+        validates_params = endpoint.validates_params
+        full_method_name = f"{instance._prefix}.{endpoint.name}" if instance._prefix else endpoint.name
 
         async def wrapped(*args: Any, **kwargs: Any) -> Any:
-            # Separate parameters for service (prefixed with "_") and clear parameters
-            service_kwargs = {k: v for k, v in kwargs.items() if k.startswith("_")}
-            clear_kwargs = {k: v for k, v in kwargs.items() if not k.startswith("_")}
+            if len(args) > len(positional):
+                raise TypeError(
+                    f"{full_method_name}() takes {len(positional)} positional arguments but {len(args)} were given"
+                )
+            combined_params = dict(defaults)
+            combined_params.update(zip(positional, args))
+            service_kwargs = dict(service_defaults)
+            for key, value in kwargs.items():
+                if key[0] != "_":
+                    combined_params[key] = value
+                elif key[1:] in SERVICE_KEYS:
+                    service_kwargs[key[1:]] = value
+                else:
+                    service_kwargs[key] = value
 
             # If a request model is defined, validate and construct request parameters
-            if request_model is not None:
-                # Initialize parameters with default values from the signature
-                args_with_defaults = {
-                    param_name: param.default
-                    for param_name, param in method_signature.parameters.items()
-                }
-
-                # Update default arguments with positional arguments
-                for index, value in enumerate(args):
-                    param_name = list(method_signature.parameters.keys())[
-                        index + 1
-                    ]  # Skip "self"
-                    args_with_defaults[param_name] = value
-
-                # Merge keyword arguments
-                combined_params = {**args_with_defaults, **clear_kwargs}
-
-                # Validate and parse parameters using the model if it's a subclass of BaseModel
-                if issubclass(request_model, BaseModel):
-                    combined_params = {
-                        k: v for k, v in combined_params.items() if v is not ...
-                    }
-                    params = request_model(**combined_params)
-                else:
-                    # Filter out parameters with no default value or empty value
-                    params = {
-                        k: v for k, v in combined_params.items() if v is not _empty
-                    }
-            else:
-                # If no model is defined, pass only the clear parameters
+            if request_model is None:
                 params = {}
-
-            return_annotation = method_signature.return_annotation
-            if return_annotation in {None, _empty}:
-                return_annotation = Any
-
-            # Make a request using the client, if defined
-            if instance._client is not None:
-                # Construct the full method name with prefix, if any
-                full_method_name = (
-                    f"{instance._prefix}.{method_name}"
-                    if instance._prefix
-                    else method_name
-                )
-
-                for service_key in {"ts", "ttl", "request_id", "rsvp", "durable", "meta"}:
-                    underscored_key = f"_{service_key}"
-                    if (
-                        underscored_key in method_signature.parameters
-                        and underscored_key not in service_kwargs
-                    ):
-                        param = method_signature.parameters[underscored_key]
-                        if (
-                            param.default is not param.empty
-                        ):  # Проверяем, есть ли дефолтное значение
-                            service_kwargs[service_key] = param.default
-
-                    # Переносим явно переданные значения без подчеркивания
-                    if underscored_key in service_kwargs:
-                        service_kwargs[service_key] = service_kwargs.pop(
-                            underscored_key
-                        )
-
-                # Send the request and process the response
-                response = await instance._client(
-                    method_name=full_method_name,
-                    params=params,
-                    generic_request_type=request_model,
-                    generic_response_type=return_annotation,
-                    **service_kwargs,
-                )
-                return process_return_value(
-                    method_signature.return_annotation, response
-                )
+            elif validates_params:
+                params = request_model(**combined_params)
             else:
+                params = combined_params
+
+            client = instance._client
+            if client is None:
                 # If no client is set, print the call for debugging
-                full_method_name = (
-                    f"{instance._prefix}.{method_name}"
-                    if instance._prefix
-                    else method_name
-                )
                 print(
                     "Client is None, call:",
                     full_method_name,
                     params.model_dump(exclude_unset=True),
                 )
+                return None
+
+            # The client validates the result against the return annotation while parsing the response,
+            # so it is returned as is instead of being converted once more
+            return await client(
+                method_name=full_method_name,
+                params=params,
+                generic_request_type=endpoint.request_type,
+                generic_response_type=endpoint.return_annotation,
+                **service_kwargs,
+            )
 
         # Provide string representation of the wrapped method name
         def __str__(*args, **kwargs) -> str:
-            return (
-                f"{instance._prefix}.{method_name}" if instance._prefix else method_name
-            )
+            return full_method_name
 
         # Attach string representation to the wrapped function
         wrapped.__str__ = __str__
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Pre-fork multi-process server runner.
+
+A `JarpcManager` runs on one event loop and therefore on one core. `PreforkRunner` forks worker processes,
+each builds its own manager and serves it with `JarpcStreamServer` on a listening socket bound to the same
+port with SO_REUSEPORT, so the kernel spreads incoming connections between workers.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable
+
+from .framed import JarpcStreamServer
+from .manager import JarpcManager
+
+logger = logging.getLogger(__name__)
+
+
+def create_reuseport_socket(host: str, port: int) -> socket.socket:
+    """Creates a TCP socket bound to `host`/`port` with SO_REUSEADDR and SO_REUSEPORT set."""
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise RuntimeError("SO_REUSEPORT is not supported on this platform")
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    return sock
+
+
+class _Worker:
+    """Parent-side handle of a worker process."""
+
+    __slots__ = ("process", "connection", "started_at", "metrics")
+
+    def __init__(self, process: multiprocessing.Process, connection: Connection):
+        self.process: multiprocessing.Process = process
+        self.connection: Connection = connection
+        self.started_at: float = time.monotonic()
+        self.metrics: dict[str, int] = {}
+
+
+class PreforkRunner:
+    """
+    Runs `workers` processes serving `JarpcManager`s built by `manager_factory` on one SO_REUSEPORT port.
+
+    Workers report `JarpcStreamServer.stats()` to the parent every `metrics_interval` seconds,
+    `metrics()` returns their sum. Workers that exit are restarted. On SIGTERM/SIGINT (or `stop()`)
+    workers drain their managers for up to `shutdown_timeout` seconds and exit.
+
+    Example:
+    ```
+    def build_manager():
+        return JarpcManager(dispatcher)
+
+    PreforkRunner(build_manager, host="0.0.0.0", port=9000, workers=8).run()
+    ```
+    """
+
+    def __init__(
+        self,
+        manager_factory: Callable[[], JarpcManager],
+        host: str = "0.0.0.0",
+        port: int = 0,
+        workers: int | None = None,
+        metrics_interval: float = 1.0,
+        restart_delay: float = 1.0,
+        shutdown_timeout: float | None = 30.0,
+        **server_kwargs: Any,
+    ):
+        """
+        :param manager_factory: Called in every worker process to build its manager.
+        :param host: Host to listen on.
+        :param port: Port to listen on, 0 picks a free port (see `port` after `run` has started).
+        :param workers: Number of worker processes, defaults to the number of CPUs.
+        :param metrics_interval: How often workers report their stats, in seconds.
+        :param restart_delay: Minimal lifetime of a worker before its exit triggers an immediate restart;
+                              workers crashing sooner are restarted after this delay.
+        :param shutdown_timeout: Drain deadline passed to `JarpcManager.shutdown` in workers.
+        :param server_kwargs: Passed to `JarpcStreamServer`.
+        """
+        self.manager_factory: Callable[[], JarpcManager] = manager_factory
+        self.host: str = host
+        self.port: int = port
+        self.workers: int = workers or os.cpu_count() or 1
+        self.metrics_interval: float = metrics_interval
+        self.restart_delay: float = restart_delay
+        self.shutdown_timeout: float | None = shutdown_timeout
+        self.server_kwargs: dict[str, Any] = server_kwargs
+        self.restarts: int = 0
+        self._workers: list[_Worker | None] = []
+        self._stopping: threading.Event = threading.Event()
+        self._started: threading.Event = threading.Event()
+        self._context = multiprocessing.get_context("fork")
+
+    @property
+    def pids(self) -> list[int]:
+        """Process ids of running workers."""
+        return [worker.process.pid for worker in self._workers if worker and worker.process.is_alive()]
+
+    def metrics(self) -> dict[str, int]:
+        """Returns the sum of the latest stats reported by workers plus the runner's own counters."""
+        totals: dict[str, int] = {"workers": len(self.pids), "restarts": self.restarts}
+        for worker in self._workers:
+            for name, value in (worker.metrics if worker else {}).items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def wait_started(self, timeout: float | None = None) -> bool:
+        """Blocks until all workers are forked and `port` is known."""
+        return self._started.wait(timeout)
+
+    def stop(self) -> None:
+        """Asks the runner to stop workers and return from `run`. Safe to call from any thread."""
+        self._stopping.set()
+
+    def run(self, install_signal_handlers: bool = True) -> None:
+        """Forks workers and supervises them until `stop` is called or SIGTERM/SIGINT is received."""
+        if install_signal_handlers:
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda *_: self.stop())
+
+        # keeps the port reserved while workers restart, this socket never listens
+        reserved = create_reuseport_socket(self.host, self.port)
+        self.port = reserved.getsockname()[1]
+        try:
+            self._workers = [self._spawn() for _ in range(self.workers)]
+            self._started.set()
+            self._supervise()
+        finally:
+            self._stop_workers()
+            reserved.close()
+
+    def _spawn(self) -> _Worker:
+        parent_connection, child_connection = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=self._worker_main, args=(child_connection,), name="jarpc-worker", daemon=True
+        )
+        process.start()
+        child_connection.close()
+        logger.info(f"Started worker {process.pid} on {self.host}:{self.port}")
+        return _Worker(process, parent_connection)
+
+    def _supervise(self) -> None:
+        restart_at: dict[int, float] = {}
+        while not self._stopping.is_set():
+            waitables = []
+            for worker in self._workers:
+                if worker is not None:
+                    waitables += [worker.connection, worker.process.sentinel]
+            ready = wait(waitables, timeout=0.1)
+
+            for index, worker in enumerate(self._workers):
+                if worker is None:
+                    if time.monotonic() >= restart_at.get(index, 0):
+                        self._workers[index] = self._spawn()
+                        self.restarts += 1
+                    continue
+                if worker.connection in ready:
+                    self._receive_metrics(worker)
+                if worker.process.sentinel in ready or not worker.process.is_alive():
+                    worker.process.join()
+                    worker.connection.close()
+                    logger.warning(f"Worker {worker.process.pid} exited with code {worker.process.exitcode}")
+                    if self._stopping.is_set():
+                        continue
+                    self._workers[index] = None
+                    if time.monotonic() - worker.started_at < self.restart_delay:
+                        restart_at[index] = time.monotonic() + self.restart_delay
+
+    @staticmethod
+    def _receive_metrics(worker: _Worker) -> None:
+        try:
+            while worker.connection.poll():
+                worker.metrics = worker.connection.recv()
+        except (EOFError, OSError):
+            pass
+
+    def _stop_workers(self) -> None:
+        workers = [worker for worker in self._workers if worker is not None]
+        for worker in workers:
+            if worker.process.is_alive():
+                os.kill(worker.process.pid, signal.SIGTERM)
+        deadline = time.monotonic() + (self.shutdown_timeout or 0) + 5
+        for worker in workers:
+            worker.process.join(max(deadline - time.monotonic(), 0))
+            if worker.process.is_alive():
+                logger.warning(f"Worker {worker.process.pid} did not stop in time, killing it")
+                worker.process.kill()
+                worker.process.join()
+            worker.connection.close()
+        self._workers = []
+
+    def _worker_main(self, connection: Connection) -> None:
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_DFL)
+        asyncio.run(self._serve_worker(connection))
+
+    async def _serve_worker(self, connection: Connection) -> None:
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stopping.set)
+
+        sock = create_reuseport_socket(self.host, self.port)
+        server = JarpcStreamServer(self.manager_factory(), **self.server_kwargs)
+        await server.start(sock=sock)
+        try:
+            while not stopping.is_set():
+                try:
+                    connection.send(server.stats())
+                except (BrokenPipeError, OSError):
+                    # the runner is gone
+                    break
+                try:
+                    await asyncio.wait_for(stopping.wait(), self.metrics_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await server.close(timeout=self.shutdown_timeout)
+            connection.close()
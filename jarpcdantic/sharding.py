@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Sharded routing.
+
+`ShardedTransport` routes every call to the shard owning its key. The key is extracted from params by
+a per-method function and mapped onto a consistent-hash ring where each shard holds `vnodes` virtual
+nodes. So calls about the same entity always reach the same shard (its caches stay hot), and adding
+or removing a shard moves only about 1/N of the keys.
+"""
+import hashlib
+from bisect import bisect
+from typing import Any, Awaitable, Callable, Hashable, Mapping
+
+from pydantic import BaseModel
+
+from .format import JarpcRequest
+
+Transport = Callable[..., Awaitable[Any]]
+
+
+def _hash(value: str) -> int:
+    # a stable hash: the built-in `hash` of str differs between processes
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class ShardedTransport:
+    """
+    Transport routing calls to shards by a key from params.
+
+    Example:
+    ```
+    transport = ShardedTransport(
+        shards={"orders-1": HttpTransport(url_1), "orders-2": HttpTransport(url_2)},
+        keys={"order.get": lambda params: params["order_id"], "order.cancel": lambda params: params["order_id"]},
+    )
+    orders = JarpcClient(transport=transport)
+    ```
+
+    Keys are hashed by their `str`, so `42` and `"42"` go to the same shard.
+    Batches of requests (micro-batching, `NotificationSender`) can't be used: a batch may span shards.
+    """
+
+    supports_batches = False
+
+    def __init__(
+        self,
+        shards: Mapping[str, Transport],
+        keys: Mapping[str, Callable[[Any], Hashable]],
+        default_key: Callable[[JarpcRequest], Hashable] | None = None,
+        vnodes: int = 160,
+    ):
+        """
+        :param shards: Transports by shard name. Names, not transports, are placed on the ring,
+                       so a shard keeps its keys when its transport is replaced.
+        :param keys: Per-method functions returning the shard key of params. Params are passed as plain data
+                     (dicts), also for calls of `JarpcClientRouter` endpoints.
+        :param default_key: Returns the shard key of requests of other methods. If not given,
+                            calls of other methods raise ValueError.
+        :param vnodes: Number of virtual nodes per shard; more nodes spread keys more evenly.
+        """
+        if vnodes < 1:
+            raise ValueError("vnodes must be positive")
+        self.keys: Mapping[str, Callable[[Any], Hashable]] = keys
+        self.default_key: Callable[[JarpcRequest], Hashable] | None = default_key
+        self.vnodes: int = vnodes
+        self._shards: dict[str, Transport] = {}
+        self._ring: list[tuple[int, str]] = []
+        self._hashes: list[int] = []
+        for name, transport in shards.items():
+            self.add_shard(name, transport, rebuild=False)
+        self._rebuild()
+        self.codec = next((getattr(transport, "codec", None) for transport in self._shards.values()), None)
+
+    @property
+    def shards(self) -> dict[str, Transport]:
+        return dict(self._shards)
+
+    def add_shard(self, name: str, transport: Transport, rebuild: bool = True) -> None:
+        """Adds a shard or replaces the transport of an existing one."""
+        self._shards[name] = transport
+        if rebuild:
+            self._rebuild()
+
+    def remove_shard(self, name: str) -> None:
+        """Removes the shard, its keys move to the neighbouring shards."""
+        del self._shards[name]
+        self._rebuild()
+
+    def shard_for(self, key: Hashable) -> str:
+        """Returns the name of the shard owning the key."""
+        if not self._ring:
+            raise ValueError("there are no shards")
+        index = bisect(self._hashes, _hash(str(key)))
+        return self._ring[index % len(self._ring)][1]
+
+    async def __call__(self, request_string: str | bytes, request: JarpcRequest, **kwargs: Any) -> Any:
+        if not isinstance(request, JarpcRequest):
+            raise ValueError("batches of requests can't be sharded")
+        key_getter = self.keys.get(request.method)
+        if key_getter is not None:
+            params = request.params
+            if isinstance(params, BaseModel):
+                # `JarpcClientRouter` passes its params model, key functions get params as sent: plain data
+                params = params.model_dump()
+            key = key_getter(params)
+        elif self.default_key is not None:
+            key = self.default_key(request)
+        else:
+            raise ValueError(f"no shard key for method {request.method!r}")
+        return await self._shards[self.shard_for(key)](request_string, request, **kwargs)
+
+    def _rebuild(self) -> None:
+        self._ring = sorted((_hash(f"{name}#{node}"), name) for name in self._shards for node in range(self.vnodes))
+        self._hashes = [point for point, _ in self._ring]
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from jarpcdantic import JarpcDispatcher, JarpcManager
+from jarpcdantic.asgi import JarpcASGIApp
+
+
+async def call_app(app, body: bytes, method: str = "POST", chunk_size: int | None = None):
+    chunk_size = chunk_size or max(len(body), 1)
+    chunks = [body[i : i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await app({"type": "http", "method": method, "path": "/"}, receive, send)
+    return sent[0]["status"], dict(sent[0]["headers"]), sent[1]["body"]
+
+
+@pytest.fixture
+def app():
+    dispatcher = JarpcDispatcher()
+    dispatcher.add_rpc_method(lambda a, b: a + b, "add")
+    return JarpcASGIApp(JarpcManager(dispatcher, run_sync_in_thread=False), max_body_size=1024)
+
+
+@pytest.mark.asyncio
+class TestJarpcASGIApp:
+    async def test_single(self, app):
+        request = {"method": "add", "params": {"a": 1, "b": 2}, "id": "1"}
+
+        status, headers, body = await call_app(app, json.dumps(request).encode(), chunk_size=7)
+
+        assert status == 200
+        assert headers[b"content-type"] == b"application/json"
+        assert json.loads(body)["result"] == 3
+
+    async def test_batch(self, app):
+        requests = [
+            {"method": "add", "params": {"a": 1, "b": 2}, "id": "1"},
+            {"method": "add", "params": {"a": 1, "b": 2}, "id": "2", "rsvp": False},
+            {"method": "add", "params": {"a": 2, "b": 2}, "id": "3"},
+        ]
+
+        status, _, body = await call_app(app, b" " + json.dumps(requests).encode())
+
+        assert status == 200
+        assert [(r["request_id"], r["result"]) for r in json.loads(body)] == [("1", 3), ("3", 4)]
+
+    async def test_notification(self, app):
+        request = {"method": "add", "params": {"a": 1, "b": 2}, "rsvp": False}
+
+        status, _, body = await call_app(app, json.dumps(request).encode())
+
+        assert (status, body) == (204, b"")
+
+    async def test_invalid_batch(self, app):
+        status, _, body = await call_app(app, b"[]")
+
+        assert status == 200
+        assert json.loads(body)[0]["error"]["code"] == -32600
+
+    @pytest.mark.parametrize(
+        "method, body, expected_status",
+        [("GET", b"", 405), ("POST", b"x" * 2048, 413)],
+    )
+    async def test_rejected(self, app, method, body, expected_status):
+        status, _, _ = await call_app(app, body, method=method, chunk_size=512)
+
+        assert status == expected_status
+
+    async def test_lifespan_shutdown(self, app):
+        messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        await app({"type": "lifespan"}, receive, send)
+
+        assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        assert app.manager.draining
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+from jarpcdantic import BalancedTransport, JarpcClient, JarpcExternalServiceUnavailable, JarpcResponse
+
+
+class Replica:
+    def __init__(self, name, delay=0.0, down=False):
+        self.name = name
+        self.delay = delay
+        self.down = down
+        self.calls = 0
+
+    async def __call__(self, request_string, request):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.down:
+            raise JarpcExternalServiceUnavailable()
+        return JarpcResponse(request_id=request.id, result=self.name).model_dump_json()
+
+
+@pytest.mark.asyncio
+class TestBalancedTransport:
+    async def test_slow_replica_gets_less_traffic(self):
+        fast, slow = Replica("fast", delay=0.001), Replica("slow", delay=0.03)
+        client = JarpcClient(BalancedTransport([fast, slow]))
+
+        for _ in range(5):
+            await asyncio.gather(*(client.ping() for _ in range(10)))
+
+        assert fast.calls > slow.calls * 2
+
+    async def test_failing_replica_is_ejected(self):
+        # the failing replica answers faster, so only ejection keeps calls away from it
+        good, bad = Replica("good", delay=0.002), Replica("bad", down=True)
+        transport = BalancedTransport([good, bad], max_failures=2, ejection_time=10.0)
+        client = JarpcClient(transport)
+
+        results = []
+        for _ in range(30):
+            try:
+                results.append(await client.ping())
+            except JarpcExternalServiceUnavailable:
+                pass
+
+        assert bad.calls == 2
+        assert results.count("good") == 28
+        assert [stats["ejected"] for stats in transport.stats()] == [False, True]
+
+    async def test_all_ejected(self):
+        replica = Replica("only", down=True)
+        client = JarpcClient(BalancedTransport([replica], max_failures=1))
+        for _ in range(2):
+            with pytest.raises(JarpcExternalServiceUnavailable):
+                await client.ping()
+        assert replica.calls == 2
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+from jarpcdantic import (
+    CircuitBreaker,
+    JarpcCircuitOpen,
+    JarpcClient,
+    JarpcExternalServiceUnavailable,
+    JarpcResponse,
+    JarpcValidationError,
+)
+
+
+class SwitchTransport:
+    """Fails with `error` while it is set."""
+
+    def __init__(self):
+        self.error = None
+        self.delay = 0.0
+        self.calls = 0
+
+    async def __call__(self, request_string, request):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return JarpcResponse(request_id=request.id, result="ok").model_dump_json()
+
+
+async def call_many(client, method, times):
+    for _ in range(times):
+        try:
+            await client(method, {})
+        except Exception:
+            pass
+
+
+@pytest.mark.asyncio
+class TestCircuitBreaker:
+    async def test_opens_and_recovers(self):
+        transport = SwitchTransport()
+        breaker = CircuitBreaker(window=10, min_calls=4, open_timeout=0.05, half_open_calls=2)
+        client = JarpcClient(transport, middlewares=[breaker])
+
+        transport.error = JarpcExternalServiceUnavailable()
+        await call_many(client, "menu", 4)
+        assert breaker.state("menu") == "open"
+
+        with pytest.raises(JarpcCircuitOpen):
+            await client.menu()
+        assert transport.calls == 4
+        # other methods are not affected
+        transport.error = None
+        assert await client.cook() == "ok"
+
+        await asyncio.sleep(0.05)
+        assert breaker.state("menu") == "half_open"
+        assert await client.menu() == "ok"
+        assert await client.menu() == "ok"
+        assert breaker.states() == {"menu": "closed", "cook": "closed"}
+
+    async def test_failed_trial_reopens(self):
+        transport = SwitchTransport()
+        breaker = CircuitBreaker(window=10, min_calls=2, open_timeout=0.01)
+        client = JarpcClient(transport, middlewares=[breaker])
+
+        transport.error = JarpcExternalServiceUnavailable()
+        await call_many(client, "menu", 2)
+        await asyncio.sleep(0.01)
+        await call_many(client, "menu", 1)
+
+        assert breaker.state("menu") == "open"
+
+    async def test_business_errors_and_slow_calls(self):
+        transport = SwitchTransport()
+        breaker = CircuitBreaker(window=10, min_calls=4, slow_call_duration=0.005, slow_call_rate=0.5)
+        client = JarpcClient(transport, middlewares=[breaker])
+
+        transport.error = JarpcValidationError()
+        await call_many(client, "menu", 10)
+        assert breaker.state("menu") == "closed"
+
+        transport.error = None
+        transport.delay = 0.01
+        await call_many(client, "menu", 5)
+        assert breaker.state("menu") == "open"
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+from jarpcdantic import JarpcClient, JarpcResponse, JarpcTimeout, ResponseCache
+
+
+class CountingTransport:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.error = None
+
+    async def __call__(self, request_string, request):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return JarpcResponse(request_id=request.id, result=self.calls).model_dump_json()
+
+
+@pytest.mark.asyncio
+class TestResponseCache:
+    async def test_hits_and_keys(self):
+        transport = CountingTransport()
+        cache = ResponseCache(methods={"settings"}, ttl=10.0)
+        client = JarpcClient(transport, middlewares=[cache])
+
+        assert await client("settings", {"a": 1, "b": 2}) == 1
+        assert await client("settings", {"b": 2, "a": 1}) == 1
+        assert await client("settings", {"a": 2}) == 2
+        assert await client("menu", {}) == 3
+        assert await client("menu", {}) == 4
+        assert (cache.hits, cache.misses) == (1, 2)
+
+        cache.invalidate("settings")
+        assert await client("settings", {"a": 1, "b": 2}) == 5
+
+    async def test_coalescing_and_errors(self):
+        transport = CountingTransport(delay=0.01)
+        client = JarpcClient(transport, middlewares=[ResponseCache(methods={"settings"})])
+
+        assert await asyncio.gather(*(client.settings() for _ in range(5))) == [1] * 5
+        assert transport.calls == 1
+
+        transport.error = JarpcTimeout()
+        client = JarpcClient(transport, middlewares=[ResponseCache(methods={"settings"})])
+        with pytest.raises(JarpcTimeout):
+            await client.settings()
+        transport.error = None
+        assert await client.settings() == 3
+
+    async def test_stale_while_revalidate_and_lru(self):
+        transport = CountingTransport()
+        cache = ResponseCache(methods={"settings"}, ttl=0.01, stale_ttl=10.0, max_size=2)
+        client = JarpcClient(transport, middlewares=[cache])
+
+        assert await client.settings() == 1
+        await asyncio.sleep(0.02)
+        assert await client.settings() == 1
+        await asyncio.sleep(0.005)
+        assert await client.settings() == 2
+        assert cache.stale_hits == 1
+
+        await client("settings", {"a": 1})
+        await client("settings", {"a": 2})
+        assert len(cache) == 2
+
+    async def test_response_types_are_not_shared(self):
+        class Counter(BaseModel):
+            value: int
+
+        class Transport(CountingTransport):
+            async def __call__(self, request_string, request, **kwargs):
+                self.calls += 1
+                value = self.calls
+                await asyncio.sleep(self.delay)
+                return JarpcResponse(request_id=request.id, result={"value": value}).model_dump_json()
+
+        transport = Transport(delay=0.01)
+        client = JarpcClient(transport, middlewares=[ResponseCache(methods={"counter"})])
+
+        plain, typed, typed_again = await asyncio.gather(
+            client("counter", {}),
+            client("counter", {}, generic_response_type=Counter),
+            client("counter", {}, generic_response_type=Counter),
+        )
+        assert isinstance(plain, dict) and isinstance(typed, Counter)
+        assert typed is typed_again and plain["value"] != typed.value
+        assert await client("counter", {}, generic_response_type=Counter, timeout=1.0) == Counter(value=3)
+        assert transport.calls == 3
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import json
 from unittest import mock
 
@@ -8,6 +9,8 @@ from freezegun import freeze_time
 from jarpcdantic import (
     AsyncJarpcClient,
     JarpcClient,
+    JarpcDispatcher,
+    JarpcManager,
     JarpcRequest,
     JarpcServerError,
     JarpcTimeout,
@@ -205,3 +208,69 @@ class TestJarpcClient:
         call_result = jarpc_client.method(param1=1)
 
         assert call_result == response["result"]
+
+
+@pytest.mark.asyncio
+class TestBatching:
+    @pytest.fixture
+    def manager(self):
+        dispatcher = JarpcDispatcher()
+        dispatcher.add_rpc_method(lambda value: value * 2, "double")
+
+        @dispatcher.rpc_method
+        def fail():
+            raise JarpcValidationError({"field": "value"})
+
+        return JarpcManager(dispatcher)
+
+    async def test_concurrent_calls_share_batch(self, manager):
+        sent = []
+
+        async def transport(request_string, requests):
+            sent.append(requests)
+            return await manager.handle(request_string)
+
+        client = JarpcClient(transport, batch_window=0.01, batch_size=3)
+        results = await asyncio.gather(
+            *(client.double(value=i) for i in range(4)),
+            client.double(value=0, rsvp=False),
+            client.fail(),
+            return_exceptions=True,
+        )
+
+        assert results[:5] == [0, 2, 4, 6, None]
+        assert isinstance(results[5], JarpcValidationError)
+        assert [len(requests) for requests in sent] == [3, 3]
+
+    async def test_transport_error_fails_whole_batch(self):
+        async def transport(request_string, requests):
+            raise ConnectionError
+
+        client = JarpcClient(transport, batch_window=0)
+        results = await asyncio.gather(client.a(), client.b(), return_exceptions=True)
+
+        assert all(isinstance(result, JarpcServerError) for result in results)
+
+    async def test_cancelled_batch_fails_calls(self):
+        async def transport(request_string, requests):
+            await asyncio.sleep(10)
+
+        client = JarpcClient(transport, batch_window=0)
+        calls = [asyncio.ensure_future(client.a()), asyncio.ensure_future(client.b())]
+        await asyncio.sleep(0.01)
+        for task in client._batcher._tasks:
+            task.cancel()
+
+        results = await asyncio.wait_for(asyncio.gather(*calls, return_exceptions=True), 1)
+        assert all(isinstance(result, JarpcServerError) for result in results)
+
+    def test_transport_without_batches(self):
+        class Transport:
+            supports_batches = False
+
+            async def __call__(self, request_string, request):
+                pass
+
+        with pytest.raises(ValueError):
+            JarpcClient(Transport(), batch_window=0)
+        assert JarpcClient(Transport())._batcher is None
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import datetime
+import json
+
+import pytest
+from pydantic import BaseModel
+
+from jarpcdantic import JarpcClient, JarpcDispatcher, JarpcManager, JarpcRequest, JarpcResponse
+from jarpcdantic.asgi import JarpcASGIApp
+from jarpcdantic.codecs import JarpcCodec, get_codec, json_codec, msgpack_codec, packb, unpackb
+from jarpcdantic.framed import FramedTransport, JarpcStreamServer
+
+
+class Sample(BaseModel):
+    values: list[float]
+    blob: bytes
+    when: datetime.date
+
+
+@pytest.mark.parametrize(
+    "value, encoded",
+    [
+        (None, b"\xc0"),
+        (True, b"\xc3"),
+        (5, b"\x05"),
+        (-3, b"\xfd"),
+        (200, b"\xcc\xc8"),
+        (-200, b"\xd1\xff\x38"),
+        (2**40, b"\xcf\x00\x00\x01\x00\x00\x00\x00\x00"),
+        (1.5, b"\xcb\x3f\xf8\x00\x00\x00\x00\x00\x00"),
+        ("abc", b"\xa3abc"),
+        ("x" * 40, b"\xd9\x28" + b"x" * 40),
+        (b"\x00\x01", b"\xc4\x02\x00\x01"),
+        ([1, [2]], b"\x92\x01\x91\x02"),
+        ({"a": 1}, b"\x81\xa1a\x01"),
+        (list(range(16)), b"\xdc\x00\x10" + bytes(range(16))),
+    ],
+)
+def test_pure_msgpack(value, encoded):
+    assert packb(value) == encoded
+    assert unpackb(encoded) == value
+
+
+@pytest.mark.parametrize("data", [b"", b"\x92\x01", b"\xa3ab", b"\x01\x02", b"\xc1"])
+def test_pure_msgpack_invalid(data):
+    with pytest.raises(ValueError):
+        unpackb(data)
+
+
+@pytest.mark.parametrize("codec", [json_codec, msgpack_codec])
+def test_roundtrip(codec):
+    sample = Sample(values=[0.1, 2.5e-8], blob=b"\x00\x7f", when=datetime.date(2024, 1, 2))
+    request = JarpcRequest[Sample](method="store", params=sample, id="1")
+
+    decoded = codec.decode(codec.encode(request), JarpcRequest[Sample])
+
+    assert decoded == request
+    assert codec.detect(codec.encode(request))
+    assert codec.is_batch(codec.encode_batch([request, request]))
+    assert not codec.is_batch(codec.encode(request))
+
+
+@pytest.mark.parametrize("codec", [json_codec, msgpack_codec])
+def test_peek_response_id(codec):
+    def head(model):
+        encoded = codec.encode(model)
+        return (encoded.encode() if isinstance(encoded, str) else encoded)[:64]
+
+    response = JarpcResponse(result="x" * 1000, request_id="42", id="2")
+
+    assert codec.peek_response_id(head(response)) == "42"
+    assert codec.peek_response_id(head(JarpcResponse(error={}))) is None
+    with pytest.raises(ValueError):
+        codec.peek_response_id(head(response)[:3])
+    with pytest.raises(ValueError):
+        codec.peek_response_id(head(JarpcRequest(method="m", params={})))
+
+
+def test_incomplete_codec():
+    class Incomplete(JarpcCodec):
+        def encode(self, model, **dump_kwargs):
+            return model.model_dump_json()
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_msgpack_is_compact():
+    response = JarpcResponse(result={"values": [i / 7 for i in range(100)]}, request_id="1", id="2")
+
+    assert len(msgpack_codec.encode(response)) < len(json_codec.encode(response)) * 0.6
+
+
+def test_get_codec():
+    assert get_codec("application/json; charset=utf-8") is json_codec
+    assert get_codec("msgpack") is msgpack_codec
+    assert get_codec("text/plain") is None
+
+
+@pytest.fixture
+def manager():
+    dispatcher = JarpcDispatcher()
+
+    @dispatcher.rpc_method
+    async def echo(sample: Sample) -> Sample:
+        return sample
+
+    return JarpcManager(dispatcher)
+
+
+@pytest.mark.asyncio
+class TestNegotiation:
+    sample = Sample(values=[1.0], blob=b"\x01", when=datetime.date(2024, 1, 2))
+
+    async def test_manager_detects_codec(self, manager):
+        request = JarpcRequest(method="echo", params={"sample": self.sample.model_dump()}, id="1")
+
+        msgpack_response = await manager.handle(msgpack_codec.encode(request))
+        json_response = await manager.handle(json_codec.encode(request))
+        batch_response = await manager.handle(msgpack_codec.encode_batch([request, request]))
+
+        assert msgpack_codec.decode(msgpack_response, JarpcResponse[Sample]).result == self.sample
+        assert json.loads(json_response)["request_id"] == "1"
+        assert len(msgpack_codec.loads(batch_response)) == 2
+
+    async def test_framed(self, manager):
+        server = JarpcStreamServer(manager)
+        await server.start(host="127.0.0.1", port=0)
+        transport = FramedTransport(
+            host="127.0.0.1", port=server.sockets[0].getsockname()[1], codec=msgpack_codec
+        )
+        client = JarpcClient(transport=transport)
+
+        result = await client("echo", {"sample": self.sample}, generic_response_type=Sample)
+
+        assert client.codec is msgpack_codec
+        assert result == self.sample
+        await transport.aclose()
+        await server.close()
+
+    async def test_asgi_content_type(self, manager):
+        app = JarpcASGIApp(manager)
+        request = JarpcRequest(method="echo", params={"sample": self.sample.model_dump()}, id="1")
+        messages = [{"type": "http.request", "body": msgpack_codec.encode(request)}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "POST", "headers": [(b"content-type", b"application/msgpack")]}
+        await app(scope, receive, send)
+
+        assert (b"content-type", b"application/msgpack") in sent[0]["headers"]
+        assert msgpack_codec.decode(sent[1]["body"], JarpcResponse[Sample]).result == self.sample
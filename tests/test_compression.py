@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from jarpcdantic import CompressionPolicy, JarpcClient, JarpcDispatcher, JarpcManager, JarpcServerError
+from jarpcdantic.codecs import msgpack_codec
+from jarpcdantic.compression import (
+    COMPRESSION_META_KEY,
+    available_algorithms,
+    compress,
+    decompress,
+    is_compressed,
+    peek,
+)
+from jarpcdantic.context import meta_context_var
+
+PAYLOAD = b'{"method": "echo", "params": {"text": "' + b"salad " * 1000 + b'"}}'
+
+
+@pytest.mark.parametrize("algorithm", available_algorithms())
+def test_roundtrip(algorithm):
+    compressed = compress(PAYLOAD, algorithm)
+
+    assert is_compressed(compressed)
+    assert not is_compressed(PAYLOAD)
+    assert len(compressed) < len(PAYLOAD) / 10
+    assert decompress(compressed) == PAYLOAD
+    assert peek(compressed, 10) == PAYLOAD[:10]
+
+
+@pytest.mark.parametrize("data", [compress(PAYLOAD)[:-5], b"\x00?abc", b"\x00zgarbage"])
+def test_invalid(data):
+    with pytest.raises(ValueError):
+        decompress(data)
+
+
+def test_max_size():
+    with pytest.raises(ValueError):
+        decompress(compress(PAYLOAD), max_size=1000)
+    assert decompress(compress(PAYLOAD), max_size=len(PAYLOAD)) == PAYLOAD
+
+
+def test_policy():
+    policy = CompressionPolicy(threshold=100, algorithms=["zlib"])
+
+    assert policy.choose(["lzma", "zlib"]) == "zlib"
+    assert policy.choose(["brotli"]) is None
+    assert policy.choose(None) is None
+    assert policy.maybe_compress(b"short", "zlib") == b"short"
+    assert is_compressed(policy.maybe_compress(PAYLOAD, "zlib"))
+    assert policy.maybe_compress(PAYLOAD, None) == PAYLOAD
+    # the threshold counts bytes, not characters
+    assert is_compressed(policy.maybe_compress("щ" * 60, "zlib"))
+    with pytest.raises(ValueError):
+        CompressionPolicy(algorithms=["brotli"])
+
+
+class Wire:
+    """Bytes transport recording what is sent in both directions."""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.requests = []
+        self.responses = []
+
+    async def __call__(self, request_string, request):
+        self.requests.append(request_string)
+        response = await self.manager.handle(request_string)
+        self.responses.append(response)
+        return response
+
+
+def make_manager(compression=None):
+    dispatcher = JarpcDispatcher()
+    dispatcher.add_rpc_method(lambda text: text, "echo")
+    dispatcher.add_rpc_method(lambda: meta_context_var.get(), "meta")
+    return JarpcManager(dispatcher, compression=compression)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("codec", [None, msgpack_codec])
+async def test_negotiation(codec):
+    policy = CompressionPolicy(threshold=1000)
+    wire = Wire(make_manager(policy))
+    client = JarpcClient(wire, codec=codec, compression=policy)
+    text = "salad " * 1000
+
+    # the first call neither asks for compression nor compresses until the server advertises it
+    assert await client.echo(text=text) == text
+    assert not is_compressed(wire.requests[-1])
+    assert not is_compressed(wire.responses[-1])
+
+    assert await client.echo(text=text) == text
+    assert is_compressed(wire.requests[-1])
+    assert is_compressed(wire.responses[-1])
+
+    # small payloads are never compressed
+    assert await client.echo(text="short") == "short"
+    assert not is_compressed(wire.requests[-1])
+    assert not is_compressed(wire.responses[-1])
+
+
+@pytest.mark.asyncio
+async def test_peers_without_policy():
+    text = "salad " * 1000
+
+    wire = Wire(make_manager(CompressionPolicy(threshold=1000)))
+    client = JarpcClient(wire)
+    assert await client.echo(text=text) == text
+    assert not is_compressed(wire.responses[-1])
+
+    wire = Wire(make_manager())
+    client = JarpcClient(wire, compression=CompressionPolicy(threshold=1000))
+    assert await client.echo(text=text) == text
+    assert await client.echo(text=text) == text
+    assert not any(is_compressed(request) for request in wire.requests)
+
+
+@pytest.mark.asyncio
+async def test_eager_requests_and_meta():
+    wire = Wire(make_manager(CompressionPolicy(threshold=10)))
+    client = JarpcClient(wire, compression=CompressionPolicy(threshold=10, compress_requests=True))
+
+    assert await client.meta(meta={"user": "admin"}) == {"user": "admin"}
+    assert is_compressed(wire.requests[-1])
+    assert COMPRESSION_META_KEY not in (await client.meta())
+
+
+@pytest.mark.asyncio
+async def test_meta_key_is_not_propagated():
+    wire = Wire(make_manager())
+    client = JarpcClient(wire, compression=CompressionPolicy(threshold=10))
+
+    # e.g. a key left in meta by an older server that didn't pop it
+    token = meta_context_var.set({COMPRESSION_META_KEY: ["zlib"], "user": "admin"})
+    try:
+        assert await client.meta() == {"user": "admin"}
+        assert await client.meta() == {"user": "admin"}
+        # a client without a policy doesn't send the key at all, even to servers that would keep it
+        plain_wire = Wire(make_manager())
+        await JarpcClient(plain_wire).meta()
+        assert COMPRESSION_META_KEY not in plain_wire.requests[-1]
+    finally:
+        meta_context_var.reset(token)
+
+
+@pytest.mark.asyncio
+async def test_compressed_payloads_without_policy():
+    # nobody was offered compression, so compressed payloads are rejected instead of expanded
+    manager = make_manager()
+    response = await manager.handle(compress(PAYLOAD))
+    with pytest.raises(Exception) as exc_info:
+        JarpcClient(manager.handle)._parse_response(response, True)
+    assert exc_info.value.code == -32700
+
+    with pytest.raises(JarpcServerError):
+        JarpcClient(manager.handle)._parse_response(compress(b'{"result": 1, "request_id": "1"}'), True)
+
+
+@pytest.mark.asyncio
+async def test_invalid_compressed_request():
+    manager = make_manager(CompressionPolicy(max_decompressed_size=100))
+    client = JarpcClient(manager.handle)
+
+    response = await manager.handle(compress(PAYLOAD))
+    with pytest.raises(Exception) as exc_info:
+        client._parse_response(response, True)
+    assert exc_info.value.code == -32700
@@ -101,3 +101,16 @@ class TestJarpcResponse:
         assert jarpc_response.error == data.get("error")
         assert jarpc_response.request_id == data["request_id"]
         assert jarpc_response.id == data["id"]
+
+
+def test_typed_models_are_cached():
+    from jarpcdantic import JarpcClient
+    from jarpcdantic.format import _typed_responses, typed_request, typed_response
+
+    result_type = dict[str, list[int | None]]
+    JarpcClient.warmup(response_types=[result_type])
+
+    assert result_type in _typed_responses
+    assert typed_response(result_type) is typed_response(result_type)
+    assert typed_response(result_type).model_validate({"result": {"a": [1, None]}}).result == {"a": [1, None]}
+    assert typed_request(int) is typed_request(int)
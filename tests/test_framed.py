@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+from jarpcdantic import (
+    CompressionPolicy,
+    JarpcClient,
+    JarpcDispatcher,
+    JarpcExternalServiceUnavailable,
+    JarpcManager,
+    JarpcParseError,
+    JarpcRequest,
+    JarpcResponse,
+    JarpcServerError,
+    JarpcShuttingDown,
+    JarpcTimeout,
+)
+from jarpcdantic.compression import compress
+from jarpcdantic.framed import FramedTransport, JarpcStreamServer, pack_frame, read_frame
+
+
+@pytest.fixture
+def manager():
+    dispatcher = JarpcDispatcher()
+
+    @dispatcher.rpc_method
+    async def sleep_and_echo(value, delay):
+        await asyncio.sleep(delay)
+        return value
+
+    @dispatcher.rpc_method
+    async def notify(events):
+        events.append("notified")
+
+    return JarpcManager(dispatcher, context={"events": []})
+
+
+@pytest.mark.asyncio
+class TestFramed:
+    async def test_read_frame(self):
+        reader = asyncio.StreamReader()
+        reader.feed_data(pack_frame(b"abc") + pack_frame(b""))
+        reader.feed_eof()
+
+        assert await read_frame(reader) == b"abc"
+        assert await read_frame(reader) == b""
+        with pytest.raises(asyncio.IncompleteReadError):
+            await read_frame(reader)
+
+    async def test_pipelining(self, manager):
+        server = JarpcStreamServer(manager)
+        await server.start(host="127.0.0.1", port=0)
+        transport = FramedTransport(host="127.0.0.1", port=server.sockets[0].getsockname()[1])
+        client = JarpcClient(transport=transport)
+
+        results = await asyncio.gather(
+            client("sleep_and_echo", {"value": "slow", "delay": 0.05}),
+            client("sleep_and_echo", {"value": "fast", "delay": 0}),
+            client("sleep_and_echo", {"value": "slow", "delay": 0.05}, request_id="same"),
+            client("sleep_and_echo", {"value": "fast", "delay": 0}, request_id="same"),
+        )
+
+        assert sorted(results) == ["fast", "fast", "slow", "slow"]
+        assert results[:2] == ["slow", "fast"]
+
+        await client("notify", {}, rsvp=False)
+        await asyncio.sleep(0.05)
+        assert manager.context["events"] == ["notified"]
+
+        await transport.aclose()
+        await server.close()
+
+    async def test_unanswered_calls(self, manager):
+        server = JarpcStreamServer(manager)
+        await server.start(host="127.0.0.1", port=0)
+        transport = FramedTransport(host="127.0.0.1", port=server.sockets[0].getsockname()[1])
+        client = JarpcClient(transport=transport)
+
+        # the server drops the response of an expired request, the call ends at the deadline
+        with pytest.raises(JarpcTimeout):
+            await client("sleep_and_echo", {"value": 1, "delay": 0.2}, ttl=0.05)
+
+        # a request that can't be parsed is answered without id
+        with pytest.raises(JarpcParseError):
+            client._parse_response(await transport(b"garbage", JarpcRequest(method="m", params={})), True)
+        # a malformed one keeps its id
+        response = await transport(b'{"id": "malformed"}', JarpcRequest(method="m", params={}, id="malformed"))
+        assert b'"request_id":"malformed"' in response
+
+        await transport.aclose()
+        await server.close()
+
+    async def test_unix_socket(self, manager, tmp_path):
+        path = str(tmp_path / "jarpc.sock")
+        server = JarpcStreamServer(manager)
+        await server.start(path=path)
+        transport = FramedTransport(path=path)
+        client = JarpcClient(transport=transport)
+
+        assert await client("sleep_and_echo", {"value": 1, "delay": 0}) == 1
+
+        await transport.aclose()
+        await server.close()
+
+    async def test_connection_lost(self, manager):
+        server = JarpcStreamServer(manager)
+        await server.start(host="127.0.0.1", port=0)
+        port = server.sockets[0].getsockname()[1]
+        client = JarpcClient(transport=FramedTransport(host="127.0.0.1", port=port))
+
+        call = asyncio.create_task(client("sleep_and_echo", {"value": 1, "delay": 10}))
+        await asyncio.sleep(0.05)
+        await server.close(timeout=0)
+
+        # the drain cancels the request only, the connection handler still answers it
+        with pytest.raises(JarpcShuttingDown):
+            await call
+        with pytest.raises(JarpcExternalServiceUnavailable):
+            await client("sleep_and_echo", {"value": 1, "delay": 0})
+
+    async def test_compressed_responses(self, manager):
+        manager.compression = CompressionPolicy(threshold=100)
+        server = JarpcStreamServer(manager)
+        await server.start(host="127.0.0.1", port=0)
+        transport = FramedTransport(host="127.0.0.1", port=server.sockets[0].getsockname()[1])
+        client = JarpcClient(transport=transport, compression=CompressionPolicy(threshold=100, compress_requests=True))
+
+        value = "salad " * 1000
+        assert await client("sleep_and_echo", {"value": value, "delay": 0}) == value
+        await transport.aclose()
+        await server.close()
+
+    async def test_compressed_responses_without_policy(self):
+        async def handle(reader, writer):
+            request = JarpcRequest.model_validate_json(await read_frame(reader))
+            response = JarpcResponse(request_id=request.id, result="salad " * 1000)
+            writer.write(pack_frame(compress(response.model_dump_json().encode())))
+            await writer.drain()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        transport = FramedTransport(host="127.0.0.1", port=server.sockets[0].getsockname()[1])
+
+        # the transport finds the call, the client refuses the payload it never asked for
+        with pytest.raises(JarpcServerError):
+            await asyncio.wait_for(JarpcClient(transport=transport).echo(), 1)
+        await transport.aclose()
+        server.close()
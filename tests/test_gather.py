@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+from jarpcdantic import JarpcClient, JarpcTimeout, JarpcValidationError
+
+
+async def call(value, delay=0.0, error=None):
+    await asyncio.sleep(delay)
+    if error is not None:
+        raise error
+    return value
+
+
+@pytest.mark.asyncio
+class TestGather:
+    async def test_partial_results(self):
+        results = await JarpcClient.gather(
+            [call(1), call(2, error=JarpcValidationError()), call(3, delay=1.0)], deadline=0.05
+        )
+
+        assert results[0].ok and results[0].value == 1
+        assert isinstance(results[1].error, JarpcValidationError)
+        assert isinstance(results[2].error, JarpcTimeout)
+        with pytest.raises(JarpcTimeout):
+            results[2].unwrap()
+
+    async def test_concurrency(self):
+        running = 0
+        peak = 0
+
+        async def tracked(value):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return value
+
+        results = await JarpcClient.gather((tracked(i) for i in range(10)), concurrency=3)
+
+        assert [result.unwrap() for result in results] == list(range(10))
+        assert peak == 3
+
+    async def test_deadline_skips_queued_calls(self):
+        started = []
+
+        async def slow(value):
+            started.append(value)
+            await asyncio.sleep(1.0)
+
+        results = await JarpcClient.gather([slow(i) for i in range(5)], concurrency=2, deadline=0.05)
+
+        assert started == [0, 1]
+        assert all(isinstance(result.error, JarpcTimeout) for result in results)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+from jarpcdantic import HedgedTransport, JarpcClient, JarpcResponse, JarpcTimeout
+
+
+class DelayedTransport:
+    """Answers after the next delay of the list (or the default one)."""
+
+    def __init__(self, name, delays=(), default=0.0, error=None):
+        self.name = name
+        self.delays = list(delays)
+        self.default = default
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self, request_string, request):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delays.pop(0) if self.delays else self.default)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return JarpcResponse(request_id=request.id, result=self.name).model_dump_json()
+
+
+@pytest.mark.asyncio
+class TestHedgedTransport:
+    async def test_slow_call_is_hedged(self):
+        primary = DelayedTransport("primary", delays=[0.0] * 20 + [1.0])
+        secondary = DelayedTransport("secondary")
+        transport = HedgedTransport(primary, {"menu"}, secondary=secondary, min_samples=20, max_hedge_ratio=1.0)
+        client = JarpcClient(transport)
+
+        for _ in range(20):
+            assert await client.menu() == "primary"
+        assert transport.hedge_delay("menu") is not None
+
+        assert await client.menu() == "secondary"
+        await asyncio.sleep(0)
+        assert primary.cancelled == 1
+        assert transport.hedges == 1
+
+    async def test_non_idempotent_and_budget(self):
+        primary = DelayedTransport("primary", delays=[0.0] * 5, default=0.02)
+        transport = HedgedTransport(primary, {"menu"}, min_samples=5, max_hedge_ratio=0.0)
+        client = JarpcClient(transport)
+
+        for _ in range(5):
+            await client.menu()
+        await client.cook()
+        await client.menu()
+        await client.menu()
+
+        # the initial budget allows a single hedge, "cook" is never hedged
+        assert transport.hedges == 1
+        assert primary.calls == 9
+
+    async def test_failed_copy_waits_for_other(self):
+        primary = DelayedTransport("primary", delays=[0.0] * 5 + [0.05])
+        secondary = DelayedTransport("secondary", error=JarpcTimeout())
+        transport = HedgedTransport(primary, {"menu"}, secondary=secondary, min_samples=5)
+        client = JarpcClient(transport)
+
+        for _ in range(5):
+            await client.menu()
+
+        assert await client.menu() == "primary"
+        assert secondary.calls == 1
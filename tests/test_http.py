@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import socket
+import struct
+
+import pytest
+
+from jarpcdantic import (
+    JarpcClient,
+    JarpcDispatcher,
+    JarpcExternalServiceUnavailable,
+    JarpcManager,
+    JarpcServerError,
+    JarpcTimeout,
+)
+from jarpcdantic.http import HttpTransport
+
+
+class HttpServer:
+    """Minimal keep-alive HTTP/1.1 server feeding a manager."""
+
+    def __init__(self, manager, chunked=False, close_after=None, reset=False):
+        self.manager = manager
+        self.chunked = chunked
+        self.close_after = close_after
+        self.reset = reset
+        self.connections = 0
+        self.server = None
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}/rpc".format(self.server.sockets[0].getsockname()[1])
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        served = 0
+        try:
+            while True:
+                head = (await reader.readuntil(b"\r\n\r\n")).decode()
+                length = int(head.lower().split("content-length:")[1].split("\r\n")[0])
+                response = await self.manager.handle(await reader.readexactly(length))
+                served += 1
+                if response is None:
+                    writer.write(b"HTTP/1.1 204 No Content\r\n\r\n")
+                else:
+                    body = response.encode() if isinstance(response, str) else response
+                    if self.chunked:
+                        middle = len(body) // 2
+                        chunks = b"".join(
+                            b"%x\r\n%s\r\n" % (len(part), part) for part in (body[:middle], body[middle:])
+                        )
+                        writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n" + chunks + b"0\r\n\r\n")
+                    else:
+                        writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+                await writer.drain()
+                if self.close_after is not None and served >= self.close_after:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if self.reset:
+                # zero linger time makes the close send RST instead of FIN
+                writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            writer.close()
+
+
+@pytest.fixture
+def manager():
+    dispatcher = JarpcDispatcher()
+    dispatcher.add_rpc_method(lambda value: value * 2, "double")
+
+    @dispatcher.rpc_method
+    async def sleep(seconds: float):
+        await asyncio.sleep(seconds)
+
+    return JarpcManager(dispatcher)
+
+
+@pytest.mark.asyncio
+class TestHttpTransport:
+    @pytest.mark.parametrize("chunked", [False, True])
+    async def test_connections_are_reused(self, manager, chunked):
+        async with HttpServer(manager, chunked=chunked) as server:
+            transport = HttpTransport(server.url)
+            client = JarpcClient(transport)
+
+            for value in range(5):
+                assert await client.double(value=value) == value * 2
+            await client.double(value=1, rsvp=False)
+
+            assert server.connections == 1
+            assert transport.stats() == {"connections": 1, "idle": 1, "connections_total": 1, "requests_total": 6}
+            await transport.aclose()
+
+    async def test_pool_limit(self, manager):
+        async with HttpServer(manager) as server:
+            transport = HttpTransport(server.url, max_connections=2)
+            client = JarpcClient(transport)
+
+            await asyncio.gather(*(client.sleep(seconds=0.01) for _ in range(6)))
+
+            assert server.connections == 2
+            await transport.aclose()
+
+    async def test_stale_connection_is_replaced(self, manager):
+        async with HttpServer(manager, close_after=1) as server:
+            transport = HttpTransport(server.url)
+            client = JarpcClient(transport)
+
+            assert await client.double(value=1) == 2
+            assert await client.double(value=2) == 4
+
+            assert server.connections == 2
+            assert transport.stats()["connections"] == 1
+            await transport.aclose()
+
+    @pytest.mark.parametrize("reset", [False, True])
+    async def test_closed_connections_are_not_counted(self, manager, reset):
+        async with HttpServer(manager, close_after=1, reset=reset) as server:
+            transport = HttpTransport(server.url)
+            client = JarpcClient(transport)
+
+            for value in range(3):
+                assert await client.double(value=value) == value * 2
+                # the server closes the idle connection before the next call takes it
+                await asyncio.sleep(0.01)
+
+            assert server.connections == 3
+            assert transport.stats()["connections"] == 1
+            await transport.aclose()
+            assert transport.stats()["connections"] == 0
+
+    async def test_close_with_calls_in_flight(self, manager):
+        async with HttpServer(manager) as server:
+            transport = HttpTransport(server.url)
+            client = JarpcClient(transport)
+
+            call = asyncio.ensure_future(client.sleep(seconds=0.02))
+            await asyncio.sleep(0.01)
+            await transport.aclose()
+            await call
+
+            assert transport.stats()["connections"] == 0 and transport.stats()["idle"] == 0
+            with pytest.raises(JarpcServerError):
+                await client.double(value=1)
+
+    async def test_deadline(self, manager):
+        async with HttpServer(manager) as server:
+            transport = HttpTransport(server.url)
+            client = JarpcClient(transport)
+            with pytest.raises(JarpcTimeout):
+                await asyncio.wait_for(client("sleep", {"seconds": 1.0}, ttl=0.05), 0.5)
+            await transport.aclose()
+
+    async def test_errors(self, manager):
+        async with HttpServer(manager) as server:
+            client = JarpcClient(HttpTransport(server.url))
+            with pytest.raises(JarpcTimeout):
+                await client("sleep", {"seconds": 1.0}, timeout=0.05)
+
+        client = JarpcClient(HttpTransport("http://127.0.0.1:1/rpc"))
+        with pytest.raises(JarpcExternalServiceUnavailable):
+            await client.double(value=1)
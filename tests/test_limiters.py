@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+
+import pytest
+
+from jarpcdantic import (
+    AdaptiveLimiter,
+    AIMDLimiter,
+    FairQueueLimiter,
+    GradientLimiter,
+    JarpcDispatcher,
+    JarpcManager,
+    JarpcTimeout,
+)
+from jarpcdantic.context import meta_context_var
+
+
+async def hold(limiter, tenant, log, release):
+    meta_context_var.set({"tenant": tenant})
+    async with limiter:
+        log.append(tenant)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+class TestFairQueueLimiter:
+    async def test_weighted_order(self):
+        limiter = FairQueueLimiter(concurrency=1, key="tenant", weights={"b": 2})
+        gate = asyncio.Event()
+        log = []
+
+        blocker = asyncio.create_task(hold(limiter, "a", log, gate))
+        await asyncio.sleep(0)
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(hold(limiter, "a", log, release)) for _ in range(4)]
+        tasks += [asyncio.create_task(hold(limiter, "b", log, release)) for _ in range(4)]
+        await asyncio.sleep(0)
+        assert limiter.queued == 8
+
+        release.set()
+        gate.set()
+        await asyncio.gather(blocker, *tasks)
+
+        assert log == ["a", "b", "b", "a", "b", "b", "a", "a", "a"]
+        assert limiter.active == 0
+        assert limiter.stats() == {}
+
+    async def test_key_limit(self):
+        limiter = FairQueueLimiter(concurrency=10, key="tenant", key_limits={"a": 2})
+        release = asyncio.Event()
+        log = []
+
+        tasks = [asyncio.create_task(hold(limiter, "a", log, release)) for _ in range(5)]
+        tasks.append(asyncio.create_task(hold(limiter, "b", log, release)))
+        await asyncio.sleep(0)
+
+        assert limiter.stats() == {
+            "a": {"active": 2, "queued": 3, "weight": 1.0, "limit": 2},
+            "b": {"active": 1, "queued": 0, "weight": 1.0, "limit": None},
+        }
+        release.set()
+        await asyncio.gather(*tasks)
+        assert limiter.active == 0
+
+    async def test_cancel_waiting(self):
+        limiter = FairQueueLimiter(concurrency=1, key=lambda meta: meta.get("client"))
+        release = asyncio.Event()
+        log = []
+
+        first = asyncio.create_task(hold(limiter, None, log, release))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(hold(limiter, None, log, release))
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+
+        second.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        assert limiter.queued == 0
+
+        release.set()
+        await first
+        assert limiter.active == 0
+
+    async def test_manager(self):
+        dispatcher = JarpcDispatcher()
+        limiter = FairQueueLimiter(concurrency=1, key="tenant")
+        manager = JarpcManager(dispatcher, limiters=[limiter])
+        seen = []
+
+        @dispatcher.rpc_method
+        async def method(param):
+            seen.append(limiter.stats())
+            return param
+
+        request = {"method": "method", "params": {"param": 1}, "meta": {"tenant": "t1"}}
+        response = await manager.get_response(json.dumps(request))
+
+        assert response.result == 1
+        assert seen == [{"t1": {"active": 1, "queued": 0, "weight": 1.0, "limit": None}}]
+
+
+@pytest.mark.asyncio
+class TestAdaptiveLimiter:
+    async def test_incomplete_subclass(self):
+        class NoAlgorithm(AdaptiveLimiter):
+            pass
+
+        with pytest.raises(TypeError):
+            NoAlgorithm()
+
+    async def test_aimd_increase_and_backoff(self):
+        limiter = AIMDLimiter(initial_limit=2, latency_threshold=1.0, backoff_ratio=0.5)
+
+        async with limiter:
+            async with limiter:
+                pass
+        assert limiter.limit == 3
+
+        with pytest.raises(JarpcTimeout):
+            async with limiter:
+                raise JarpcTimeout
+        assert limiter.limit == 1
+
+        with pytest.raises(ValueError):
+            async with limiter:
+                raise ValueError
+        assert limiter.limit == 1
+        assert limiter.inflight == 0
+
+    async def test_nested_entries(self):
+        limiter = AIMDLimiter(initial_limit=4, latency_threshold=0.03, backoff_ratio=0.5)
+
+        async with limiter:
+            await asyncio.sleep(0.05)
+            async with limiter:
+                pass
+            assert limiter.limit == 5
+        assert limiter.limit == 2
+
+    async def test_queueing(self):
+        limiter = AIMDLimiter(initial_limit=1, max_limit=1)
+        release = asyncio.Event()
+        log = []
+
+        tasks = [asyncio.create_task(hold(limiter, None, log, release)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert (limiter.inflight, limiter.queued) == (1, 2)
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert (limiter.inflight, limiter.queued, len(log)) == (0, 0, 3)
+
+    async def test_gradient_shrinks_on_latency_growth(self):
+        limiter = GradientLimiter(initial_limit=10, min_limit=2, smoothing=1.0)
+        limiter._long_rtt = 0.01
+
+        assert limiter._update(rtt=0.01, inflight=10, dropped=False) == 14
+        limiter._limit = 10.0
+        assert limiter._update(rtt=1.0, inflight=10, dropped=False) < 10
+        assert limiter._update(rtt=1.0, inflight=1, dropped=False) == 10
+
+    async def test_method_limiters(self):
+        dispatcher = JarpcDispatcher()
+        limiter = AIMDLimiter(initial_limit=5)
+        manager = JarpcManager(dispatcher, method_limiters={"limited": [limiter]})
+        seen = []
+
+        @dispatcher.rpc_method
+        async def limited():
+            seen.append(limiter.inflight)
+
+        @dispatcher.rpc_method
+        async def free():
+            seen.append(limiter.inflight)
+
+        for method in ("limited", "free"):
+            await manager.get_response(json.dumps({"method": method, "params": {}}))
+
+        assert seen == [1, 0]
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from unittest import mock
+
+import pytest
+from pydantic import BaseModel
+
+from jarpcdantic import (
+    JarpcClient,
+    JarpcDispatcher,
+    JarpcInvalidParams,
+    JarpcManager,
+    JarpcServerError,
+    JarpcValidationError,
+    LoopbackTransport,
+)
+
+
+class Dish(BaseModel):
+    name: str
+    weight: float
+
+
+@pytest.fixture
+def manager():
+    dispatcher = JarpcDispatcher()
+
+    @dispatcher.rpc_method
+    async def cook(dish: Dish, jarpc_request) -> Dish:
+        return Dish(name=dish.name.upper(), weight=dish.weight * 2)
+
+    @dispatcher.rpc_method
+    async def fail():
+        raise JarpcValidationError({"field": "name"})
+
+    return JarpcManager(dispatcher)
+
+
+@pytest.mark.asyncio
+class TestLoopbackTransport:
+    async def test_call_skips_json(self, manager):
+        client = JarpcClient(transport=LoopbackTransport(manager))
+
+        with mock.patch.object(BaseModel, "model_dump_json") as dump_json:
+            result = await client("cook", {"dish": Dish(name="salad", weight=1)}, generic_response_type=Dish)
+
+        dump_json.assert_not_called()
+        assert result == Dish(name="SALAD", weight=2)
+
+    async def test_errors(self, manager):
+        client = JarpcClient(transport=LoopbackTransport(manager))
+
+        with pytest.raises(JarpcValidationError) as e:
+            await client("fail", {})
+        assert e.value.error["field"] == "name"
+
+        with pytest.raises(JarpcInvalidParams):
+            await client("cook", {"plate": 1})
+
+        with pytest.raises(JarpcServerError):
+            await client("cook", {"dish": {"name": "soup", "weight": 1}}, generic_response_type=int)
+
+    async def test_notification(self, manager):
+        client = JarpcClient(transport=LoopbackTransport(manager))
+
+        assert await client("cook", {"dish": {"name": "soup", "weight": 1}}, rsvp=False) is None
+
+    async def test_string_call(self, manager):
+        transport = LoopbackTransport(manager)
+
+        response = await transport('{"method": "cook", "params": {"dish": {"name": "a", "weight": 1}}}', None)
+
+        assert '"name":"A"' in response
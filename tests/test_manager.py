@@ -7,7 +7,7 @@ from datetime import datetime, timezone
 
 import pytest
 
-from jarpcdantic import JarpcDispatcher, JarpcManager, JarpcRequest
+from jarpcdantic import JarpcDispatcher, JarpcManager, JarpcRequest, JarpcShuttingDown
 from jarpcdantic.manager import check_function_call
 
 
@@ -509,3 +509,90 @@ class TestCallMethod:
 
         with pytest.raises(TypeError):
             await manager._call_method(method, request)
+
+
+@pytest.mark.asyncio
+class TestShutdown:
+    basic_request = {"method": "method", "params": {}, "id": "1", "rsvp": True}
+
+    async def test_rejects_new_requests(self):
+        dispatcher = JarpcDispatcher()
+        manager = JarpcManager(dispatcher)
+        dispatcher.add_rpc_method(lambda: "ok", "method")
+
+        await manager.shutdown()
+        response = await manager.get_response(json.dumps(self.basic_request))
+
+        assert manager.draining
+        assert response.request_id == "1"
+        assert response.error["code"] == -32001
+
+    async def test_waits_for_inflight(self):
+        dispatcher = JarpcDispatcher()
+        manager = JarpcManager(dispatcher)
+        release = asyncio.Event()
+        finished = []
+
+        @dispatcher.rpc_method
+        async def method():
+            await release.wait()
+            return "ok"
+
+        @dispatcher.rpc_method
+        async def notification():
+            await release.wait()
+            finished.append("notification")
+
+        call = asyncio.create_task(manager.get_response(json.dumps(self.basic_request)))
+        await manager.get_response(json.dumps({"method": "notification", "params": {}, "rsvp": False}))
+        await asyncio.sleep(0)
+        assert manager.inflight == 1
+
+        shutdown = asyncio.create_task(manager.shutdown(timeout=5))
+        await asyncio.sleep(0.01)
+        assert not shutdown.done()
+
+        release.set()
+        await shutdown
+        assert (await call).result == "ok"
+        assert finished == ["notification"]
+        assert manager.inflight == 0
+
+    async def test_cancels_after_deadline(self):
+        dispatcher = JarpcDispatcher()
+        manager = JarpcManager(dispatcher)
+
+        @dispatcher.rpc_method
+        async def method():
+            await asyncio.sleep(10)
+
+        call = asyncio.create_task(manager.get_response(json.dumps(self.basic_request)))
+        await asyncio.sleep(0)
+
+        await manager.shutdown(timeout=0.01)
+
+        # only the request is cancelled, the caller gets an answer
+        assert (await call).error["code"] == JarpcShuttingDown.code
+        assert manager.inflight == 0
+
+    async def test_caller_survives_drain(self):
+        dispatcher = JarpcDispatcher()
+        manager = JarpcManager(dispatcher)
+
+        @dispatcher.rpc_method
+        async def method():
+            await asyncio.sleep(10)
+
+        async def connection():
+            # a connection handler keeps running after the request is answered
+            response = await manager.get_response(json.dumps(self.basic_request))
+            await asyncio.sleep(0.01)
+            return response
+
+        call = asyncio.create_task(connection())
+        await asyncio.sleep(0)
+
+        await manager.shutdown(timeout=0.01)
+
+        assert (await call).error["code"] == JarpcShuttingDown.code
+        assert not call.cancelling()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+from jarpcdantic import JarpcClient, JarpcDispatcher, JarpcManager, NotificationSender, ShardedTransport
+from jarpcdantic.framed import FramedTransport
+
+
+class BatchTransport:
+    def __init__(self, manager, delay=0.0, fail=False):
+        self.manager = manager
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+
+    async def __call__(self, request_string, request):
+        self.batches.append(len(request))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("down")
+        return await self.manager.handle(request_string)
+
+
+@pytest.fixture
+def received():
+    return []
+
+
+@pytest.fixture
+def manager(received):
+    dispatcher = JarpcDispatcher()
+    dispatcher.add_rpc_method(lambda value: received.append(value), "event")
+    return JarpcManager(dispatcher)
+
+
+@pytest.mark.asyncio
+class TestNotificationSender:
+    async def test_size_and_time_triggers(self, manager, received):
+        transport = BatchTransport(manager)
+        sender = NotificationSender(JarpcClient(transport), max_batch=10, flush_interval=0.01)
+
+        for value in range(25):
+            await sender.send("event", {"value": value})
+        await asyncio.sleep(0)
+        assert transport.batches == [10, 10]
+
+        await asyncio.sleep(0.02)
+        assert transport.batches == [10, 10, 5]
+        assert received == list(range(25))
+        assert sender.sent == 25
+
+    async def test_backpressure_and_close(self, manager, received):
+        transport = BatchTransport(manager, delay=0.01)
+        sender = NotificationSender(JarpcClient(transport), max_batch=2, flush_interval=1.0, max_buffer=4)
+
+        for value in range(4):
+            sender.send_nowait("event", {"value": value})
+        with pytest.raises(asyncio.QueueFull):
+            sender.send_nowait("event", {"value": 4})
+        await sender.send("event", {"value": 4})
+        assert len(sender) <= 4
+
+        await sender.aclose()
+        assert received == list(range(5))
+        with pytest.raises(RuntimeError):
+            sender.send_nowait("event", {"value": 5})
+
+    async def test_errors(self, manager):
+        errors = []
+        transport = BatchTransport(manager, fail=True)
+        sender = NotificationSender(JarpcClient(transport), on_error=lambda batch, e: errors.append((len(batch), e)))
+
+        await sender.send("event", {"value": 1})
+        await sender.flush()
+
+        assert sender.failed == 1
+        assert errors[0][0] == 1 and isinstance(errors[0][1], ConnectionError)
+
+    async def test_transports_without_batches(self, manager):
+        sharded = ShardedTransport({"a": BatchTransport(manager)}, keys={}, default_key=lambda request: request.id)
+        for transport in (FramedTransport(host="127.0.0.1", port=1), sharded):
+            with pytest.raises(ValueError):
+                NotificationSender(JarpcClient(transport))
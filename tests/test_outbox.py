@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import sqlite3
+
+import pytest
+
+from jarpcdantic import JarpcClient, JarpcDispatcher, JarpcManager, JarpcTimeout, Outbox
+
+
+class FlakyTransport:
+    def __init__(self, manager, failures=0):
+        self.manager = manager
+        self.failures = failures
+        self.calls = 0
+
+    async def __call__(self, request_string, request):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise JarpcTimeout()
+        return await self.manager.handle(request_string)
+
+
+@pytest.fixture
+def received():
+    return []
+
+
+@pytest.fixture
+def manager(received):
+    dispatcher = JarpcDispatcher()
+    dispatcher.add_rpc_method(lambda order_id: received.append(order_id), "pay")
+    return JarpcManager(dispatcher)
+
+
+async def wait_until(condition, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition is not met")
+
+
+@pytest.mark.asyncio
+class TestOutbox:
+    async def test_group_commit_and_delivery(self, manager, received, tmp_path):
+        outbox = Outbox(str(tmp_path / "outbox.sqlite3"))
+        client = JarpcClient(FlakyTransport(manager), outbox=outbox)
+        async with outbox:
+            results = await asyncio.gather(*(client("pay", {"order_id": i}, durable=True) for i in range(50)))
+            assert results == [None] * 50
+            assert outbox.commits < 50
+
+            await wait_until(lambda: len(received) == 50)
+            await wait_until(lambda: outbox.delivered == 50)
+            assert await outbox.size() == 0
+        assert sorted(received) == list(range(50))
+
+    async def test_redelivery(self, manager, received, tmp_path):
+        transport = FlakyTransport(manager, failures=2)
+        outbox = Outbox(str(tmp_path / "outbox.sqlite3"), retry_delay=0.01)
+        client = JarpcClient(transport, outbox=outbox)
+        async with outbox:
+            await client("pay", {"order_id": 1}, durable=True)
+            await wait_until(lambda: received == [1])
+        assert transport.calls == 3
+
+    async def test_replay_after_restart(self, manager, received, tmp_path):
+        path = str(tmp_path / "outbox.sqlite3")
+        outbox = Outbox(path, retry_delay=10.0)
+        client = JarpcClient(FlakyTransport(manager, failures=100), outbox=outbox)
+        async with outbox:
+            await client("pay", {"order_id": 7}, durable=True)
+        with sqlite3.connect(path) as db:
+            assert db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0] == 1
+
+        outbox = Outbox(path)
+        JarpcClient(FlakyTransport(manager), outbox=outbox)
+        async with outbox:
+            await wait_until(lambda: 7 in received)
+            await wait_until(lambda: outbox.delivered == 1)
+            assert await outbox.size() == 0
+
+    async def test_middlewares_and_reopening(self, manager, received, tmp_path):
+        delivered = []
+
+        async def middleware(request, call_next):
+            delivered.append(request.method)
+            return await call_next(request)
+
+        outbox = Outbox(str(tmp_path / "outbox.sqlite3"))
+        client = JarpcClient(FlakyTransport(manager), outbox=outbox, middlewares=[middleware])
+        async with outbox:
+            await client("pay", {"order_id": 1}, durable=True)
+            await wait_until(lambda: outbox.delivered == 1)
+        assert delivered == ["pay"]
+        assert outbox._executor is None
+
+        async with outbox:
+            await client("pay", {"order_id": 2}, durable=True)
+            await wait_until(lambda: outbox.delivered == 2)
+        assert received == [1, 2]
+
+    async def test_concurrent_first_puts(self, manager, received, tmp_path):
+        transport = FlakyTransport(manager)
+        outbox = Outbox(str(tmp_path / "outbox.sqlite3"))
+        client = JarpcClient(transport, outbox=outbox)
+
+        await asyncio.gather(*(client("pay", {"order_id": i}, durable=True) for i in range(5)))
+        await wait_until(lambda: outbox.delivered == 5)
+        tasks = [task for task in asyncio.all_tasks() if task.get_coro().__name__ == "_deliver_forever"]
+        assert len(tasks) == 1
+
+        await outbox.aclose()
+        assert tasks[0].done()
+        assert transport.calls == 5
+        assert sorted(received) == list(range(5))
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+import pytest
+
+from jarpcdantic import JarpcClient, JarpcRateLimited, JarpcResponse, RateLimiter
+
+
+class SlowTransport:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.inflight = 0
+        self.max_inflight = 0
+
+    async def __call__(self, request_string, request):
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.inflight -= 1
+        return JarpcResponse(request_id=request.id, result=request.method).model_dump_json()
+
+
+@pytest.mark.asyncio
+class TestRateLimiter:
+    async def test_rate_wait_and_fail_fast(self):
+        client = JarpcClient(SlowTransport(), middlewares=[RateLimiter(rate=100, burst=2)])
+        started = time.monotonic()
+        await asyncio.gather(*(client.ping() for _ in range(5)))
+        assert time.monotonic() - started >= 0.025
+
+        limiter = RateLimiter(method_rates={"report": (10, 1)}, wait=False)
+        client = JarpcClient(SlowTransport(), middlewares=[limiter])
+        assert await client.report() == "report"
+        with pytest.raises(JarpcRateLimited):
+            await client.report()
+        assert await client.ping() == "ping"
+        assert limiter.rejected == 1
+
+    async def test_deadline(self):
+        client = JarpcClient(SlowTransport(), middlewares=[RateLimiter(rate=1, burst=1)])
+        await client.ping()
+        with pytest.raises(JarpcRateLimited):
+            await client("ping", {}, ttl=0.1)
+
+    async def test_inflight(self):
+        transport = SlowTransport(delay=0.01)
+        client = JarpcClient(transport, middlewares=[RateLimiter(max_inflight=4, method_max_inflight={"report": 1})])
+        await asyncio.gather(*(client.ping() for _ in range(10)), *(client.report() for _ in range(3)))
+        assert transport.max_inflight == 4
+
+        client = JarpcClient(transport, middlewares=[RateLimiter(method_max_inflight={"report": 1}, wait=False)])
+        results = await asyncio.gather(client.report(), client.report(), return_exceptions=True)
+        assert results[0] == "report"
+        assert isinstance(results[1], JarpcRateLimited)
+
+    async def test_tokens_are_refunded(self):
+        limiter = RateLimiter(rate=10, burst=1)
+        client = JarpcClient(SlowTransport(), middlewares=[limiter])
+        await client.ping()
+
+        # cancelled while waiting for its token, the call must not delay the next ones
+        waiting = asyncio.ensure_future(client.ping())
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        started = time.monotonic()
+        await client.ping()
+        assert time.monotonic() - started < 0.15
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import time
+
+import pytest
+
+from jarpcdantic import (
+    JarpcClient,
+    JarpcExternalServiceUnavailable,
+    JarpcResponse,
+    JarpcTimeout,
+    JarpcValidationError,
+    RetryPolicy,
+    jarpcdantic_exceptions,
+)
+
+
+class FlakyTransport:
+    """Fails with the given errors, then answers."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.requests = []
+
+    async def __call__(self, request_string, request):
+        self.requests.append(request)
+        if self.errors:
+            raise self.errors.pop(0)
+        return JarpcResponse(request_id=request.id, result="ok").model_dump_json()
+
+
+def test_retryable_codes():
+    codes = jarpcdantic_exceptions.retryable_codes()
+
+    assert JarpcTimeout.code in codes
+    assert JarpcExternalServiceUnavailable.code in codes
+    assert JarpcValidationError.code not in codes
+
+
+@pytest.mark.asyncio
+class TestRetryPolicy:
+    async def test_retries_with_same_request(self):
+        transport = FlakyTransport(JarpcTimeout(), JarpcExternalServiceUnavailable())
+        policy = RetryPolicy(max_attempts=3, base_delay=0.001)
+        client = JarpcClient(transport, middlewares=[policy])
+
+        assert await client.cook() == "ok"
+        assert len({request.id for request in transport.requests}) == 1
+        assert policy.retries == 2
+
+    async def test_non_retryable_and_max_attempts(self):
+        transport = FlakyTransport(JarpcValidationError())
+        client = JarpcClient(transport, middlewares=[RetryPolicy(base_delay=0.001)])
+        with pytest.raises(JarpcValidationError):
+            await client.cook()
+        assert len(transport.requests) == 1
+
+        transport = FlakyTransport(*(JarpcTimeout() for _ in range(5)))
+        client = JarpcClient(transport, middlewares=[RetryPolicy(max_attempts=3, base_delay=0.001)])
+        with pytest.raises(JarpcTimeout):
+            await client.cook()
+        assert len(transport.requests) == 3
+
+    async def test_deadline(self):
+        transport = FlakyTransport(JarpcTimeout(), JarpcTimeout())
+        client = JarpcClient(transport, middlewares=[RetryPolicy(base_delay=10.0, max_delay=10.0)])
+
+        started = time.monotonic()
+        with pytest.raises(JarpcTimeout):
+            await client.cook(ttl=0.0001)
+        assert time.monotonic() - started < 1.0
+
+    async def test_budget(self):
+        policy = RetryPolicy(base_delay=0.001, budget_ratio=0.0, budget_max=1.0)
+        client = JarpcClient(FlakyTransport(*(JarpcTimeout() for _ in range(10))), middlewares=[policy])
+
+        for _ in range(2):
+            with pytest.raises(JarpcTimeout):
+                await client.cook()
+
+        assert policy.retries == 1
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import pytest
+from pydantic import BaseModel
+
+from jarpcdantic import JarpcClient, JarpcClientRouter, JarpcResponse
+from jarpcdantic import router as router_module
+
+
+class Salad(BaseModel):
+    name: str
+    size: int = 1
+
+
+class Salads(JarpcClientRouter):
+    def cook(self, name: str, size: int = 1) -> Salad: ...
+
+    def menu(self) -> list[str]: ...
+
+    def order(self, salad: Salad, _rsvp: bool = False) -> None: ...
+
+
+class Drinks(JarpcClientRouter):
+    def pour(self, name: str) -> str: ...
+
+
+class Kitchen(JarpcClientRouter):
+    salads = Salads()
+    drinks = Drinks(prefix="bar", is_absolute_prefix=True)
+
+    def ping(self, _meta: dict | None = None) -> str: ...
+
+
+class Recorder:
+    """Transport answering from a table of results and recording requests."""
+
+    def __init__(self, results=None):
+        self.results = results or {}
+        self.requests = []
+        self.kwargs = []
+
+    async def __call__(self, request_string, request, **kwargs):
+        self.requests.append(request)
+        self.kwargs.append(kwargs)
+        return JarpcResponse(request_id=request.id, result=self.results.get(request.method)).model_dump_json()
+
+
+@pytest.mark.asyncio
+class TestJarpcClientRouter:
+    async def test_call(self):
+        recorder = Recorder({"kitchen.salads.cook": {"name": "Caesar", "size": 2}})
+        kitchen = Kitchen(prefix="kitchen", client=JarpcClient(recorder))
+
+        salad = await kitchen.salads.cook("Caesar", size=2)
+
+        assert salad == Salad(name="Caesar", size=2)
+        request = recorder.requests[-1]
+        assert request.method == "kitchen.salads.cook"
+        assert request.params.model_dump() == {"name": "Caesar", "size": 2}
+
+    async def test_defaults_and_service_params(self):
+        recorder = Recorder({"salads.menu": ["Caesar"], "salads.cook": {"name": "Greek"}})
+        kitchen = Kitchen(client=JarpcClient(recorder))
+
+        await kitchen.salads.cook(name="Greek")
+        assert recorder.requests[-1].params.model_dump() == {"name": "Greek", "size": 1}
+
+        assert await kitchen.salads.menu() == ["Caesar"]
+        assert recorder.requests[-1].params == {}
+
+        await kitchen.salads.order(Salad(name="Caesar"))
+        assert recorder.requests[-1].rsvp is False
+        await kitchen.salads.order(Salad(name="Caesar"), _rsvp=True)
+        assert recorder.requests[-1].rsvp is True
+
+        await kitchen.ping(_meta={"user": "admin"})
+        assert recorder.requests[-1].meta == {"user": "admin"}
+        assert recorder.requests[-1].method == "ping"
+
+    async def test_binding(self):
+        recorder = Recorder({"salads.cook": {"name": "Greek"}})
+        kitchen = Kitchen(client=JarpcClient(recorder))
+
+        await kitchen.salads.cook("Greek", 3, _ttl=5.0, _timeout=1.0)
+        assert recorder.requests[-1].params.model_dump() == {"name": "Greek", "size": 3}
+        assert recorder.requests[-1].ttl == 5.0
+        assert recorder.kwargs[-1] == {"_timeout": 1.0}
+
+        with pytest.raises(TypeError):
+            await kitchen.salads.cook("Greek", 3, 4)
+
+    async def test_result_is_not_converted_twice(self):
+        salad = Salad(name="Caesar")
+
+        async def cached(request, call_next):
+            return salad
+
+        kitchen = Kitchen(client=JarpcClient(Recorder(), middlewares=[cached]))
+
+        assert await kitchen.salads.cook(name="Caesar") is salad
+
+    async def test_absolute_prefix(self):
+        recorder = Recorder({"bar.pour": "tea"})
+        kitchen = Kitchen(prefix="kitchen")
+        kitchen.set_client(JarpcClient(recorder))
+
+        assert await kitchen.drinks.pour(name="tea") == "tea"
+        assert recorder.requests[-1].method == "bar.pour"
+
+    async def test_instances_are_independent(self):
+        first, second = Recorder({"first.salads.menu": []}), Recorder({"second.salads.menu": []})
+        first_kitchen = Kitchen(prefix="first", client=JarpcClient(first))
+        second_kitchen = Kitchen(prefix="second", client=JarpcClient(second))
+
+        await first_kitchen.salads.menu()
+        await second_kitchen.salads.menu()
+
+        assert [request.method for request in first.requests] == ["first.salads.menu"]
+        assert [request.method for request in second.requests] == ["second.salads.menu"]
+
+    async def test_endpoints_compiled_once(self, monkeypatch):
+        created = []
+        create_model = router_module.create_model
+        monkeypatch.setattr(
+            router_module, "create_model", lambda *args, **kwargs: created.append(args) or create_model(*args, **kwargs)
+        )
+
+        class Bakery(JarpcClientRouter):
+            salads = Salads()
+
+            def bake(self, name: str) -> str: ...
+
+        for _ in range(3):
+            Bakery(client=JarpcClient(Recorder()))
+
+        assert len(created) == 1
+
+    async def test_bad_annotation_breaks_only_its_endpoint(self):
+        class Opaque:
+            pass
+
+        class Pantry(JarpcClientRouter):
+            def peek(self) -> Opaque: ...
+
+            def count(self) -> int: ...
+
+        pantry = Pantry(client=JarpcClient(Recorder({"count": 3})))
+
+        assert await pantry.count() == 3
+        with pytest.raises(Exception):
+            await pantry.peek()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from jarpcdantic import JarpcClient, JarpcDispatcher, JarpcManager
+from jarpcdantic.framed import FramedTransport
+from jarpcdantic.runner import PreforkRunner
+
+
+def build_manager():
+    dispatcher = JarpcDispatcher()
+    dispatcher.add_rpc_method(os.getpid, "pid")
+    return JarpcManager(dispatcher, run_sync_in_thread=False)
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition was not met in time"
+        time.sleep(0.05)
+
+
+async def call_pids(port, connections):
+    transports = [FramedTransport(host="127.0.0.1", port=port) for _ in range(connections)]
+    try:
+        return {await JarpcClient(transport=transport)("pid", {}) for transport in transports}
+    finally:
+        for transport in transports:
+            await transport.aclose()
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="requires POSIX")
+def test_prefork_runner():
+    runner = PreforkRunner(build_manager, host="127.0.0.1", workers=2, metrics_interval=0.05, restart_delay=0)
+    thread = threading.Thread(target=runner.run, kwargs={"install_signal_handlers": False})
+    thread.start()
+    try:
+        assert runner.wait_started(timeout=10)
+        wait_for(lambda: runner.metrics().get("connections_total") == 0)
+
+        pids = asyncio.run(call_pids(runner.port, connections=20))
+        assert pids <= set(runner.pids)
+        wait_for(lambda: runner.metrics()["requests_total"] == 20)
+
+        killed = runner.pids[0]
+        os.kill(killed, signal.SIGKILL)
+        wait_for(lambda: runner.restarts == 1 and len(runner.pids) == 2)
+        assert killed not in runner.pids
+        assert asyncio.run(call_pids(runner.port, connections=1)) <= set(runner.pids)
+    finally:
+        runner.stop()
+        thread.join(timeout=30)
+
+    assert not thread.is_alive()
+    assert runner.pids == []
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from jarpcdantic import JarpcClient, JarpcClientRouter, JarpcResponse, JarpcServerError, ShardedTransport
+
+
+class Shard:
+    def __init__(self, name):
+        self.name = name
+
+    async def __call__(self, request_string, request):
+        return JarpcResponse(request_id=request.id, result=self.name).model_dump_json()
+
+
+class Orders(JarpcClientRouter):
+    def get(self, order_id: int) -> str: ...
+
+
+def make_transport(names):
+    return ShardedTransport(
+        shards={name: Shard(name) for name in names},
+        keys={"order.get": lambda params: params["order_id"]},
+    )
+
+
+@pytest.mark.asyncio
+class TestShardedTransport:
+    async def test_routing(self):
+        transport = make_transport(["a", "b", "c"])
+        client = JarpcClient(transport)
+
+        for order_id in range(20):
+            assert await client("order.get", {"order_id": order_id}) == transport.shard_for(order_id)
+        with pytest.raises(JarpcServerError):
+            await client("order.list", {})
+
+        transport.default_key = lambda request: request.method
+        assert await client("order.list", {}) == transport.shard_for("order.list")
+
+    async def test_router_params(self):
+        transport = make_transport(["a", "b", "c"])
+        orders = Orders(prefix="order", client=JarpcClient(transport))
+
+        for order_id in range(20):
+            assert await orders.get(order_id=order_id) == transport.shard_for(order_id)
+
+    async def test_minimal_movement(self):
+        transport = make_transport(["a", "b", "c", "d"])
+        keys = range(4000)
+        before = {key: transport.shard_for(key) for key in keys}
+        assert all(750 < list(before.values()).count(name) < 1250 for name in "abcd")
+
+        transport.add_shard("e", Shard("e"))
+        after = {key: transport.shard_for(key) for key in keys}
+        moved = [key for key in keys if before[key] != after[key]]
+        assert all(after[key] == "e" for key in moved)
+        assert 500 < len(moved) < 1100
+
+        transport.remove_shard("e")
+        assert {key: transport.shard_for(key) for key in keys} == before